@@ -27,34 +27,73 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     
     _LOGGER.info("MQTT integration is available and ready")
     
+    from .hub import JackeryHub, parse_device_sns
+    from .services import async_setup_services
+    from .throttle import policies_from_options
+
+    # 一个配置条目可包含多台设备 (device_sn: "SN1, SN2")，共用一组 MQTT 订阅
+    config = entry.data
+    hub = JackeryHub(
+        hass,
+        config.get("topic_prefix", "hb"),
+        config.get("token"),
+        config.get("mqtt_host"),
+        parse_device_sns(config.get("device_sn")),
+        entry.entry_id,
+    )
+    policies = policies_from_options(entry.options)
+    for coordinator in hub.coordinators:
+        coordinator.throttle.set_policies(policies)
+
     # 初始化存储结构
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][entry.entry_id] = {
         "config": entry.data,
-        "coordinator": None,  # 将在 sensor.py 中设置
+        "hub": hub,
+        "coordinator": hub.primary,  # Primary device
     }
     
     # 加载传感器平台
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    await hub.async_start()
+    async_setup_services(hass)
+
+    # 选项变更时实时应用节流策略
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
     
     return True
 
 
+async def async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply changed options (state write throttling) to the running coordinator."""
+    from .throttle import policies_from_options
+
+    hub = hass.data[DOMAIN].get(entry.entry_id, {}).get("hub")
+    if hub:
+        policies = policies_from_options(entry.options)
+        for coordinator in hub.coordinators:
+            coordinator.throttle.set_policies(policies)
+        _LOGGER.info("Jackery options updated")
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     _LOGGER.info("Unloading Jackery integration")
     
     # 停止协调器
     entry_data = hass.data[DOMAIN].get(entry.entry_id, {})
-    coordinator = entry_data.get("coordinator")
-    if coordinator:
-        await coordinator.async_stop()
-        _LOGGER.info("Coordinator stopped")
+    hub = entry_data.get("hub")
+    if hub:
+        await hub.async_stop()
+        _LOGGER.info("Hub stopped")
     
     # 卸载传感器平台
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     
     if unload_ok:
         hass.data[DOMAIN].pop(entry.entry_id)
+
+        from .services import async_unload_services
+        async_unload_services(hass)
     
     return unload_ok
@@ -0,0 +1,109 @@
+"""Capture of raw MQTT traffic for offline replay.
+
+While a capture runs, the hub records (receive time, topic, payload) of every
+message it receives, before routing or decoding. Records are buffered in
+memory and appended to a JSON Lines file by the executor, one object per
+message:
+
+    {"t": 1760589112.034, "topic": "hb/device/JK.../status", "payload": "{...}"}
+
+Payloads that are not valid UTF-8 are stored base64-encoded with
+``"b64": true``. ``python -m tools.mqtt_replay`` feeds such a file back into
+a hub with stub Home Assistant objects.
+"""
+import base64
+import json
+import logging
+import time
+from typing import Any, Iterator
+
+from homeassistant.core import HomeAssistant
+
+_LOGGER = logging.getLogger(__name__)
+
+CAPTURE_FLUSH_EVERY = 200  # 条：缓冲多少条消息后写盘
+CAPTURE_MAX_MESSAGES = 100_000  # 条：达到后自动停止
+
+
+def encode_record(received: float, topic: str, payload: bytes | str) -> str:
+    """Return the JSON line (without newline) for one received message."""
+    record: dict[str, Any] = {"t": round(received, 6), "topic": topic}
+    if isinstance(payload, bytes):
+        try:
+            record["payload"] = payload.decode("utf-8")
+        except UnicodeDecodeError:
+            record["payload"] = base64.b64encode(payload).decode("ascii")
+            record["b64"] = True
+    else:
+        record["payload"] = payload
+    return json.dumps(record, ensure_ascii=False)
+
+
+def decode_record(line: str) -> tuple[float, str, bytes]:
+    """Parse one JSON line back into (receive time, topic, payload bytes)."""
+    record = json.loads(line)
+    payload = record["payload"]
+    if record.get("b64"):
+        return record["t"], record["topic"], base64.b64decode(payload)
+    return record["t"], record["topic"], payload.encode("utf-8")
+
+
+def read_capture(path: str) -> Iterator[tuple[float, str, bytes]]:
+    """Yield the records of a capture file in order (blank lines are skipped)."""
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                yield decode_record(line)
+
+
+class TrafficCapture:
+    """Buffered recorder of the raw messages a hub receives."""
+
+    def __init__(self, hass: HomeAssistant, path: str, max_messages: int = CAPTURE_MAX_MESSAGES) -> None:
+        self.hass = hass
+        self.path = path
+        self.max_messages = max_messages
+        self.messages = 0
+        self.started = time.time()
+        self._buffer: list[tuple[float, str, bytes | str]] = []
+        self._write_task = None
+
+    @property
+    def full(self) -> bool:
+        return self.messages >= self.max_messages
+
+    def record(self, topic: str, payload: bytes | str) -> None:
+        """Buffer one message (called on the event loop for every received message)."""
+        if self.full:
+            return
+        self._buffer.append((time.time(), topic, payload))
+        self.messages += 1
+        if len(self._buffer) >= CAPTURE_FLUSH_EVERY:
+            self._flush()
+
+    def _flush(self) -> None:
+        """Hand the buffered records to the executor; writes stay in order."""
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        self._write_task = self.hass.async_create_task(self._async_write(batch, self._write_task))
+
+    async def _async_write(self, batch: list, previous) -> None:
+        if previous is not None:
+            await previous
+        try:
+            await self.hass.async_add_executor_job(self._write, batch)
+        except OSError as e:
+            _LOGGER.error(f"Error writing MQTT capture {self.path}: {e}")
+
+    def _write(self, batch: list) -> None:
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.writelines(encode_record(*record) + "\n" for record in batch)
+
+    async def async_stop(self) -> dict[str, Any]:
+        """Write the remaining records and return a summary."""
+        self._flush()
+        if self._write_task is not None:
+            await self._write_task
+            self._write_task = None
+        return {"path": self.path, "messages": self.messages}
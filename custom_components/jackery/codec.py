@@ -0,0 +1,41 @@
+"""JSON codec for the Jackery MQTT ingest and publish paths.
+
+Uses orjson when it is installed (Home Assistant ships it) and falls back to
+the standard library otherwise. orjson parses MQTT payloads straight from
+bytes; the fallback decodes UTF-8 itself, because ``json.loads(bytes)`` runs
+an encoding detection first and is slower than decode + parse.
+"""
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+# Raised by both backends for malformed payloads (orjson's error subclasses it);
+# invalid UTF-8 raises UnicodeDecodeError, so callers catch ValueError.
+JSONDecodeError = json.JSONDecodeError
+
+if orjson is not None:
+    BACKEND = "orjson"
+
+    def loads(data: bytes | str) -> Any:
+        """Parse a JSON document from bytes or str."""
+        return orjson.loads(data)
+
+    def dumps(obj: Any) -> bytes:
+        """Serialize to compact JSON bytes, ready to publish."""
+        return orjson.dumps(obj)
+
+else:
+    BACKEND = "json"
+
+    def loads(data: bytes | str) -> Any:
+        """Parse a JSON document from bytes or str."""
+        if isinstance(data, bytes):
+            data = data.decode()
+        return json.loads(data)
+
+    # Serialize to JSON, ready to publish (no wrapper call; default separators keep the cached encoder)
+    dumps = json.dumps
@@ -0,0 +1,134 @@
+"""Debounced, coalesced outbound command queue for one Jackery device.
+
+Dragging a slider calls the control method once per intermediate value. The
+queue collects those writes per target (``"main"`` for type-1/cmd-5
+parameters, the plug SN for type-103 switches) and sends each target's
+merged parameters once its writes have been quiet for ``debounce`` seconds:
+
+- a newer value for a key replaces the pending one (coalesced);
+- a write equal to the last confirmed device value is dropped, unless it
+  cancels a different pending value for the same key;
+- commands of one device are spaced at least ``min_interval`` seconds apart.
+"""
+import logging
+import time
+from typing import Any, Awaitable, Callable, Hashable, Mapping
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+_LOGGER = logging.getLogger(__name__)
+
+COMMAND_DEBOUNCE = 0.4  # 秒：最后一次写入后等待多久再发送
+COMMAND_MIN_INTERVAL = 1.0  # 秒：同一设备两条指令的最小间隔
+
+Sender = Callable[[dict[str, Any]], Awaitable[None]]
+
+
+def _same_value(value: Any, confirmed: Any) -> bool:
+    if value is None or confirmed is None:
+        return False
+    try:
+        return float(value) == float(confirmed)
+    except (TypeError, ValueError):
+        return value == confirmed
+
+
+class CommandQueue:
+    """Per-device outbound command queue (debounce, coalesce, rate limit)."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        debounce: float = COMMAND_DEBOUNCE,
+        min_interval: float = COMMAND_MIN_INTERVAL,
+    ) -> None:
+        self.hass = hass
+        self._debounce = debounce
+        self._min_interval = min_interval
+        self._pending: dict[Hashable, dict[str, Any]] = {}  # {target: params}, oldest target first
+        self._senders: dict[Hashable, Sender] = {}
+        self._last_write: dict[Hashable, float] = {}
+        self._last_sent: float | None = None
+        self._unsub_timer = None
+
+        self.writes_submitted = 0
+        self.writes_coalesced = 0  # Replaced by a newer value before sending
+        self.writes_dropped = 0  # Equal to the confirmed device value
+        self.commands_sent = 0
+
+    def submit(
+        self,
+        target: Hashable,
+        params: Mapping[str, Any],
+        confirmed: Mapping[str, Any],
+        send: Sender,
+        now: float,
+    ) -> None:
+        """Queue ``params`` for ``target``; ``confirmed`` holds the device's current values."""
+        pending = self._pending.get(target, {})
+        for key, value in params.items():
+            self.writes_submitted += 1
+            if key in pending:
+                self.writes_coalesced += 1
+                if _same_value(value, confirmed.get(key)):
+                    del pending[key]  # Back to what the device already has
+                else:
+                    pending[key] = value
+            elif _same_value(value, confirmed.get(key)):
+                self.writes_dropped += 1
+            else:
+                pending[key] = value
+
+        if pending:
+            self._pending[target] = pending
+            self._senders[target] = send
+            self._last_write[target] = now
+        else:
+            self._pending.pop(target, None)
+        self._schedule(now)
+
+    def _next_send_time(self) -> float | None:
+        if not self._pending:
+            return None
+        due = min(self._last_write[target] + self._debounce for target in self._pending)
+        if self._last_sent is not None:
+            due = max(due, self._last_sent + self._min_interval)
+        return due
+
+    def _schedule(self, now: float) -> None:
+        if self._unsub_timer:
+            self._unsub_timer()
+            self._unsub_timer = None
+        due = self._next_send_time()
+        if due is not None:
+            self._unsub_timer = async_call_later(self.hass, max(due - now, 0), self._timer_fired)
+
+    @callback
+    def _timer_fired(self, _now: Any) -> None:
+        self._unsub_timer = None
+        self.hass.async_create_task(self._async_send_next())
+
+    async def _async_send_next(self) -> None:
+        """Send the oldest settled target, then schedule the rest."""
+        now = time.monotonic()
+        for target in list(self._pending):
+            if self._last_write[target] + self._debounce <= now:
+                params = self._pending.pop(target)
+                send = self._senders.pop(target)
+                self._last_sent = now
+                self.commands_sent += 1
+                try:
+                    await send(params)
+                except Exception as e:
+                    _LOGGER.warning(f"Error sending command to {target}: {e}")
+                break
+        self._schedule(time.monotonic())
+
+    def cancel(self) -> None:
+        """Drop pending commands (unload)."""
+        if self._unsub_timer:
+            self._unsub_timer()
+            self._unsub_timer = None
+        self._pending.clear()
+        self._senders.clear()
@@ -5,10 +5,22 @@ from typing import Any
 import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.components import mqtt
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 
 from . import DOMAIN
+from .throttle import (
+    DEFAULT_DEADBAND,
+    DEFAULT_DEADBAND_PERCENT,
+    DEFAULT_MAX_INTERVAL,
+    DEFAULT_MIN_INTERVAL,
+    OPTION_DEADBAND,
+    OPTION_DEADBAND_PERCENT,
+    OPTION_MAX_INTERVAL,
+    OPTION_MIN_INTERVAL,
+    THROTTLED_DEVICE_CLASSES,
+    option_key,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -31,6 +43,14 @@ class JackeryConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> "JackeryOptionsFlow":
+        """Get the options flow for this handler."""
+        return JackeryOptionsFlow()
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
@@ -68,3 +88,35 @@ class JackeryConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     async def async_step_import(self, import_config: dict[str, Any]) -> FlowResult:
         """Import a config entry from configuration.yaml."""
         return await self.async_step_user(import_config)
+
+
+class JackeryOptionsFlow(config_entries.OptionsFlow):
+    """Handle Jackery options (state write throttling)."""
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage deadband / interval settings per sensor class."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        options = self.config_entry.options
+        fields = {}
+        for device_class in THROTTLED_DEVICE_CLASSES:
+            for option, default in (
+                (OPTION_DEADBAND, DEFAULT_DEADBAND),
+                (OPTION_DEADBAND_PERCENT, DEFAULT_DEADBAND_PERCENT),
+                (OPTION_MIN_INTERVAL, DEFAULT_MIN_INTERVAL),
+            ):
+                key = option_key(device_class, option)
+                fields[vol.Optional(key, default=options.get(key, default))] = vol.All(
+                    vol.Coerce(float), vol.Range(min=0)
+                )
+        fields[
+            vol.Optional(
+                OPTION_MAX_INTERVAL,
+                default=options.get(OPTION_MAX_INTERVAL, DEFAULT_MAX_INTERVAL),
+            )
+        ] = vol.All(vol.Coerce(float), vol.Range(min=0))
+
+        return self.async_show_form(step_id="init", data_schema=vol.Schema(fields))
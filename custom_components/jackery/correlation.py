@@ -0,0 +1,163 @@
+"""Request/response correlation and round-trip latency statistics.
+
+Every request published on the action topic gets a sequential ``messageId``
+and an entry in a pending table. A reply is matched by the echoed
+``messageId`` if its type fits the request (the device numbers its own
+pushes from the same range); as long as the device has never echoed an id,
+polls are matched by reply type instead (25 -> 25, 100 -> 101, oldest
+request first). Requests without a known reply type (type 1 and 103
+commands, confirmed through the reported state) are counted but not
+tracked.
+Requests that stay unanswered past the timeout are retried (if the request
+allows it) or counted as lost.
+
+Round-trip times go into a fixed log-scale histogram per request type, so
+the percentiles cost O(buckets) regardless of the number of samples.
+"""
+from bisect import bisect_left
+from collections import deque
+from typing import Any, NamedTuple
+
+REQUEST_TIMEOUT = 5.0
+
+# Request type -> reply types it can be matched with (by messageId, or by type while ids are not echoed)
+REPLY_TYPES = {25: (25,), 100: (101,)}
+
+_MESSAGE_ID_MIN = 1000
+_MESSAGE_ID_MAX = 9999
+
+# Bucket upper bounds in ms: 1 ms .. ~60 s, ratio 1.25 (about ±12% resolution)
+_BUCKET_BOUNDS = tuple(1.25**i for i in range(50))
+
+
+class LatencyHistogram:
+    """Log-scale round-trip time histogram (milliseconds)."""
+
+    def __init__(self, bounds: tuple[float, ...] = _BUCKET_BOUNDS) -> None:
+        self._bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)
+        self.count = 0
+
+    def add(self, rtt_ms: float) -> None:
+        self._counts[bisect_left(self._bounds, rtt_ms)] += 1
+        self.count += 1
+
+    def percentile(self, q: float) -> float | None:
+        """Return the upper bound of the bucket holding the q-th percentile (0-100)."""
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self._counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return self._bounds[min(index, len(self._bounds) - 1)]
+        return self._bounds[-1]
+
+
+class PendingRequest(NamedTuple):
+    """A published request waiting for its reply."""
+
+    message_id: int
+    msg_type: int
+    sent_at: float
+    retries_left: int
+    topic: str
+    payload: dict
+
+
+class RequestTracker:
+    """Pending-request table plus per-type latency and loss statistics."""
+
+    def __init__(self, timeout: float = REQUEST_TIMEOUT) -> None:
+        self.timeout = timeout
+        self._next_id = _MESSAGE_ID_MIN
+        self._pending: dict[int, PendingRequest] = {}
+        self._by_type: dict[int, deque[int]] = {}
+        self.echoes_ids = False  # Set once a reply of the right type carried one of our messageIds
+        self.histograms: dict[int, LatencyHistogram] = {}
+        self.sent: dict[int, int] = {}
+        self.answered: dict[int, int] = {}
+        self.lost: dict[int, int] = {}
+        self.retried = 0
+
+    def next_message_id(self) -> int:
+        message_id = self._next_id
+        self._next_id = message_id + 1 if message_id < _MESSAGE_ID_MAX else _MESSAGE_ID_MIN
+        return message_id
+
+    def track(
+        self,
+        msg_type: int,
+        topic: str,
+        payload: dict,
+        now: float,
+        retries: int = 0,
+    ) -> None:
+        """Record a published request (``payload["messageId"]`` identifies it)."""
+        self.sent[msg_type] = self.sent.get(msg_type, 0) + 1
+        if msg_type not in REPLY_TYPES:
+            return  # No reply to wait for; it would only ever count as lost
+        message_id = payload["messageId"]
+        self._drop(message_id)  # The id counter wrapped onto an old entry
+        self._pending[message_id] = PendingRequest(message_id, msg_type, now, retries, topic, payload)
+        for reply_type in REPLY_TYPES.get(msg_type, ()):
+            self._by_type.setdefault(reply_type, deque()).append(message_id)
+
+    def _drop(self, message_id: int) -> PendingRequest | None:
+        request = self._pending.pop(message_id, None)
+        if request is not None:
+            for reply_type in REPLY_TYPES.get(request.msg_type, ()):
+                queue = self._by_type.get(reply_type)
+                if queue and message_id in queue:
+                    queue.remove(message_id)
+        return request
+
+    def match(self, reply_type: Any, message_id: Any, now: float) -> PendingRequest | None:
+        """Match an incoming message to a pending request and record its round trip."""
+        request = self._pending.get(message_id) if isinstance(message_id, int) else None
+        if request is not None and reply_type in REPLY_TYPES[request.msg_type]:
+            self._drop(message_id)
+            self.echoes_ids = True
+        else:
+            request = None  # A device push that happens to reuse one of our ids is no reply
+            if not self.echoes_ids:
+                queue = self._by_type.get(reply_type)
+                if queue:
+                    request = self._drop(queue[0])
+        if request is None:
+            return None
+
+        self.histograms.setdefault(request.msg_type, LatencyHistogram()).add((now - request.sent_at) * 1000)
+        self.answered[request.msg_type] = self.answered.get(request.msg_type, 0) + 1
+        return request
+
+    def next_deadline(self) -> float | None:
+        """Return when the oldest pending request times out."""
+        if not self._pending:
+            return None
+        return min(request.sent_at for request in self._pending.values()) + self.timeout
+
+    def expire(self, now: float) -> list[PendingRequest]:
+        """Drop timed-out requests; return those that should be sent again."""
+        retry = []
+        for request in [r for r in self._pending.values() if now - r.sent_at >= self.timeout]:
+            self._drop(request.message_id)
+            if request.retries_left > 0:
+                self.retried += 1
+                retry.append(request)
+            else:
+                self.lost[request.msg_type] = self.lost.get(request.msg_type, 0) + 1
+        return retry
+
+    def percentile(self, msg_type: int, q: float) -> float | None:
+        histogram = self.histograms.get(msg_type)
+        return histogram.percentile(q) if histogram else None
+
+    def loss_rate(self, msg_type: int) -> float | None:
+        """Return the percentage of finished requests of ``msg_type`` that got no reply."""
+        answered = self.answered.get(msg_type, 0)
+        lost = self.lost.get(msg_type, 0)
+        if not answered + lost:
+            return None
+        return lost * 100 / (answered + lost)
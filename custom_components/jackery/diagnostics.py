@@ -0,0 +1,135 @@
+"""Diagnostics support for Jackery.
+
+Returns a snapshot of every device of the config entry: the merged cache,
+the known sub-devices, the running freshness/removal timers, poll, request
+and message statistics, the hot-path stage times and the last raw messages
+(``RAW_MESSAGE_BUFFER``). Everything is read from state the coordinator keeps
+anyway, so no debug logging is needed. Credentials, serial numbers and the
+Wi-Fi name are redacted; SNs used as labels are masked to their last four
+characters.
+"""
+import time
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from . import DOMAIN, codec
+from .perf import STAGES
+
+TO_REDACT = {"token", "mqtt_host", "device_sn", "deviceSn", "sn", "wifiName"}
+
+
+def _mask(sn: Any) -> str:
+    sn = str(sn)
+    return "*" * max(len(sn) - 4, 0) + sn[-4:]
+
+
+def _round(value: float | None) -> float | None:
+    return None if value is None else round(value, 3)
+
+
+def _timer_label(key: Any) -> str:
+    if isinstance(key, tuple):
+        kind, sn = key
+        return f"{kind}:{_mask(sn)}"
+    return str(key)
+
+
+def _raw_message(received: float, topic: str, payload: bytes | str, sn: str | None, now: float) -> dict[str, Any]:
+    message: dict[str, Any] = {
+        "age": round(now - received, 3),
+        "topic": topic.replace(sn, _mask(sn)) if sn else topic,
+        "size": len(payload),
+    }
+    try:
+        message["payload"] = async_redact_data(codec.loads(payload), TO_REDACT)
+    except ValueError:
+        message["payload"] = None  # Not JSON
+    return message
+
+
+def _device_diagnostics(coordinator) -> dict[str, Any]:
+    now = time.monotonic()
+    wall = time.time()
+    sn = coordinator.device_sn
+    scheduler = coordinator.poll_scheduler
+    requests = coordinator.requests
+    perf = coordinator.perf
+
+    return {
+        "device_sn": _mask(sn) if sn else None,
+        "primary": coordinator.primary,
+        "cache": async_redact_data(coordinator._data_cache, TO_REDACT),
+        "known_subdevices": sorted(_mask(plug_sn) for plug_sn in coordinator._known_plugs),
+        "stale_subdevices": sorted(_mask(plug_sn) for plug_sn in coordinator._stale_sns),
+        "timers": {
+            _timer_label(key): {name: round(value, 1) for name, value in timer.items()}
+            for key, timer in coordinator._expiry.pending(now).items()
+        },
+        "polling": {
+            "interval": scheduler.interval(now),
+            "poll_rate_per_min": round(scheduler.poll_rate(now), 2),
+            "polls_sent": scheduler.polls_sent,
+            "polls_suppressed": scheduler.polls_suppressed,
+        },
+        "requests": {
+            "sent": requests.sent,
+            "answered": requests.answered,
+            "lost": requests.lost,
+            "retried": requests.retried,
+            "echoes_message_ids": requests.echoes_ids,
+            "rtt_p95_ms": {msg_type: requests.percentile(msg_type, 95) for msg_type in requests.histograms},
+        },
+        "messages": {
+            "received": coordinator.messages_received,
+            "superseded": coordinator.messages_superseded,
+            "processed": coordinator.messages_processed,
+            "rate_per_min": round(perf.message_rate(now), 2),
+            "by_type": {str(msg_type): count for msg_type, count in perf.messages_by_type.items()},
+            "by_channel": dict(perf.messages_by_channel),
+            "slow": perf.slow_messages,
+        },
+        "commands": {
+            "submitted": coordinator.commands.writes_submitted,
+            "coalesced": coordinator.commands.writes_coalesced,
+            "dropped": coordinator.commands.writes_dropped,
+            "sent": coordinator.commands.commands_sent,
+            "confirmed": coordinator.commands_confirmed,
+            "rolled_back": coordinator.commands_rolled_back,
+        },
+        "state_writes": {
+            "issued": coordinator.state_writes,
+            "suppressed": coordinator.state_writes_suppressed,
+            "throttled": coordinator.throttle.throttled,
+        },
+        "stage_times_ms": {
+            stage: {
+                "count": perf.stages[stage].count,
+                **{f"p{q}": _round(perf.percentile(stage, q)) for q in (50, 95, 99)},
+            }
+            for stage in STAGES
+        },
+        "recent_messages": [
+            _raw_message(received, topic, payload, sn, wall)
+            for received, topic, payload in coordinator.recent_messages
+        ],
+    }
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    hub = hass.data[DOMAIN][entry.entry_id]["hub"]
+    return {
+        "entry": {
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "hub": {
+            "subscriptions": len(hub._subscriptions),
+            "messages_rejected": hub.messages_rejected,
+            "capturing": hub.capture is not None,
+        },
+        "devices": [_device_diagnostics(coordinator) for coordinator in hub.coordinators],
+    }
@@ -0,0 +1,129 @@
+"""Shared entity helpers for Jackery."""
+import time
+from typing import Any, TYPE_CHECKING
+
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_call_later
+
+if TYPE_CHECKING:
+    from .sensor import JackeryDataCoordinator
+
+OPTIMISTIC_TIMEOUT = 10.0  # 秒：未收到设备确认时回滚
+
+
+class JackeryEntity:
+    """Mixin that suppresses state writes when nothing visible changed.
+
+    Every write fires a state_changed event and a recorder row, so entities
+    call ``_async_write_state_if_changed`` instead of ``async_write_ha_state``.
+    Value changes of measurement sensors also go through the coordinator's
+    deadband/min-interval throttle; a held-back value is written later by a
+    timer (end of the min interval, or the max interval heartbeat). The
+    coordinator counts issued, suppressed and throttled writes.
+
+    Controls (switches, numbers) show a commanded value optimistically and
+    keep it until the device reports it (confirm) or ``OPTIMISTIC_TIMEOUT``
+    passes (roll back); the command-to-confirmed latency is recorded on the
+    coordinator.
+    """
+
+    _coordinator: "JackeryDataCoordinator"
+    _last_written_state: tuple[Any, ...] | None = None
+    _unsub_throttle_flush = None  # Timer writing a throttled value later
+
+    # Optimistic control state (switches / numbers): the attribute holding the value
+    _state_attr = "_attr_native_value"
+    _optimistic_value: Any = None
+    _optimistic_since: float | None = None
+    _unsub_optimistic = None
+    _device_value: Any = None  # Last value reported by the device
+
+    def _state_fingerprint(self) -> tuple[Any, ...]:
+        """Return the parts of the entity state that end up in the state machine."""
+        return (
+            getattr(self, "_attr_native_value", None),
+            getattr(self, "_attr_is_on", None),
+            self._attr_available,
+            self.extra_state_attributes,
+        )
+
+    @callback
+    def _async_write_state_if_changed(self) -> bool:
+        """Write state only if value, availability or attributes changed."""
+        fingerprint = self._state_fingerprint()
+        last = self._last_written_state
+        if fingerprint == last:
+            self._coordinator.state_writes_suppressed += 1
+            return False
+        # First writes and availability changes always go through; value changes may be throttled
+        throttle = self._coordinator.throttle
+        device_class = getattr(self, "_attr_device_class", None)
+        now = time.monotonic()
+        if not throttle.allow(
+            self._attr_unique_id,
+            device_class,
+            getattr(self, "_attr_state_class", None),
+            fingerprint[0],
+            now,
+            force=last is None or fingerprint[2] != last[2],
+        ):
+            if self._unsub_throttle_flush is None:
+                delay = throttle.retry_delay(self._attr_unique_id, device_class, now)
+                if delay is not None:
+                    self._unsub_throttle_flush = async_call_later(self.hass, delay, self._async_throttle_flush)
+            return False
+        self._cancel_throttle_flush()
+        self._last_written_state = fingerprint
+        self._coordinator.state_writes += 1
+        self.async_write_ha_state()
+        return True
+
+    @callback
+    def _async_throttle_flush(self, _now: Any) -> None:
+        """Write the value held back by the throttle (it may be held again, e.g. by the deadband)."""
+        self._unsub_throttle_flush = None
+        self._async_write_state_if_changed()
+
+    def _cancel_throttle_flush(self) -> None:
+        if self._unsub_throttle_flush:
+            self._unsub_throttle_flush()
+            self._unsub_throttle_flush = None
+
+    @callback
+    def _async_set_optimistic(self, value: Any) -> None:
+        """Show a commanded value right away; hold it until the device confirms it or the timeout expires."""
+        self._cancel_optimistic()
+        if value != self._device_value:
+            self._optimistic_value = value
+            self._optimistic_since = time.monotonic()
+            self._unsub_optimistic = async_call_later(self.hass, OPTIMISTIC_TIMEOUT, self._optimistic_timeout)
+        setattr(self, self._state_attr, value)
+        self._async_write_state_if_changed()
+
+    def _apply_device_value(self, value: Any) -> bool:
+        """Record a device-reported value; return False while it must not replace the optimistic one."""
+        self._device_value = value
+        if self._optimistic_since is None:
+            return True
+        if value != self._optimistic_value:
+            return False  # Status from before the command was applied
+        coordinator = self._coordinator
+        coordinator.command_latency.add((time.monotonic() - self._optimistic_since) * 1000)
+        coordinator.commands_confirmed += 1
+        self._cancel_optimistic()
+        return True
+
+    @callback
+    def _optimistic_timeout(self, _now: Any) -> None:
+        """The device did not confirm the command: roll back to its last reported value."""
+        self._unsub_optimistic = None
+        self._optimistic_since = None
+        self._coordinator.commands_rolled_back += 1
+        setattr(self, self._state_attr, self._device_value)
+        self._async_write_state_if_changed()
+
+    def _cancel_optimistic(self) -> None:
+        if self._unsub_optimistic:
+            self._unsub_optimistic()
+            self._unsub_optimistic = None
+        self._optimistic_since = None
@@ -0,0 +1,100 @@
+"""Freshness deadlines served by a single Home Assistant timer.
+
+Each key (the device, a sub-device, a pending removal) has a last-seen time
+and a timeout. ``touch`` only records the time, so marking something fresh
+on every message costs a dict write; the timer is armed for the earliest
+deadline in a heap. When it fires, keys that were touched in the meantime
+are re-queued for their new deadline and the rest are handed to the expiry
+callback, on time even if no further message arrives.
+"""
+import heapq
+import itertools
+import time
+from typing import Any, Callable, Hashable
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+
+class ExpiryScheduler:
+    """Sliding and one-shot deadlines keyed by name."""
+
+    def __init__(self, hass: HomeAssistant, on_expire: Callable[[Hashable], None]) -> None:
+        self.hass = hass
+        self._on_expire = on_expire
+        self._entries: dict[Hashable, list[float]] = {}  # {key: [last_seen, timeout, queued deadline]}
+        self._heap: list[tuple[float, int, Hashable]] = []
+        self._counter = itertools.count()
+        self._unsub_timer = None
+        self._armed_for: float | None = None
+
+    def touch(self, key: Hashable, now: float, timeout: float) -> None:
+        """Mark ``key`` fresh; it expires ``timeout`` seconds after the last touch."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry[0] = now
+            entry[1] = timeout
+            return
+        self._entries[key] = [now, timeout, now + timeout]
+        self._push(key, now + timeout, now)
+
+    def start(self, key: Hashable, now: float, timeout: float) -> None:
+        """Start a one-shot deadline unless one is already running for ``key``."""
+        if key not in self._entries:
+            self.touch(key, now, timeout)
+
+    def cancel(self, key: Hashable) -> None:
+        self._entries.pop(key, None)  # Its heap record is skipped when popped
+
+    def is_pending(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def pending(self, now: float) -> dict[Hashable, dict[str, float]]:
+        """Return every running deadline: seconds since the last touch and until expiry."""
+        return {
+            key: {"since": now - last_seen, "remaining": last_seen + timeout - now}
+            for key, (last_seen, timeout, _queued) in self._entries.items()
+        }
+
+    def clear(self) -> None:
+        if self._unsub_timer:
+            self._unsub_timer()
+            self._unsub_timer = None
+        self._armed_for = None
+        self._entries.clear()
+        self._heap.clear()
+
+    def _push(self, key: Hashable, deadline: float, now: float) -> None:
+        heapq.heappush(self._heap, (deadline, next(self._counter), key))
+        if self._armed_for is None or deadline < self._armed_for:
+            self._arm(now)
+
+    def _arm(self, now: float) -> None:
+        if self._unsub_timer:
+            self._unsub_timer()
+            self._unsub_timer = None
+        self._armed_for = None
+        if self._heap:
+            self._armed_for = self._heap[0][0]
+            self._unsub_timer = async_call_later(self.hass, max(self._armed_for - now, 0), self._fire)
+
+    @callback
+    def _fire(self, _now: Any) -> None:
+        self._unsub_timer = None
+        now = time.monotonic()
+        expired = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, _, key = heapq.heappop(self._heap)
+            entry = self._entries.get(key)
+            if entry is None or entry[2] != deadline:
+                continue  # Cancelled or superseded
+            due = entry[0] + entry[1]
+            if due <= now:
+                del self._entries[key]
+                expired.append(key)
+            else:
+                entry[2] = due
+                heapq.heappush(self._heap, (due, next(self._counter), key))
+        self._arm(now)
+        for key in expired:
+            self._on_expire(key)
@@ -0,0 +1,224 @@
+"""Multi-device hub for the Jackery integration.
+
+One config entry can serve several Jackery units. The hub owns the MQTT
+subscriptions, splits each topic once and hands the payload to the
+``JackeryDataCoordinator`` shard of that device SN (a dict lookup), so the
+cost per message does not grow with the number of devices. Every shard has
+its own caches, entities, energy-flow calculation and poll loop.
+
+The first configured SN is the primary device and keeps the unique IDs and
+device identifier of single-device installs; the other units get SN-based
+ones.
+
+With SNs configured, the hub subscribes to the exact
+``{prefix}/device/{sn}/status|event`` topics, so the broker never sends
+other units' traffic. Only without a configured SN does it listen on the
+``+`` wildcard; it adopts the first SN it hears from and then narrows the
+subscriptions to that SN. Topics of unknown devices are rejected (and
+counted) before any decoding.
+
+A traffic capture (see capture.py) records the raw messages here, before
+routing, for offline replay.
+"""
+import logging
+from typing import Any, Iterable
+
+from homeassistant.components import mqtt as ha_mqtt
+from homeassistant.core import HomeAssistant, callback
+
+from .capture import CAPTURE_MAX_MESSAGES, TrafficCapture
+from .sensor import JackeryDataCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+CHANNELS = ("status", "event")
+
+
+def parse_device_sns(value: Any) -> list[str]:
+    """Split the ``device_sn`` config value ("SN1, SN2" or a list) into SNs."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    sns = []
+    for sn in value:
+        sn = str(sn).strip()
+        if sn and sn not in sns:
+            sns.append(sn)
+    return sns
+
+
+class JackeryHub:
+    """Shared MQTT subscriptions and SN routing for per-device coordinators."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        topic_prefix: str,
+        token: str,
+        mqtt_host: str,
+        device_sns: Iterable[str],
+        config_entry_id: str,
+    ) -> None:
+        self.hass = hass
+        self.config_entry_id = config_entry_id
+        self._topic_root = topic_prefix
+        self._topic_device_prefix = f"{topic_prefix}/device/"
+        self._subscribed = False
+        self._subscriptions: dict[str, Any] = {}  # {topic: unsubscribe}
+        self._unsub_connection_status = None
+        self.messages_rejected = 0  # Messages from SNs without a shard, dropped before decoding
+        self.capture: TrafficCapture | None = None  # Running raw-traffic capture
+
+        self.coordinators: list[JackeryDataCoordinator] = []
+        self._shards: dict[str, JackeryDataCoordinator] = {}  # {device SN: coordinator}
+        self._discovery: JackeryDataCoordinator | None = None  # Shard waiting to adopt the first SN
+
+        for index, sn in enumerate(list(device_sns) or [None]):
+            coordinator = JackeryDataCoordinator(hass, topic_prefix, token, mqtt_host, sn, primary=index == 0)
+            coordinator.config_entry_id = config_entry_id
+            self.coordinators.append(coordinator)
+            if sn:
+                self._shards[sn] = coordinator
+            else:
+                self._discovery = coordinator
+
+    @property
+    def primary(self) -> JackeryDataCoordinator:
+        return self.coordinators[0]
+
+    async def async_start(self) -> None:
+        """Subscribe to the device topics and start every shard."""
+        if self._subscribed:
+            return
+
+        try:
+            # 订阅状态/事件主题: 已知 SN 用精确主题，未配置 SN 时用通配符发现设备
+            for sn in self._shards:
+                await self._async_subscribe_device(sn)
+            if self._discovery is not None:
+                await self._async_subscribe_device("+")
+
+            # Refresh right away when the broker connection comes back
+            self._unsub_connection_status = ha_mqtt.async_subscribe_connection_status(
+                self.hass, self._mqtt_connection_changed
+            )
+            self._subscribed = True
+        except Exception as e:
+            _LOGGER.error(f"Failed to start hub: {e}")
+            return
+
+        for coordinator in self.coordinators:
+            await coordinator.async_start()
+
+    async def async_stop(self) -> None:
+        """Unsubscribe and stop every shard."""
+        for unsubscribe in self._subscriptions.values():
+            unsubscribe()
+        self._subscriptions.clear()
+        if self._unsub_connection_status:
+            self._unsub_connection_status()
+            self._unsub_connection_status = None
+        self._subscribed = False
+        await self.async_stop_capture()
+        for coordinator in self.coordinators:
+            await coordinator.async_stop()
+
+    async def async_start_capture(self, path: str, max_messages: int = CAPTURE_MAX_MESSAGES) -> None:
+        """Record every received message to ``path`` (JSON Lines) until stopped."""
+        await self.async_stop_capture()
+        self.capture = TrafficCapture(self.hass, path, max_messages)
+        _LOGGER.info(f"Capturing MQTT traffic to {path}")
+
+    async def async_stop_capture(self) -> dict[str, Any] | None:
+        """Stop the running capture; return its path and message count."""
+        capture, self.capture = self.capture, None
+        if capture is None:
+            return None
+        return await self._async_finish_capture(capture)
+
+    async def _async_finish_capture(self, capture: TrafficCapture) -> dict[str, Any]:
+        summary = await capture.async_stop()
+        _LOGGER.info(f"MQTT capture stopped: {summary['messages']} messages in {summary['path']}")
+        return summary
+
+    async def _async_subscribe_device(self, sn: str) -> None:
+        """Subscribe to the status/event topics of one SN (or ``+``)."""
+        for channel in CHANNELS:
+            topic = f"{self._topic_device_prefix}{sn}/{channel}"
+            if topic in self._subscriptions:
+                continue
+            self._subscriptions[topic] = await ha_mqtt.async_subscribe(
+                self.hass, topic, self._message_received, 1
+            )
+            _LOGGER.info(f"Hub subscribed to: {topic}")
+
+    def _unsubscribe_device(self, sn: str) -> None:
+        for channel in CHANNELS:
+            unsubscribe = self._subscriptions.pop(f"{self._topic_device_prefix}{sn}/{channel}", None)
+            if unsubscribe:
+                unsubscribe()
+
+    async def _async_narrow_subscriptions(self, sn: str) -> None:
+        """Replace the discovery wildcard with the adopted SN's exact topics."""
+        await self._async_subscribe_device(sn)
+        self._unsubscribe_device("+")
+
+    @callback
+    def _message_received(self, msg) -> None:
+        self._handle_message(msg)
+
+    @callback
+    def _mqtt_connection_changed(self, connected: bool) -> None:
+        """Refresh all devices immediately after the MQTT client reconnects."""
+        if connected:
+            _LOGGER.debug("MQTT reconnected, refreshing device state")
+            for coordinator in self.coordinators:
+                coordinator.request_refresh()
+
+    def _route_topic(self, topic: str) -> tuple[str, str] | None:
+        """Split ``{prefix}/device/{sn}/{channel}`` into (sn, channel), or None if it is not ours."""
+        if not topic.startswith(self._topic_device_prefix):
+            return None
+        sn, sep, channel = topic[len(self._topic_device_prefix):].partition("/")
+        if not sn or not sep or channel not in CHANNELS:
+            return None
+        return sn, channel
+
+    def _handle_message(self, msg) -> None:
+        """Route an MQTT message to the shard of its device SN."""
+        topic = msg.topic
+        capture = self.capture
+        if capture is not None:
+            capture.record(topic, msg.payload)
+            if capture.full:
+                self.capture = None
+                self.hass.async_create_task(self._async_finish_capture(capture))
+
+        route = self._route_topic(topic)
+        if route is None:
+            _LOGGER.debug("Ignoring message on unexpected topic %s", topic)
+            return
+
+        sn, channel = route
+        shard = self._shards.get(sn)
+        if shard is None:
+            shard = self._adopt(sn)
+            if shard is None:
+                self.messages_rejected += 1
+                _LOGGER.debug("Rejected message from unconfigured device: %s", sn)
+                return
+        shard.handle_device_message(sn, channel, topic, msg.payload)
+
+    def _adopt(self, sn: str) -> JackeryDataCoordinator | None:
+        """Bind the discovery shard (no SN configured) to the first SN seen."""
+        shard = self._discovery
+        if shard is None:
+            return None
+        self._discovery = None
+        shard.set_device_sn(sn)
+        self._shards[sn] = shard
+        _LOGGER.info(f"Discovered device SN: {sn}")
+        if self._subscribed:
+            self.hass.async_create_task(self._async_narrow_subscriptions(sn))
+        return shard
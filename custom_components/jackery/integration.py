@@ -0,0 +1,66 @@
+"""Power -> energy integration at message time.
+
+The device reports power only for the calculated flows (home load, battery
+charge/discharge, grid) and for plugs without ``totalEgy``. Instead of HA
+``integration`` helpers re-processing every state change, the coordinator
+feeds each power sample with the device ``ts`` into an ``EnergyIntegrator``:
+
+- left Riemann sum: the previous power is held until the next sample
+  (``kWh += W * s / 3.6e6``), matching a device that reports on change;
+- negative power counts as zero, so totals only increase;
+- a sample older than the previous one is dropped, and a gap longer than
+  ``max_gap`` (device offline, broker down) adds nothing.
+
+Totals are restored from the last recorded state after a restart.
+"""
+from typing import Any
+
+MAX_GAP = 300.0  # 秒：两个样本间隔超过此值不积分（设备离线）
+
+_JOULES_PER_KWH = 3.6e6
+
+
+def to_float(value: Any) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class EnergyIntegrator:
+    """Running kWh total of one power signal (W)."""
+
+    def __init__(self, max_gap: float = MAX_GAP) -> None:
+        self._max_gap = max_gap
+        self.total = 0.0  # kWh
+        self._last_power: float | None = None
+        self._last_ts: float | None = None
+        self._restored = False
+
+    def add(self, power: float | None, ts: float) -> bool:
+        """Feed a sample taken at ``ts`` (seconds); return True if the total grew."""
+        if power is None:
+            # Signal missing (e.g. no CT): nothing to hold until it comes back
+            self._last_power = None
+            self._last_ts = None
+            return False
+        last_ts = self._last_ts
+        if last_ts is not None and ts < last_ts:
+            return False  # Out-of-order sample
+
+        grew = False
+        if last_ts is not None and self._last_power and ts - last_ts <= self._max_gap:
+            self.total += self._last_power * (ts - last_ts) / _JOULES_PER_KWH
+            grew = ts > last_ts
+        self._last_power = max(power, 0.0)
+        self._last_ts = ts
+        return grew
+
+    def restore(self, total: Any) -> bool:
+        """Continue from a restored total (kWh); only the first restore counts."""
+        total = to_float(total)
+        if self._restored or total is None or total < 0:
+            return False
+        self._restored = True
+        self.total += total  # Energy integrated before the entity was added
+        return True
@@ -8,6 +8,7 @@ from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from . import DOMAIN
+from .entity import JackeryEntity
 
 if TYPE_CHECKING:
     from .sensor import JackeryDataCoordinator
@@ -28,31 +29,29 @@ async def async_setup_entry(
     config_entry: ConfigEntry,
     async_add_entities: AddEntitiesCallback,
 ) -> None:
-    """Set up Jackery number entities."""
-    coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
-    if coordinator is None:
-        _LOGGER.warning("Coordinator not ready for numbers")
-        return
+    """Set up Jackery number entities (for every device of the hub)."""
+    hub = hass.data[DOMAIN][config_entry.entry_id]["hub"]
 
     entities = []
-    for key, cfg in NUMBERS.items():
-        entities.append(
-            JackeryMainNumber(
-                key=key,
-                name=cfg["name"],
-                min_value=cfg["min"],
-                max_value=cfg["max"],
-                step=cfg["step"],
-                coordinator=coordinator,
-                config_entry_id=config_entry.entry_id,
+    for coordinator in hub.coordinators:
+        for key, cfg in NUMBERS.items():
+            entities.append(
+                JackeryMainNumber(
+                    key=key,
+                    name=cfg["name"],
+                    min_value=cfg["min"],
+                    max_value=cfg["max"],
+                    step=cfg["step"],
+                    coordinator=coordinator,
+                    config_entry_id=config_entry.entry_id,
+                )
             )
-        )
 
     if entities:
         async_add_entities(entities)
 
 
-class JackeryMainNumber(NumberEntity):
+class JackeryMainNumber(JackeryEntity, NumberEntity):
     """Main device number (cmd=5)."""
 
     def __init__(
@@ -68,18 +67,13 @@ class JackeryMainNumber(NumberEntity):
         self._key = key
         self._coordinator = coordinator
         self._attr_name = name
-        self._attr_unique_id = f"jackery_main_{key}"
+        self._attr_unique_id = coordinator.unique_id(f"main_{key}")
         self._attr_has_entity_name = True
         self._attr_mode = NumberMode.SLIDER
         self._attr_native_min_value = min_value
         self._attr_native_max_value = max_value
         self._attr_native_step = step
-        self._attr_device_info = {
-            "identifiers": {(DOMAIN, config_entry_id)},
-            "name": "Jackery",
-            "manufacturer": "Jackery",
-            "model": "Energy Monitor",
-        }
+        self._attr_device_info = coordinator.device_info
 
     @property
     def should_poll(self) -> bool:
@@ -87,10 +81,13 @@ class JackeryMainNumber(NumberEntity):
 
     async def async_added_to_hass(self) -> None:
         await super().async_added_to_hass()
-        self._coordinator.register_sensor(f"main_number_{self._key}", self)
+        self._coordinator.register_sensor(
+            f"main_number_{self._key}", self, keys=(self._key,)
+        )
 
     async def async_will_remove_from_hass(self) -> None:
         self._coordinator.unregister_sensor(f"main_number_{self._key}")
+        self._cancel_optimistic()
         await super().async_will_remove_from_hass()
 
     def _update_from_coordinator(self, data: dict) -> None:
@@ -100,11 +97,15 @@ class JackeryMainNumber(NumberEntity):
         if val is None:
             return
         try:
-            self._attr_native_value = float(val)
-            self._attr_available = True
-            self.async_write_ha_state()
+            value = float(val)
         except (TypeError, ValueError):
-            pass
+            return
+        if not self._apply_device_value(value):
+            return
+        self._attr_native_value = value
+        self._attr_available = True
+        self._async_write_state_if_changed()
 
     async def async_set_native_value(self, value: float) -> None:
+        self._async_set_optimistic(float(int(value)))
         await self._coordinator.async_control_main_device({self._key: int(value)})
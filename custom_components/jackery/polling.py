@@ -0,0 +1,111 @@
+"""Push-aware adaptive poll scheduling for the Jackery coordinator.
+
+Polls are identified by a kind: ``25`` for the main status poll and
+``(100, dev_type)`` for sub-device polls. The scheduler
+
+- suppresses a poll when the device pushed a matching response on its own
+  (not as the reply to our last poll) within the current interval;
+- backs off exponentially while the device does not answer at all;
+- polls fast for a short while after a command or an MQTT reconnect;
+- keeps the timestamps of sent polls to report the effective poll rate.
+"""
+from collections import deque
+from typing import Hashable
+
+# A response this soon after our own poll is treated as its reply, not as a push
+REPLY_WINDOW = 3.0
+MAX_BACKOFF_EXPONENT = 5
+MAX_POLL_INTERVAL = 300.0
+BOOST_INTERVAL = 2.0
+BOOST_DURATION = 10.0
+RATE_WINDOW = 300.0
+
+
+class PollScheduler:
+    """Decide which polls are due and how long to wait until the next cycle."""
+
+    def __init__(
+        self,
+        interval: float,
+        max_interval: float = MAX_POLL_INTERVAL,
+        boost_interval: float = BOOST_INTERVAL,
+        boost_duration: float = BOOST_DURATION,
+    ) -> None:
+        self._base_interval = interval
+        self._max_interval = max_interval
+        self._boost_interval = boost_interval
+        self._boost_duration = boost_duration
+
+        self._last_poll: dict[Hashable, float] = {}
+        self._last_push: dict[Hashable, float] = {}
+        self._last_activity: float | None = None
+        self._last_cycle: float | None = None
+        self._misses = 0
+        self._boost_until = 0.0
+        self._covered: set[Hashable] = set()  # Kinds already polled for the next cycle (targeted refresh)
+        self._sent: deque[float] = deque()
+        self.polls_sent = 0
+        self.polls_suppressed = 0
+
+    def interval(self, now: float) -> float:
+        """Return the effective interval between poll cycles."""
+        if now < self._boost_until:
+            return self._boost_interval
+        backoff = 2 ** min(self._misses, MAX_BACKOFF_EXPONENT)
+        return min(self._base_interval * backoff, self._max_interval)
+
+    def note_response(self, kind: Hashable, now: float) -> None:
+        """Record a message that answers polls of ``kind``."""
+        self._last_activity = now
+        last_poll = self._last_poll.get(kind)
+        if last_poll is None or now - last_poll > REPLY_WINDOW:
+            self._last_push[kind] = now
+
+    def note_activity(self, now: float) -> None:
+        """Record any message from the device."""
+        self._last_activity = now
+
+    def boost(self, now: float) -> None:
+        """Poll fast for a while (after a command or reconnect)."""
+        self._boost_until = now + self._boost_duration
+        self._misses = 0
+
+    def cover(self, kind: Hashable) -> None:
+        """A poll of ``kind`` is being sent outside the cycle; the next cycle skips it."""
+        self._covered.add(kind)
+
+    def start_cycle(self, now: float) -> None:
+        """Update the back-off state at the start of a poll cycle."""
+        if self._last_cycle is not None:
+            if self._last_activity is None or self._last_activity < self._last_cycle:
+                self._misses += 1
+            else:
+                self._misses = 0
+        self._last_cycle = now
+
+    def is_due(self, kind: Hashable, now: float) -> bool:
+        """Return True unless ``kind`` was just polled or a pushed response for it is fresh enough."""
+        if kind in self._covered:
+            self._covered.discard(kind)
+            return False
+        if now < self._boost_until:
+            return True
+        last_push = self._last_push.get(kind)
+        if last_push is not None and now - last_push < self.interval(now):
+            self.polls_suppressed += 1
+            return False
+        return True
+
+    def note_poll_sent(self, kind: Hashable, now: float) -> None:
+        """Record a published poll."""
+        self._last_poll[kind] = now
+        self.polls_sent += 1
+        self._sent.append(now)
+        while self._sent and now - self._sent[0] > RATE_WINDOW:
+            self._sent.popleft()
+
+    def poll_rate(self, now: float) -> float:
+        """Return polls per minute over the rate window."""
+        while self._sent and now - self._sent[0] > RATE_WINDOW:
+            self._sent.popleft()
+        return len(self._sent) * 60.0 / RATE_WINDOW
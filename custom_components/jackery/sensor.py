@@ -1,29 +1,95 @@
 """Jackery Sensor Platform."""
 import asyncio
-import json
 import logging
-import random
-import re
 import time
-from typing import Any, Callable
+from collections import deque
+from functools import partial
+from typing import Any, Callable, Iterable, NamedTuple
 
 from homeassistant.components import mqtt as ha_mqtt
 from homeassistant.components.sensor import (
+    RestoreSensor,
     SensorDeviceClass,
     SensorEntity,
     SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import PERCENTAGE, UnitOfEnergy, UnitOfPower, UnitOfTemperature
+from homeassistant.const import (
+    PERCENTAGE,
+    EntityCategory,
+    UnitOfEnergy,
+    UnitOfPower,
+    UnitOfTemperature,
+    UnitOfTime,
+)
 from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-
-from . import DOMAIN
+from homeassistant.helpers.event import async_call_later
+
+from . import DOMAIN, codec, subdevice
+from .commands import CommandQueue
+from .correlation import LatencyHistogram, RequestTracker
+from .expiry import ExpiryScheduler
+from .integration import EnergyIntegrator, to_float
+from .perf import PerfStats
+from .polling import PollScheduler
+from .stats import RollingSeries
+from .throttle import StateThrottle
+from .entity import JackeryEntity
 
 _LOGGER = logging.getLogger(__name__)
 
 # 常量定义
 REQUEST_INTERVAL = 10  # 数据请求间隔（秒）
+RAW_MESSAGE_BUFFER = 50  # 条：诊断数据中保留的最近原始消息数
+POLL_RETRIES = 1  # 轮询请求超时未回复时重发次数
+DEVICE_STALE_AFTER = 60  # 秒：设备无消息后标记所有实体不可用
+SUBDEVICE_STALE_AFTER = 120  # 秒：子设备未出现在列表/统计中后标记其实体不可用
+SUBDEVICE_REMOVE_AFTER = 60  # 秒：子设备从列表中消失后删除其实体
+
+# Freshness deadline keys (see ExpiryScheduler)
+DEVICE_KEY = "device"
+STALE = "stale"
+REMOVE = "remove"
+SUBDEVICE_LIST_KEYS = frozenset(("plugs", "plug", "cts"))
+
+# Keys read by _calculate_energy_flow (plus the first CT record, see _first_ct_sn)
+ENERGY_FLOW_INPUTS = frozenset(
+    {
+        "pvPw",
+        "inOngridPw",
+        "outOngridPw",
+        "swEpsInPw",
+        "swEpsOutPw",
+        "gridBuyPw",
+        "gridSellPw",
+        "cts",
+    }
+)
+
+# Keys written by _calculate_energy_flow
+ENERGY_FLOW_OUTPUTS = (
+    "calc_home_power",
+    "calc_batt_net_power",
+    "calc_battery_charge_power",
+    "calc_battery_discharge_power",
+    "grid_available",
+    "calc_grid_net_power",
+)
+
+# Energy totals integrated from the calculated powers: {cache key: (power key, sign)}
+# The grid net power is split into import (+) and export (-)
+ENERGY_INTEGRATION = {
+    "calc_home_energy": ("calc_home_power", 1),
+    "calc_battery_charge_energy": ("calc_battery_charge_power", 1),
+    "calc_battery_discharge_energy": ("calc_battery_discharge_power", 1),
+    "calc_grid_import_energy": ("calc_grid_net_power", 1),
+    "calc_grid_export_energy": ("calc_grid_net_power", -1),
+}
+ENERGY_DIGITS = 3  # kWh decimals published for integrated totals (1 Wh)
+
+_MISSING = object()  # Sentinel for "key not present" in change detection
 
 # 传感器配置
 SENSORS = {
@@ -35,6 +101,8 @@ SENSORS = {
         "icon": "mdi:battery-50",
         "device_class": SensorDeviceClass.BATTERY,
         "state_class": SensorStateClass.MEASUREMENT,
+        "raw": True, # Reported as-is
+        "statistics": True,
     },
     "battery_charge_power": {
         "json_key": "batInPw",
@@ -59,6 +127,8 @@ SENSORS = {
         "icon": "mdi:thermometer",
         "device_class": SensorDeviceClass.TEMPERATURE,
         "state_class": SensorStateClass.MEASUREMENT,
+        "scale": 0.1, # cellTemp is 0.1 °C
+        "keep_last_on_null": True, # Like a malformed value: keep the last temperature
     },
     "battery_count": {
         "json_key": "batNum",
@@ -96,6 +166,7 @@ SENSORS = {
         "icon": "mdi:solar-power",
         "device_class": SensorDeviceClass.POWER,
         "state_class": SensorStateClass.MEASUREMENT,
+        "statistics": True,
     },
     "solar_energy": {
         "json_key": "pvEgy",
@@ -113,6 +184,7 @@ SENSORS = {
         "icon": "mdi:solar-panel",
         "device_class": SensorDeviceClass.POWER,
         "state_class": SensorStateClass.MEASUREMENT,
+        "unwrap": ("pvPw", "w", "power"), # Some firmwares report PV as a dict
     },
     "solar_energy_pv1": {
         "json_key": "pv1Egy",
@@ -130,6 +202,7 @@ SENSORS = {
         "icon": "mdi:solar-panel",
         "device_class": SensorDeviceClass.POWER,
         "state_class": SensorStateClass.MEASUREMENT,
+        "unwrap": ("pvPw", "w", "power"), # Some firmwares report PV as a dict
     },
     "solar_energy_pv2": {
         "json_key": "pv2Egy",
@@ -147,6 +220,7 @@ SENSORS = {
         "icon": "mdi:solar-panel",
         "device_class": SensorDeviceClass.POWER,
         "state_class": SensorStateClass.MEASUREMENT,
+        "unwrap": ("pvPw", "w", "power"), # Some firmwares report PV as a dict
     },
     "solar_energy_pv3": {
         "json_key": "pv3Egy",
@@ -164,6 +238,7 @@ SENSORS = {
         "icon": "mdi:solar-panel",
         "device_class": SensorDeviceClass.POWER,
         "state_class": SensorStateClass.MEASUREMENT,
+        "unwrap": ("pvPw", "w", "power"), # Some firmwares report PV as a dict
     },
     "solar_energy_pv4": {
         "json_key": "pv4Egy",
@@ -227,6 +302,7 @@ SENSORS = {
         "icon": "mdi:power-plug",
         "device_class": SensorDeviceClass.POWER,
         "state_class": SensorStateClass.MEASUREMENT,
+        "subtract_key": "swEpsInPw", # Bidirectional: output minus input
     },
     "eps_output_energy": {
         "json_key": "outEpsEgy",
@@ -313,6 +389,7 @@ SENSORS = {
         "icon": "mdi:home-lightning-bolt",
         "device_class": SensorDeviceClass.POWER,
         "state_class": SensorStateClass.MEASUREMENT,
+        "statistics": True,
     },
     "battery_net_power": {
         "json_key": "calc_batt_net_power",
@@ -345,6 +422,54 @@ SENSORS = {
         "icon": "mdi:transmission-tower",
         "device_class": SensorDeviceClass.POWER,
         "state_class": SensorStateClass.MEASUREMENT,
+        "keep_last_on_null": True, # CT data is temporarily missing
+        "statistics": True,
+    },
+    # 由计算功率积分得到的电量 (integrated at message time, restored after restart)
+    "home_energy": {
+        "json_key": "calc_home_energy",
+        "name": "Home Energy",
+        "unit": UnitOfEnergy.KILO_WATT_HOUR,
+        "icon": "mdi:home-lightning-bolt-outline",
+        "device_class": SensorDeviceClass.ENERGY,
+        "state_class": SensorStateClass.TOTAL_INCREASING,
+        "integrated": True,
+    },
+    "calc_battery_charge_energy": {
+        "json_key": "calc_battery_charge_energy",
+        "name": "Battery Charge Energy (Calc)",
+        "unit": UnitOfEnergy.KILO_WATT_HOUR,
+        "icon": "mdi:battery-charging",
+        "device_class": SensorDeviceClass.ENERGY,
+        "state_class": SensorStateClass.TOTAL_INCREASING,
+        "integrated": True,
+    },
+    "calc_battery_discharge_energy": {
+        "json_key": "calc_battery_discharge_energy",
+        "name": "Battery Discharge Energy (Calc)",
+        "unit": UnitOfEnergy.KILO_WATT_HOUR,
+        "icon": "mdi:battery-minus",
+        "device_class": SensorDeviceClass.ENERGY,
+        "state_class": SensorStateClass.TOTAL_INCREASING,
+        "integrated": True,
+    },
+    "calc_grid_import_energy": {
+        "json_key": "calc_grid_import_energy",
+        "name": "Grid Import Energy (Calc)",
+        "unit": UnitOfEnergy.KILO_WATT_HOUR,
+        "icon": "mdi:transmission-tower-import",
+        "device_class": SensorDeviceClass.ENERGY,
+        "state_class": SensorStateClass.TOTAL_INCREASING,
+        "integrated": True,
+    },
+    "calc_grid_export_energy": {
+        "json_key": "calc_grid_export_energy",
+        "name": "Grid Export Energy (Calc)",
+        "unit": UnitOfEnergy.KILO_WATT_HOUR,
+        "icon": "mdi:transmission-tower-export",
+        "device_class": SensorDeviceClass.ENERGY,
+        "state_class": SensorStateClass.TOTAL_INCREASING,
+        "integrated": True,
     },
     # 更多能量流向统计
     "ac_to_battery_energy": {
@@ -426,7 +551,7 @@ SUBDEVICE_SENSORS = {
     # 智能插座 (devType=6 or 1)
     "plug": {
         "power": {
-            "key": "outPw", # Fallback to 'power'
+            "key": "power", # Canonical: outPw, falling back to 'power'
             "name": "Power",
             "unit": UnitOfPower.WATT,
             "device_class": SensorDeviceClass.POWER,
@@ -434,19 +559,20 @@ SUBDEVICE_SENSORS = {
             "icon": "mdi:power-socket-eu",
         },
         "energy": {
-            "key": "totalEgy",
+            "key": "energy", # Canonical: totalEgy
             "name": "Energy",
             "unit": UnitOfEnergy.KILO_WATT_HOUR,
             "device_class": SensorDeviceClass.ENERGY,
             "state_class": SensorStateClass.TOTAL_INCREASING,
             "icon": "mdi:lightning-bolt",
             "scale": 0.01,
+            "integrated": True, # Plugs without totalEgy: power integrated by the coordinator
         },
     },
     # CT / Smart Meter (devType=2)
     "ct": {
         "power": {
-            "key": "phasePw", # Resolve by subType to A/B/C/Total
+            "key": "power", # Canonical: resolved by subType to A/B/C/Total
             "name": "Power",
             "unit": UnitOfPower.WATT,
             "device_class": SensorDeviceClass.POWER,
@@ -454,7 +580,7 @@ SUBDEVICE_SENSORS = {
             "icon": "mdi:current-ac",
         },
         "energy": {
-            "key": "phaseEgy", # Resolve by subType to A/B/C/Total
+            "key": "energy", # Canonical: resolved by subType to A/B/C/Total
             "name": "Energy",
             "unit": UnitOfEnergy.KILO_WATT_HOUR,
             "device_class": SensorDeviceClass.ENERGY,
@@ -465,81 +591,390 @@ SUBDEVICE_SENSORS = {
     },
 }
 
+# 诊断传感器 (读取协调器自身状态，每个轮询周期刷新)
+DIAGNOSTICS_KEY = "_diagnostics"  # Pseudo cache key the diagnostic sensors register under
+
+
+def _rtt_sensor(msg_type: int, label: str, q: int) -> dict:
+    """Diagnostic sensor for a round-trip time percentile of one request type."""
+    return {
+        "name": f"{label} RTT p{q}",
+        "unit": UnitOfTime.MILLISECONDS,
+        "icon": "mdi:timer-outline",
+        "device_class": SensorDeviceClass.DURATION,
+        "state_class": SensorStateClass.MEASUREMENT,
+        "enabled_default": q == 95,
+        "value": lambda c: _round(c.requests.percentile(msg_type, q), 1),
+    }
+
+
+def _loss_sensor(msg_type: int, label: str) -> dict:
+    """Diagnostic sensor for the share of unanswered requests of one type."""
+    return {
+        "name": f"{label} Loss Rate",
+        "unit": PERCENTAGE,
+        "icon": "mdi:lan-disconnect",
+        "state_class": SensorStateClass.MEASUREMENT,
+        "value": lambda c: _round(c.requests.loss_rate(msg_type), 1),
+    }
+
+
+def _stage_sensor(stage: str, label: str) -> dict:
+    """Disabled-by-default diagnostic sensor for the p95 time of one hot-path stage."""
+    return {
+        "name": f"{label} Time p95",
+        "unit": UnitOfTime.MILLISECONDS,
+        "icon": "mdi:timer-cog-outline",
+        "device_class": SensorDeviceClass.DURATION,
+        "state_class": SensorStateClass.MEASUREMENT,
+        "enabled_default": False,
+        "value": lambda c: _round(c.perf.percentile(stage, 95), 3),
+    }
+
+
+def _counter_sensor(name: str, icon: str, value: Callable, attributes: Callable | None = None) -> dict:
+    """Disabled-by-default diagnostic counter."""
+    return {
+        "name": name,
+        "unit": None,
+        "icon": icon,
+        "state_class": SensorStateClass.TOTAL_INCREASING,
+        "enabled_default": False,
+        "value": value,
+        "attributes": attributes,
+    }
+
+
+def _round(value: float | None, digits: int) -> float | None:
+    return None if value is None else round(value, digits)
+
+
+DIAGNOSTIC_SENSORS = {
+    "poll_rate": {
+        "name": "Poll Rate",
+        "unit": "polls/min",
+        "icon": "mdi:timer-sync-outline",
+        "state_class": SensorStateClass.MEASUREMENT,
+        "value": lambda c: round(c.poll_scheduler.poll_rate(time.monotonic()), 2),
+    },
+    "poll_interval": {
+        "name": "Poll Interval",
+        "unit": UnitOfTime.SECONDS,
+        "icon": "mdi:timer-outline",
+        "device_class": SensorDeviceClass.DURATION,
+        "state_class": SensorStateClass.MEASUREMENT,
+        "value": lambda c: c.poll_scheduler.interval(time.monotonic()),
+    },
+    # Round trips of status polls (type 25 -> 25) and sub-device polls (type 100 -> 101)
+    **{
+        f"{prefix}_rtt_p{q}": _rtt_sensor(msg_type, label, q)
+        for msg_type, prefix, label in ((25, "status", "Status"), (100, "subdevice", "Sub-device"))
+        for q in (50, 95, 99)
+    },
+    "status_loss_rate": _loss_sensor(25, "Status"),
+    "subdevice_loss_rate": _loss_sensor(100, "Sub-device"),
+    # Command -> device-confirmed state (optimistic controls)
+    "command_latency_p50": {
+        "name": "Command Latency p50",
+        "unit": UnitOfTime.MILLISECONDS,
+        "icon": "mdi:timer-check-outline",
+        "device_class": SensorDeviceClass.DURATION,
+        "state_class": SensorStateClass.MEASUREMENT,
+        "value": lambda c: _round(c.command_latency.percentile(50), 1),
+    },
+    "command_latency_p95": {
+        "name": "Command Latency p95",
+        "unit": UnitOfTime.MILLISECONDS,
+        "icon": "mdi:timer-check-outline",
+        "device_class": SensorDeviceClass.DURATION,
+        "state_class": SensorStateClass.MEASUREMENT,
+        "enabled_default": False,
+        "value": lambda c: _round(c.command_latency.percentile(95), 1),
+    },
+    "command_rollbacks": {
+        "name": "Command Rollbacks",
+        "unit": None,
+        "icon": "mdi:undo-variant",
+        "state_class": SensorStateClass.TOTAL_INCREASING,
+        "value": lambda c: c.commands_rolled_back,
+    },
+    # Hot-path instrumentation (see perf.py)
+    **{
+        f"{stage}_time_p95": _stage_sensor(stage, label)
+        for stage, label in (
+            ("parse", "Parse"),
+            ("merge", "Merge"),
+            ("energy_flow", "Energy Flow"),
+            ("integration", "Integration"),
+            ("subdevice_sync", "Sub-device Sync"),
+            ("distribute", "Distribute"),
+            ("message", "Message"),
+            ("drain", "Batch"),
+        )
+    },
+    "messages_received": _counter_sensor(
+        "Messages Received",
+        "mdi:email-arrow-left-outline",
+        lambda c: c.messages_received,
+        lambda c: {
+            "by_type": {str(msg_type): count for msg_type, count in c.perf.messages_by_type.items()},
+            "by_channel": dict(c.perf.messages_by_channel),
+            "superseded": c.messages_superseded,
+        },
+    ),
+    "state_writes": _counter_sensor("State Writes", "mdi:database-edit-outline", lambda c: c.state_writes),
+    "state_writes_suppressed": _counter_sensor(
+        "State Writes Suppressed", "mdi:database-off-outline", lambda c: c.state_writes_suppressed
+    ),
+    "state_writes_throttled": _counter_sensor(
+        "State Writes Throttled", "mdi:timer-sand", lambda c: c.throttle.throttled
+    ),
+    "slow_messages": _counter_sensor("Slow Messages", "mdi:timer-alert-outline", lambda c: c.perf.slow_messages),
+}
+
+# 滚动统计传感器 (SENSORS entries with "statistics": True and CT power; refreshed by the batch that sampled them)
+STATISTICS_KEY = "_statistics"  # Prefix of the pseudo cache keys the statistics sensors register under
+STATISTIC_FIELDS = {  # {stat: (name suffix, enabled by default)}
+    "mean": ("Mean", True),
+    "min": ("Min", True),
+    "max": ("Max", True),
+    "ewma": ("EWMA", False),
+    "p50": ("p50", False),
+    "p95": ("p95", False),
+}
+
+
+def statistics_key(series: str) -> str:
+    """Pseudo cache key marked changed when ``series`` got a sample."""
+    return f"{STATISTICS_KEY}:{series}"
+
+
+_NO_UPDATE = object()  # Returned by sensor extractors when the entity should keep its state
+
+
+class SensorExtractor(NamedTuple):
+    """A SENSORS descriptor compiled into the cache keys it reads and a value function."""
+
+    keys: tuple[str, ...]
+    extract: Callable[[dict], Any]
+
+
+def compile_sensor_extractor(config: dict) -> SensorExtractor:
+    """Compile a SENSORS descriptor into a specialized extractor.
+
+    All per-descriptor decisions (key, scale, dict unwrapping, null policy) are
+    made here once, so the per-message path is a single call.
+    """
+    json_key = config["json_key"]
+
+    subtract_key = config.get("subtract_key")
+    if subtract_key:
+        def extract_difference(data: dict) -> Any:
+            return float(data.get(json_key, 0)) - float(data.get(subtract_key, 0))
+
+        return SensorExtractor((json_key, subtract_key), extract_difference)
+
+    if config.get("raw"):
+        def extract_raw(data: dict) -> Any:
+            return data.get(json_key, _NO_UPDATE)
+
+        return SensorExtractor((json_key,), extract_raw)
+
+    scale = config.get("scale", 1)
+    keep_last_on_null = config.get("keep_last_on_null", False)
+    unwrap = config.get("unwrap")
+
+    def extract_scaled(data: dict) -> Any:
+        value = data.get(json_key, _NO_UPDATE)
+        if value is _NO_UPDATE or (value is None and keep_last_on_null):
+            return _NO_UPDATE
+        try:
+            return float(value) * scale
+        except (TypeError, ValueError):
+            # Null clears the state; a malformed value keeps the previous one (never a non-numeric state)
+            return None if value is None else _NO_UPDATE
+
+    if not unwrap:
+        return SensorExtractor((json_key,), extract_scaled)
+
+    def extract_unwrapped(data: dict) -> Any:
+        value = data.get(json_key)
+        if isinstance(value, dict):
+            for key in unwrap:
+                if key in value:
+                    return value[key]
+            return str(value)
+        return extract_scaled(data)
+
+    return SensorExtractor((json_key,), extract_unwrapped)
+
+
+def _subdevice_sns(items: Any) -> list:
+    """Return the SNs of a sub-device list, in order."""
+    if not isinstance(items, list):
+        return []
+    return [item.get("deviceSn") or item.get("sn") for item in items if isinstance(item, dict)]
+
 
 class JackeryDataCoordinator:
     """协调器：管理MQTT订阅和数据获取，供所有传感器实体共享使用."""
 
-    def __init__(self, hass: HomeAssistant, topic_prefix: str, token: str, mqtt_host: str, device_sn: str) -> None:
-        """初始化协调器."""
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        topic_prefix: str,
+        token: str,
+        mqtt_host: str,
+        device_sn: str,
+        primary: bool = True,
+    ) -> None:
+        """初始化协调器 (one per device; the JackeryHub routes messages here)."""
         self.hass = hass
         self._topic_prefix = topic_prefix
         self._token = token
         self._mqtt_host = mqtt_host
         self._device_sn = device_sn
         self._topic_root = topic_prefix
+        self.primary = primary # Primary device keeps the single-device unique IDs
+        self.config_entry_id = None
 
         self._sensors = {}  # {sensor_id: entity}
         self._data_task = None
-        self._subscribed = False
-        self._last_update_time = time.time()
+        self._started = False
 
         self._known_plugs = set() # Set of known plug SNs
-        self._subdevice_missing_since = {} # {sn: timestamp} for deletion delay
+        self._stale_sns: set[str] = set() # Sub-devices whose entities were marked unavailable
+        self._expiry = ExpiryScheduler(hass, self._on_expired) # Device/sub-device freshness and removal deadlines
         self.add_entities_callback = None # Callback to add new entities
         self.add_switch_entities_callback = None # Callback to add new switch entities
         self._data_cache = {} # Cache for merged data from status and events
+        self._subdevices: dict[str, dict] = {} # {sn: sub-device record}, shared with _data_cache lists
+
+        # Reverse index for targeted fan-out: only entities whose keys/SN changed get updated
+        self._key_index: dict[str, set[str]] = {} # {payload_key: {sensor_id}}
+        self._sn_index: dict[str, set[str]] = {} # {sub_device_sn: {sensor_id}}, the entities owned by each SN
+        self._sensor_subscriptions: dict[str, tuple[tuple[str, ...], str | None]] = {} # {sensor_id: (keys, sn)}
+        self.state_writes = 0 # State writes issued by entities
+        self.state_writes_suppressed = 0 # State writes skipped because nothing changed
+        self.throttle = StateThrottle() # Deadband/min-interval policies, set from the options flow
+        self._energy_flow_computed = False # _calculate_energy_flow has run at least once
+        self._full_refresh_pending = True # First message, and the first after going offline, refresh every entity
+
+        # Energy totals integrated from power samples at the device ts
+        self._energy_integrators = {key: EnergyIntegrator() for key in ENERGY_INTEGRATION}
+        self._plug_integrators: dict[str, EnergyIntegrator] = {} # {plug_sn: integrator}, plugs without totalEgy
+        self._batch_ts: float | None = None # Latest device ts of the parked messages
+        self._batch_seen_sns: set[str] = set() # Sub-devices reported by the batch being merged
+
+        # Rolling statistics: {sensor_id or "ct_{sn}": ring buffer of recent samples}
+        self.statistics: dict[str, RollingSeries] = {
+            sensor_id: RollingSeries() for sensor_id, cfg in SENSORS.items() if cfg.get("statistics")
+        }
+        # {sensor_id: keys whose update in a batch means a fresh sample} (calculated values: their inputs)
+        self._statistics_sources = {
+            sensor_id: ENERGY_FLOW_INPUTS | {SENSORS[sensor_id]["json_key"]}
+            if SENSORS[sensor_id]["json_key"] in ENERGY_FLOW_OUTPUTS
+            else frozenset({SENSORS[sensor_id]["json_key"]})
+            for sensor_id in self.statistics
+        }
 
-        # Topic patterns
-        self._topic_status_wildcard = f"{self._topic_root}/device/+/status"
-        self._topic_event_wildcard = f"{self._topic_root}/device/+/event"
+        # Adaptive polling
+        self.poll_scheduler = PollScheduler(REQUEST_INTERVAL)
+        self._poll_wakeup = asyncio.Event()
+
+        # Request/response correlation (messageId -> pending request, RTT statistics)
+        self.requests = RequestTracker()
+        self._unsub_request_timeout = None
+
+        # Outbound commands: debounced per target, merged, rate limited
+        self.commands = CommandQueue(hass)
+        self.command_latency = LatencyHistogram() # Command -> device-confirmed state (ms)
+        self.commands_confirmed = 0
+        self.commands_rolled_back = 0
+
+        # Ingest mailbox: parked message bodies, drained once per event-loop iteration
+        self._mailbox: dict[tuple, dict] = {} # {(sn, channel, type, sub_sn): body}
+        self._drain_scheduled = False
+        self.messages_received = 0
+        self.messages_superseded = 0
+        self.messages_processed = 0
+        self.perf = PerfStats() # Per-stage timing histograms, message counters
+        self.recent_messages: deque[tuple[float, str, bytes | str]] = deque(maxlen=RAW_MESSAGE_BUFFER) # (time, topic, raw payload), for diagnostics
+
+        # Handler tables: channel -> channel handler, body "type" -> merge handler
+        self._channel_handlers: dict[str, Callable[[str, str, str, bytes | str], None]] = {
+            "status": self._enqueue_device_payload,
+            "event": self._enqueue_device_payload,
+        }
+        self._message_handlers: dict[Any, Callable[[dict, set[str], set[str]], None]] = {
+            23: self._merge_statistics,
+            101: self._merge_subdevice_list,
+        }
 
-    def register_sensor(self, sensor_id: str, entity: "JackerySensor") -> None:
-        """注册传感器实体."""
+    def register_sensor(
+        self,
+        sensor_id: str,
+        entity: "JackerySensor",
+        keys: Iterable[str] = (),
+        sub_sn: str | None = None,
+    ) -> None:
+        """注册传感器实体.
+
+        ``keys`` are the main-cache payload keys the entity reads and ``sub_sn``
+        is the sub-device it belongs to; the entity is only updated when one of
+        them changed.
+        """
+        self.unregister_sensor(sensor_id)
+        keys = tuple(keys)
         self._sensors[sensor_id] = entity
+        self._sensor_subscriptions[sensor_id] = (keys, sub_sn)
+        for key in keys:
+            self._key_index.setdefault(key, set()).add(sensor_id)
+        if sub_sn:
+            self._sn_index.setdefault(sub_sn, set()).add(sensor_id)
+
+        # Late-registered entities would otherwise wait until their keys change again
+        if self._data_cache:
+            entity._update_from_coordinator(self._data_cache)
 
     def unregister_sensor(self, sensor_id: str) -> None:
         """注销传感器实体."""
-        if sensor_id in self._sensors:
-            del self._sensors[sensor_id]
+        entity = self._sensors.pop(sensor_id, None)
+        if entity is not None:
+            entity._cancel_throttle_flush()
+            self.throttle.forget(entity._attr_unique_id)
+        keys, sub_sn = self._sensor_subscriptions.pop(sensor_id, ((), None))
+        for key in keys:
+            subscribers = self._key_index.get(key)
+            if subscribers is not None:
+                subscribers.discard(sensor_id)
+                if not subscribers:
+                    del self._key_index[key]
+        if sub_sn and sub_sn in self._sn_index:
+            self._sn_index[sub_sn].discard(sensor_id)
+            if not self._sn_index[sub_sn]:
+                del self._sn_index[sub_sn]
 
     async def async_start(self) -> None:
-        """启动协调器."""
-        if self._subscribed:
+        """启动协调器 (the hub owns the MQTT subscriptions)."""
+        if self._started:
             return
+        self._started = True
 
-        try:
-            # 订阅状态主题 (Wildcard) 以发现设备和接收数据
-            @callback
-            def message_received(msg):
-                self._handle_message(msg)
-
-            await ha_mqtt.async_subscribe(
-                self.hass,
-                self._topic_status_wildcard,
-                message_received,
-                1
-            )
-            _LOGGER.info(f"Coordinator subscribed to: {self._topic_status_wildcard}")
-
-            # Subscribe to event topic for sub-device data (Type 101)
-            await ha_mqtt.async_subscribe(
-                self.hass,
-                self._topic_event_wildcard,
-                message_received,
-                1
-            )
-            _LOGGER.info(f"Coordinator subscribed to: {self._topic_event_wildcard}")
+        # Entities go unavailable if the device stays silent from the start
+        self._expiry.touch(DEVICE_KEY, time.monotonic(), DEVICE_STALE_AFTER)
 
-            self._subscribed = True
-
-            # 启动定时轮询
-            self._data_task = asyncio.create_task(self._periodic_data_request())
-
-        except Exception as e:
-            _LOGGER.error(f"Failed to start coordinator: {e}")
+        # 启动定时轮询
+        self._data_task = asyncio.create_task(self._periodic_data_request())
 
     async def async_stop(self) -> None:
         """停止协调器."""
+        self._started = False
+        self.commands.cancel()
+        self._expiry.clear()
+        if self._unsub_request_timeout:
+            self._unsub_request_timeout()
+            self._unsub_request_timeout = None
         if self._data_task and not self._data_task.done():
             self._data_task.cancel()
             try:
@@ -548,120 +983,324 @@ class JackeryDataCoordinator:
                 pass
         _LOGGER.info("Coordinator stopped")
 
-    def _handle_message(self, msg) -> None:
-        """处理接收到的 MQTT 消息."""
-        self._last_update_time = time.time()
+    @property
+    def device_sn(self) -> str | None:
+        return self._device_sn
+
+    def set_device_sn(self, sn: str) -> None:
+        """Bind a coordinator created without SN to the discovered device."""
+        self._device_sn = sn
+
+    def unique_id(self, suffix: str) -> str:
+        """Return the entity unique ID for this device (primary: legacy ``jackery_{suffix}``)."""
+        if self.primary:
+            return f"jackery_{suffix}"
+        return f"jackery_{self._device_sn}_{suffix}"
+
+    @property
+    def device_identifier(self) -> tuple[str, str]:
+        """Device registry identifier of this unit (primary: the config entry, as before)."""
+        if self.primary:
+            return (DOMAIN, self.config_entry_id)
+        return (DOMAIN, self._device_sn)
+
+    @property
+    def device_info(self) -> dict[str, Any]:
+        return {
+            "identifiers": {self.device_identifier},
+            "name": "Jackery" if self.primary else f"Jackery {self._device_sn}",
+            "manufacturer": "Jackery",
+            "model": "Energy Monitor",
+        }
+
+    def handle_device_message(self, sn: str, channel: str, topic: str, payload: bytes | str) -> None:
+        """处理 hub 按 SN 路由过来的 MQTT 消息."""
+        start = time.perf_counter()
+        self.recent_messages.append((time.time(), topic, payload))
+        self._expiry.touch(DEVICE_KEY, time.monotonic(), DEVICE_STALE_AFTER)
         try:
-            topic = msg.topic
-            payload = msg.payload
-            if isinstance(payload, bytes):
-                payload = payload.decode("utf-8")
-
-            # Extract device SN from topic: {prefix}/device/{sn}/status OR .../event
-            match = re.search(rf"{self._topic_root}/device/([^/]+)/(status|event)", topic)
-            if match:
-                sn = match.group(1)
-                msg_type = match.group(2) # 'status' or 'event'
-                if not self._device_sn:
-                    self._device_sn = sn
-                    _LOGGER.info(f"Discovered device SN: {self._device_sn}")
-                elif self._device_sn != sn:
-                    _LOGGER.debug(f"Received data from another device: {sn}")
+            handler = self._channel_handlers.get(channel)
+            if handler is None:
+                _LOGGER.debug("Ignoring message on unexpected topic %s", topic)
+                return
+            handler(sn, channel, topic, payload)
 
-            # Parse Payload
-            try:
-                raw_data = json.loads(payload)
-                msg_code = raw_data.get("type")
-                body = raw_data.get("body")
-                
-                # If body is missing or None, use empty dict or the raw_data itself if it looks like data
-                # But protocol says data is in body.
-                if body is None:
-                     # Some status messages might be flat? Assuming body per protocol.
-                     # If Type 101 and body is None, ignore.
-                     if msg_code == 101:
-                         return 
-                     body = {}
-                
-                # Merge logic
-                # Type 23: Statistical/Energy Data
-                if msg_code == 23 and isinstance(body, dict):
-                    device_sn_in_body = body.get("deviceSn")
-                    if device_sn_in_body == "system":
-                        # Merge into main device cache
-                        self._data_cache.update(body)
-                    else:
-                        # Find and update sub-device in cache
-                        # Search in plugs and cts
-                        for key in ["plugs", "plug", "cts"]:
-                            items = self._data_cache.get(key)
-                            if isinstance(items, list):
-                                for item in items:
-                                    if item.get("sn") == device_sn_in_body or item.get("deviceSn") == device_sn_in_body:
-                                        item.update(body)
-                                        break
-
-                # Type 101: Sub-device full data
-                elif msg_code == 101 and isinstance(body, dict):
-                    # Normalize sub-device payloads for plugs/sockets/CTs
-                    raw_plugs = body.get("plug") or body.get("plugs") or body.get("socket") or body.get("sockets") or []
-                    raw_cts = body.get("ct") or body.get("cts") or []
-
-                    current_cts = []
-                    current_plugs = []
-
-                    # Combine all sub-devices into a single list for discovery
-                    combined = []
-                    if isinstance(raw_plugs, list):
-                        for item in raw_plugs:
-                            if isinstance(item, dict) and item.get("devType") is None:
-                                item = {**item, "devType": 6}
-                            combined.append(item)
-                    if isinstance(raw_cts, list):
-                        for item in raw_cts:
-                            if isinstance(item, dict):
-                                # Some CT payloads report devType=3, subType=2; normalize to devType=2
-                                sub_type = item.get("subType")
-                                if sub_type == 2:
-                                    item = {**item, "devType": 2}
-                                elif item.get("devType") is None:
-                                    item = {**item, "devType": 2}
-                            combined.append(item)
-
-                    for item in combined:
-                        if not isinstance(item, dict):
-                            continue
-                        dt = item.get("devType")
-                        if dt == 2:
-                            current_cts.append(item)
-                        else:
-                            current_plugs.append(item)
-
-                    self._data_cache["cts"] = current_cts
-                    # Store all in "plugs" for JackeryPlugSensor to find itself by SN
-                    self._data_cache["plugs"] = combined
-                    self._data_cache["plug"] = combined  # Keep original key too
-
-                # Type 25 or Status: Main device data
-                elif isinstance(body, dict):
-                    # Merge top-level keys
-                    self._data_cache.update(body)
-
-            except json.JSONDecodeError:
-                _LOGGER.warning(f"Invalid JSON payload on {topic}")
+        except Exception as e:
+            _LOGGER.error("Error handling message: %s", e)
+
+        elapsed = time.perf_counter() - start
+        self.perf.add("message", elapsed)
+        if self.perf.note_slow(elapsed, time.monotonic()):
+            _LOGGER.warning(
+                "Handling a %d-byte message on %s blocked the event loop for %.0f ms",
+                len(payload), topic, elapsed * 1000,
+            )
+
+    def _enqueue_device_payload(self, sn: str, channel: str, topic: str, payload: bytes | str) -> None:
+        """Parse a status/event payload and park it in the ingest mailbox.
+
+        The mailbox is keyed by (SN, channel, type[, sub-device SN]). A newer
+        message supersedes an unprocessed older one: type 101 replaces it, other
+        types merge their body into it (same result as merging both in order).
+        The merged entry moves to the end of the mailbox, so the drain still
+        applies the keys in the order of their latest message.
+        """
+        self.messages_received += 1
+
+        # Parse Payload
+        start = time.perf_counter()
+        try:
+            raw_data = codec.loads(payload)
+        except ValueError:
+            _LOGGER.warning("Invalid JSON payload on %s", topic)
+            return
+        self.perf.add("parse", time.perf_counter() - start)
+
+        msg_code = raw_data.get("type")
+        body = raw_data.get("body")
+        self.perf.count_message(channel, msg_code)
+
+        # Close the matching pending request (records the round-trip time)
+        self.requests.match(msg_code, raw_data.get("messageId"), time.monotonic())
+
+        # If body is missing or None, use empty dict or the raw_data itself if it looks like data
+        # But protocol says data is in body.
+        if body is None:
+            # Some status messages might be flat? Assuming body per protocol.
+            # If Type 101 and body is None, ignore.
+            if msg_code == 101:
                 return
+            body = {}
+        if not isinstance(body, dict):
+            return
+
+        # Tell the poll scheduler which polls this message answers
+        now = time.monotonic()
+        if msg_code == 25:
+            self.poll_scheduler.note_response(25, now)
+        elif msg_code == 101:
+            if body.get("ct") or body.get("cts"):
+                self.poll_scheduler.note_response((100, 2), now)
+            if body.get("plug") or body.get("plugs") or body.get("socket") or body.get("sockets"):
+                self.poll_scheduler.note_response((100, 6), now)
+        else:
+            self.poll_scheduler.note_activity(now)
+
+        # Device timestamp for the energy integrators (local clock if the message has none)
+        ts = to_float(raw_data.get("ts"))
+        if ts is None:
+            ts = time.time()
+        if self._batch_ts is None or ts > self._batch_ts:
+            self._batch_ts = ts
+
+        key = (sn, channel, msg_code, body.get("deviceSn") if msg_code == 23 else None)
+        # Re-insert superseded entries at the end: the drain merges in message order across keys
+        pending = self._mailbox.pop(key, None)
+        if pending is None:
+            self._mailbox[key] = body
+        else:
+            self.messages_superseded += 1
+            if msg_code != 101:
+                pending.update(body)
+                body = pending
+            self._mailbox[key] = body
+
+        if not self._drain_scheduled:
+            self._drain_scheduled = True
+            self.hass.loop.call_soon(self._drain_mailbox)
+
+    @callback
+    def _drain_mailbox(self) -> None:
+        """Merge every parked message, then run calculation and distribution once for the batch."""
+        self._drain_scheduled = False
+        mailbox, self._mailbox = self._mailbox, {}
+        batch_ts, self._batch_ts = self._batch_ts, None
+        self._batch_seen_sns = set()
+
+        changed_keys: set[str] = set()
+        changed_sns: set[str] = set()
+        perf = self.perf
+        clock = time.perf_counter
+        start = clock()
+        timings: dict[str, float] = {} # This batch's stage times (s), for the slow-batch warning
+
+        # Merge logic: Type 23 statistics, Type 101 sub-devices, Type 25 / other status -> main device
+        main_bodies = [] # Bodies merged into the main-device cache (statistics sampling)
+        for (sn, channel, msg_code, sub_sn), body in mailbox.items():
+            if msg_code != 101 and sub_sn in (None, "system"):
+                main_bodies.append(body)
+            try:
+                handler = self._message_handlers.get(msg_code, self._merge_status)
+                handler(body, changed_keys, changed_sns)
+                self.messages_processed += 1
+            except Exception as e:
+                _LOGGER.error("Error merging type %s message from %s/%s: %s", msg_code, sn, channel, e)
+        mark = self._perf_stage("merge", start, timings)
 
+        try:
             # Enrich data with calculations using merged cache
             # operate on copy or direct? Direct is fine.
-            self._data_cache = self._calculate_energy_flow(self._data_cache)
-            
-            # Check for new plugs
-            self._check_for_new_plugs(self._data_cache)
-
-            self._distribute_data(self._data_cache)
+            if self._energy_flow_inputs_changed(changed_keys, changed_sns):
+                calc_before = {key: self._data_cache.get(key, _MISSING) for key in ENERGY_FLOW_OUTPUTS}
+                self._data_cache = self._calculate_energy_flow(self._data_cache)
+                self._energy_flow_computed = True
+                # Only publish the calc_* outputs that actually moved
+                for key, before in calc_before.items():
+                    if self._data_cache.get(key, _MISSING) != before:
+                        changed_keys.add(key)
+                mark = self._perf_stage("energy_flow", mark, timings)
+
+            if batch_ts is not None:
+                self._integrate_energy(batch_ts, changed_keys, changed_sns)
+                self._sample_statistics(batch_ts, changed_keys, main_bodies)
+                mark = self._perf_stage("integration", mark, timings)
+
+            # Add/remove sub-device entities when the list membership changed
+            if not changed_keys.isdisjoint(SUBDEVICE_LIST_KEYS):
+                self._check_for_new_plugs(self._data_cache)
+                mark = self._perf_stage("subdevice_sync", mark, timings)
+
+            self._distribute_data(self._data_cache, changed_keys, changed_sns)
+            mark = self._perf_stage("distribute", mark, timings)
 
         except Exception as e:
-            _LOGGER.error(f"Error handling message: {e}")
+            _LOGGER.error("Error handling message: %s", e)
+
+        elapsed = clock() - start
+        perf.add("drain", elapsed)
+        if perf.note_slow(elapsed, time.monotonic()):
+            _LOGGER.warning(
+                "Processing %d message(s) from %s blocked the event loop for %.0f ms (%s)",
+                len(mailbox), self._device_sn, elapsed * 1000,
+                ", ".join(f"{stage} {seconds * 1000:.1f} ms" for stage, seconds in timings.items()),
+            )
+
+    def _perf_stage(self, stage: str, since: float, timings: dict[str, float]) -> float:
+        """Record the time since ``since`` for ``stage``; return the new mark."""
+        now = time.perf_counter()
+        timings[stage] = now - since
+        self.perf.add(stage, now - since)
+        return now
+
+    def _merge_status(self, body: dict, changed_keys: set[str], changed_sns: set[str]) -> None:
+        """Type 25 or other status: merge top-level keys into the main device cache."""
+        self._merge_main(body, changed_keys)
+
+    def _merge_statistics(self, body: dict, changed_keys: set[str], changed_sns: set[str]) -> None:
+        """Type 23: statistical/energy data for the main device or one sub-device."""
+        device_sn_in_body = body.get("deviceSn")
+        if device_sn_in_body == "system":
+            # Merge into main device cache
+            self._merge_main(body, changed_keys)
+            return
+
+        # Update sub-device record in place (shared by plugs/cts lists)
+        item = self._subdevices.get(device_sn_in_body)
+        if item is None:
+            return
+        self._note_subdevice_seen(device_sn_in_body, changed_sns)
+        fields = subdevice.canonicalize(body)
+        if any(item.get(k, _MISSING) != v for k, v in fields.items()):
+            item.update(fields)
+            subdevice.derive(item)
+            changed_sns.add(device_sn_in_body)
+
+    def _merge_subdevice_list(self, body: dict, changed_keys: set[str], changed_sns: set[str]) -> None:
+        """Type 101: full sub-device list."""
+        # Normalize sub-device payloads for plugs/sockets/CTs
+        raw_plugs = body.get("plug") or body.get("plugs") or body.get("socket") or body.get("sockets") or []
+        raw_cts = body.get("ct") or body.get("cts") or []
+
+        current_cts = []
+        current_plugs = []
+
+        # Combine all sub-devices into a single list for discovery
+        combined = []
+        if isinstance(raw_plugs, list):
+            for item in raw_plugs:
+                if isinstance(item, dict) and item.get("devType") is None:
+                    item = {**item, "devType": 6}
+                combined.append(item)
+        if isinstance(raw_cts, list):
+            for item in raw_cts:
+                if isinstance(item, dict):
+                    # Some CT payloads report devType=3, subType=2; normalize to devType=2
+                    sub_type = item.get("subType")
+                    if sub_type == 2:
+                        item = {**item, "devType": 2}
+                    elif item.get("devType") is None:
+                        item = {**item, "devType": 2}
+                combined.append(item)
+
+        # Canonical records: fixed key names, float phase values, derived totals
+        combined = [subdevice.normalize(item) if isinstance(item, dict) else item for item in combined]
+
+        for item in combined:
+            if not isinstance(item, dict):
+                continue
+            dt = item.get("devType")
+            if dt == 2:
+                current_cts.append(item)
+            else:
+                current_plugs.append(item)
+
+        self._diff_subdevices(combined, changed_keys, changed_sns)
+        self._index_subdevices(combined)
+        for sn in _subdevice_sns(combined):
+            if sn:
+                self._note_subdevice_seen(sn, changed_sns)
+        self._data_cache["cts"] = current_cts
+        # Store all in "plugs" for JackeryPlugSensor to find itself by SN
+        self._data_cache["plugs"] = combined
+        self._data_cache["plug"] = combined  # Keep original key too
+
+    def _merge_main(self, body: dict, changed_keys: set[str]) -> None:
+        """Merge main-device keys into the cache, recording the keys whose value changed."""
+        cache = self._data_cache
+        for key, value in body.items():
+            if cache.get(key, _MISSING) != value:
+                cache[key] = value
+                changed_keys.add(key)
+
+    def _diff_subdevices(self, combined: list, changed_keys: set[str], changed_sns: set[str]) -> None:
+        """Record which sub-devices differ between the indexed records and a new type-101 list."""
+        seen = set()
+        for item in combined:
+            if not isinstance(item, dict):
+                continue
+            sn = item.get("deviceSn") or item.get("sn")
+            if not sn:
+                continue
+            seen.add(sn)
+            if self._subdevices.get(sn) != item:
+                changed_sns.add(sn)
+
+        # Sub-devices that dropped out of the list
+        changed_sns.update(sn for sn in self._subdevices if sn not in seen)
+
+        # List keys only change when membership/order changes; record contents are tracked per SN
+        if _subdevice_sns(combined) != _subdevice_sns(self._data_cache.get("plugs")):
+            changed_keys.update(("plugs", "plug"))
+        new_cts = [item for item in combined if isinstance(item, dict) and item.get("devType") == 2]
+        if _subdevice_sns(new_cts) != _subdevice_sns(self._data_cache.get("cts")):
+            changed_keys.add("cts")
+
+    def _index_subdevices(self, combined: list) -> None:
+        """Rebuild the SN -> sub-device record index from a type-101 list."""
+        index = {}
+        for item in combined:
+            if not isinstance(item, dict):
+                continue
+            # Records are reachable by either identifier; the first record wins, as with a list scan
+            for field in ("sn", "deviceSn"):
+                sn = item.get(field)
+                if sn:
+                    index.setdefault(sn, item)
+        self._subdevices = index
+
+    def get_subdevice(self, sn: str) -> dict | None:
+        """Return the cached record of a sub-device by SN."""
+        return self._subdevices.get(sn)
 
     def _check_for_new_plugs(self, data: dict) -> None:
         """检查并同步插座/CT（添加新设备，移除旧设备）."""
@@ -680,42 +1319,18 @@ class JackeryDataCoordinator:
             if sn:
                 current_sns.add(sn)
         
-        now = time.time()
+        now = time.monotonic()
 
-        # 1. 更新 missing 状态
+        # 1. 重新出现的设备取消删除; 2. 缺失的设备启动删除定时器 (到期由 _on_expired 移除)
         for sn in current_sns:
-            if sn in self._subdevice_missing_since:
+            if self._expiry.is_pending((REMOVE, sn)):
                 _LOGGER.info(f"Sub-device {sn} reappeared, cancelling deletion.")
-                del self._subdevice_missing_since[sn]
+                self._expiry.cancel((REMOVE, sn))
 
         for sn in self._known_plugs:
-            if sn not in current_sns:
-                if sn not in self._subdevice_missing_since:
-                    self._subdevice_missing_since[sn] = now
-                    _LOGGER.info(f"Sub-device {sn} missing, starting 60s deletion timer...")
-
-        # 2. 执行真正的移除
-        for sn in list(self._subdevice_missing_since.keys()):
-            if sn not in self._known_plugs:
-                del self._subdevice_missing_since[sn]
-                continue
-            
-            if sn in current_sns:
-                del self._subdevice_missing_since[sn]
-                continue
-
-            missing_time = self._subdevice_missing_since[sn]
-            if now - missing_time > 60:
-                _LOGGER.info(f"Sub-device {sn} missing for >60s. Removing.")
-                self._known_plugs.remove(sn)
-                del self._subdevice_missing_since[sn]
-                
-                # Remove entities
-                for sensor_id, entity in list(self._sensors.items()):
-                    # Match unique IDs containing the SN for sub-devices
-                    # Format: jackery_plug_{sn}_xxx or jackery_ct_{sn}_xxx or jackery_plug_{sn}_switch
-                    if f"_{sn}_" in sensor_id or sensor_id.endswith(f"_{sn}"):
-                        self.hass.async_create_task(entity.async_remove(force_remove=True))
+            if sn not in current_sns and not self._expiry.is_pending((REMOVE, sn)):
+                self._expiry.start((REMOVE, sn), now, SUBDEVICE_REMOVE_AFTER)
+                _LOGGER.info(f"Sub-device {sn} missing, starting {SUBDEVICE_REMOVE_AFTER}s deletion timer...")
 
         # 3. 处理新增
         new_entities = []
@@ -730,13 +1345,14 @@ class JackeryDataCoordinator:
                 _LOGGER.info(f"Discovered new sub-device: {sn} (Type: {dev_type})")
                 self._known_plugs.add(sn)
                 
-                if hasattr(self, "config_entry_id"):
+                if self.config_entry_id:
                     # Create Sensors defined in SUBDEVICE_SENSORS
                     sensor_group = "ct" if dev_type == 2 else "plug"
                     group_config = SUBDEVICE_SENSORS.get(sensor_group, {})
 
                     for sensor_key, sensor_cfg in group_config.items():
-                        entity = JackerySubDeviceSensor(
+                        sensor_cls = JackeryPlugEnergySensor if sensor_cfg.get("integrated") else JackerySubDeviceSensor
+                        entity = sensor_cls(
                             plug_sn=sn,
                             dev_type=dev_type,
                             sensor_key=sensor_key,
@@ -746,7 +1362,10 @@ class JackeryDataCoordinator:
                         )
                         new_entities.append(entity)
 
-                    if dev_type != 2:
+                    if dev_type == 2:
+                        for stat in STATISTIC_FIELDS:
+                            new_entities.append(JackeryCTStatisticSensor(sn, stat, self, self.config_entry_id))
+                    else:
                         from .switch import JackeryPlugSwitch
                         switch_entity = JackeryPlugSwitch(
                             plug_sn=sn,
@@ -772,41 +1391,51 @@ class JackeryDataCoordinator:
         return []
 
     async def async_control_subdevice_switch(self, plug_sn: str, dev_type: int, is_on: bool) -> None:
-        """Control sub-device switch via type 103."""
+        """Control sub-device switch via type 103 (debounced per plug)."""
         if not self._device_sn:
             _LOGGER.warning("Cannot control sub-device: device SN not discovered")
             return
 
+        record = self.get_subdevice(plug_sn) or {}
+        self.commands.submit(
+            plug_sn,
+            {"sysSwitch": 1 if is_on else 0},
+            {"sysSwitch": record.get("switch")},
+            partial(self._async_send_subdevice_switch, plug_sn, dev_type),
+            time.monotonic(),
+        )
+
+    async def _async_send_subdevice_switch(self, plug_sn: str, dev_type: int, params: dict[str, Any]) -> None:
+        """Publish a type 103 switch command."""
         action_topic = f"{self._topic_root}/device/{self._device_sn}/action"
         ts = int(time.time())
         payload = {
             "type": 103,
             "eventId": 0,
-            "messageId": random.randint(1000, 9999),
+            "messageId": None,  # Assigned by _async_publish_request
             "ts": ts,
             "body": {
                 "deviceSn": plug_sn,
                 "devType": dev_type,
-                "sysSwitch": 1 if is_on else 0,
+                **params,
             },
         }
         if self._token:
             payload["token"] = self._token
 
-        await ha_mqtt.async_publish(
-            self.hass,
-            action_topic,
-            json.dumps(payload),
-            0,
-            False
-        )
+        await self._async_publish_request(action_topic, payload)
+        self.request_refresh((100, dev_type))
 
     async def async_control_main_device(self, params: dict[str, Any]) -> None:
-        """Control main device via type 1, cmd 5."""
+        """Control main device via type 1, cmd 5 (debounced and merged with pending params)."""
         if not self._device_sn:
             _LOGGER.warning("Cannot control main device: device SN not discovered")
             return
 
+        self.commands.submit("main", params, self._data_cache, self._async_send_main_command, time.monotonic())
+
+    async def _async_send_main_command(self, params: dict[str, Any]) -> None:
+        """Publish a type 1, cmd 5 command with the merged params."""
         action_topic = f"{self._topic_root}/device/{self._device_sn}/action"
         ts = int(time.time())
         body = {"cmd": 5, "rc": 1}
@@ -814,20 +1443,30 @@ class JackeryDataCoordinator:
         payload = {
             "type": 1,
             "eventId": 3,
-            "messageId": random.randint(1000, 9999),
+            "messageId": None,  # Assigned by _async_publish_request
             "ts": ts,
             "body": body,
         }
         if self._token:
             payload["token"] = self._token
 
-        await ha_mqtt.async_publish(
-            self.hass,
-            action_topic,
-            json.dumps(payload),
-            0,
-            False
-        )
+        await self._async_publish_request(action_topic, payload)
+        self.request_refresh(25)
+
+    def _first_ct_sn(self) -> str | None:
+        """Return the SN of the CT record _calculate_energy_flow reads the grid from."""
+        cts = self._data_cache.get("cts")
+        if cts and isinstance(cts, list) and isinstance(cts[0], dict):
+            return cts[0].get("deviceSn") or cts[0].get("sn")
+        return None
+
+    def _energy_flow_inputs_changed(self, changed_keys: set[str], changed_sns: set[str]) -> bool:
+        """Return True if the energy-flow calculation has to run for this merge."""
+        if not self._energy_flow_computed:
+            return True
+        if not changed_keys.isdisjoint(ENERGY_FLOW_INPUTS):
+            return True
+        return bool(changed_sns) and self._first_ct_sn() in changed_sns
 
     def _calculate_energy_flow(self, data: dict) -> dict:
         """
@@ -870,33 +1509,13 @@ class JackeryDataCoordinator:
             
             cts = data.get("cts")
             if cts and isinstance(cts, list) and len(cts) > 0:
-                # 尝试获取第一个 CT 数据
+                # 尝试获取第一个 CT 数据 (canonical record, see subdevice.py)
+                # importPw: 总正向有功 (Grid Buy), TphasePw or A+B+C
+                # exportPw: 总负向有功 (Grid Sell), TnphasePw or A+B+C
                 ct_data = cts[0]
-                # 检查通讯状态 (如果 commState 存在且为 0 可能表示离线，视具体协议而定，这里暂定只要有数据即可)
-                # TphasePw: 总正向有功 (Grid Buy)
-                # TnphasePw: 总负向有功 (Grid Sell)
-                t_phase_pw = ct_data.get("TphasePw") or ct_data.get("tPhasePw")
-                tn_phase_pw = ct_data.get("TnphasePw") or ct_data.get("tnPhasePw")
-
-                # Fallback: if total phase missing, sum A/B/C
-                if t_phase_pw is None:
-                    a_pw = ct_data.get("AphasePw") or ct_data.get("aPhasePw") or 0
-                    b_pw = ct_data.get("BphasePw") or ct_data.get("bPhasePw") or 0
-                    c_pw = ct_data.get("CphasePw") or ct_data.get("cPhasePw") or 0
-                    if any(v is not None for v in [a_pw, b_pw, c_pw]):
-                        t_phase_pw = float(a_pw) + float(b_pw) + float(c_pw)
-
-                if tn_phase_pw is None:
-                    an_pw = ct_data.get("AnphasePw") or ct_data.get("anPhasePw") or 0
-                    bn_pw = ct_data.get("BnphasePw") or ct_data.get("bnPhasePw") or 0
-                    cn_pw = ct_data.get("CnphasePw") or ct_data.get("cnPhasePw") or 0
-                    if any(v is not None for v in [an_pw, bn_pw, cn_pw]):
-                        tn_phase_pw = float(an_pw) + float(bn_pw) + float(cn_pw)
-
-                if t_phase_pw is not None or tn_phase_pw is not None:
-                    grid_buy = float(t_phase_pw or 0)
-                    grid_sell = float(tn_phase_pw or 0)
-                    grid_available = True
+                grid_buy = float(ct_data.get("importPw") or 0)
+                grid_sell = float(ct_data.get("exportPw") or 0)
+                grid_available = True
             
             # 兼容旧逻辑或直接字段 (如果 cts 不存在)
             if not grid_available:
@@ -963,90 +1582,270 @@ class JackeryDataCoordinator:
             data["calc_grid_net_power"] = p_grid if grid_available else None
 
         except Exception as e:
-            _LOGGER.error(f"Error calculating energy flow: {e}")
+            _LOGGER.error("Error calculating energy flow: %s", e)
             
         return data
 
-    def _distribute_data(self, data: dict) -> None:
-        """分发数据给传感器."""
-        for sensor_id, entity in self._sensors.items():
-            entity._update_from_coordinator(data)
+    def _integrate_energy(self, ts: float, changed_keys: set[str], changed_sns: set[str]) -> None:
+        """Integrate the calculated powers and plug powers up to ``ts`` (device time)."""
+        data = self._data_cache
+        if self._energy_flow_computed:
+            for key, (power_key, sign) in ENERGY_INTEGRATION.items():
+                power = data.get(power_key)
+                integrator = self._energy_integrators[key]
+                if power is None:
+                    integrator.add(None, ts)
+                    continue  # e.g. no CT: publish no grid totals
+                integrator.add(sign * power, ts)
+                total = round(integrator.total, ENERGY_DIGITS)
+                if data.get(key) != total:
+                    data[key] = total
+                    changed_keys.add(key)
+
+        # Plugs that report power but no totalEgy
+        for sn in self._batch_seen_sns:
+            record = self._subdevices.get(sn)
+            if record is None or record.get("devType") == subdevice.CT_DEV_TYPE or record.get("energy") is not None:
+                continue
+            integrator = self._plug_integrators.get(sn)
+            if integrator is None:
+                integrator = self._plug_integrators[sn] = EnergyIntegrator()
+            before = round(integrator.total, ENERGY_DIGITS)
+            if integrator.add(to_float(record.get("power")), ts) and round(integrator.total, ENERGY_DIGITS) != before:
+                changed_sns.add(sn)
+
+    def _sample_statistics(self, ts: float, changed_keys: set[str], main_bodies: list[dict]) -> None:
+        """Sample the series this batch updated (CTs: those reported in it).
+
+        A main series is sampled when its source key changed or a status
+        message reported it, so batches that only carried type 101/23 data
+        add no repeated stale samples. The statistics sensors of every sampled
+        series are refreshed with this batch (``statistics_key``).
+        """
+        data = self._data_cache
+        for sensor_id, sources in self._statistics_sources.items():
+            if sources.isdisjoint(changed_keys) and not any(key in body for body in main_bodies for key in sources):
+                continue
+            cfg = SENSORS[sensor_id]
+            value = to_float(data.get(cfg["json_key"]))
+            if value is not None:
+                self.statistics[sensor_id].add(ts, value * cfg.get("scale", 1))
+                changed_keys.add(statistics_key(sensor_id))
+
+        for sn in self._batch_seen_sns:
+            record = self._subdevices.get(sn)
+            if record is None or record.get("devType") != subdevice.CT_DEV_TYPE:
+                continue
+            value = to_float(record.get("power"))
+            if value is not None:
+                key = f"ct_{sn}"
+                series = self.statistics.get(key)
+                if series is None:
+                    series = self.statistics[key] = RollingSeries()
+                series.add(ts, value)
+                changed_keys.add(statistics_key(key))
+
+    def recent_history(self, series: Iterable[str] | None = None, seconds: float | None = None) -> dict[str, Any]:
+        """Return statistics and buffered samples per series (``seconds``: only the most recent)."""
+        result = {}
+        for key in series if series is not None else self.statistics:
+            data = self.statistics.get(key)
+            if data is None:
+                continue
+            since = data.last_ts - seconds if seconds is not None and data.count else None
+            result[key] = {**data.summary(), "samples": data.samples(since)}
+        return result
+
+    def integrated_energy(self, sn: str) -> float | None:
+        """Return the integrated energy (kWh) of a plug without totalEgy."""
+        integrator = self._plug_integrators.get(sn)
+        return round(integrator.total, ENERGY_DIGITS) if integrator else None
+
+    def restore_energy(self, key: str, total: Any) -> None:
+        """Continue an integrated main-device total from its last recorded state."""
+        integrator = self._energy_integrators.get(key)
+        if integrator is None or not integrator.restore(total):
+            return
+        self._data_cache[key] = round(integrator.total, ENERGY_DIGITS)
+        for sensor_id in list(self._key_index.get(key, ())):
+            self._sensors[sensor_id]._update_from_coordinator(self._data_cache)
+
+    def restore_plug_energy(self, sn: str, total: Any) -> None:
+        """Continue a plug's integrated energy from its last recorded state."""
+        integrator = self._plug_integrators.get(sn)
+        if integrator is None:
+            integrator = self._plug_integrators[sn] = EnergyIntegrator()
+        if integrator.restore(total):
+            for sensor_id in list(self._sn_index.get(sn, ())):
+                self._sensors[sensor_id]._update_from_coordinator(self._data_cache)
+
+    def _distribute_data(self, data: dict, changed_keys: set[str], changed_sns: set[str]) -> None:
+        """分发数据给传感器 (仅更新订阅了已变化键/子设备的实体)."""
+        if self._full_refresh_pending:
+            self._full_refresh_pending = False
+            for entity in list(self._sensors.values()):
+                entity._update_from_coordinator(data)
+            return
+
+        targets: set[str] = set()
+        for key in changed_keys:
+            subscribers = self._key_index.get(key)
+            if subscribers:
+                targets.update(subscribers)
+        for sn in changed_sns:
+            subscribers = self._sn_index.get(sn)
+            if subscribers:
+                targets.update(subscribers)
+
+        for sensor_id in targets:
+            entity = self._sensors.get(sensor_id)
+            if entity is not None:
+                entity._update_from_coordinator(data)
+
+    def _note_subdevice_seen(self, sn: str, changed_sns: set[str]) -> None:
+        """Refresh a sub-device's freshness deadline; revive its entities if they were marked stale."""
+        self._expiry.touch((STALE, sn), time.monotonic(), SUBDEVICE_STALE_AFTER)
+        self._batch_seen_sns.add(sn)
+        if sn in self._stale_sns:
+            self._stale_sns.discard(sn)
+            changed_sns.add(sn)
+
+    @callback
+    def _on_expired(self, key: Any) -> None:
+        """Freshness deadline passed: device offline, sub-device stale, or sub-device removal."""
+        if key == DEVICE_KEY:
+            _LOGGER.info(f"No data from {self._device_sn} for {DEVICE_STALE_AFTER}s, marking entities unavailable")
+            self._mark_all_offline()
+            return
+        kind, sn = key
+        if kind == STALE:
+            self._mark_subdevice_offline(sn)
+        elif kind == REMOVE and sn in self._known_plugs:
+            _LOGGER.info(f"Sub-device {sn} missing for >{SUBDEVICE_REMOVE_AFTER}s. Removing.")
+            self._remove_subdevice(sn)
+
+    def _mark_subdevice_offline(self, sn: str) -> None:
+        """Mark the entities of one sub-device unavailable."""
+        self._stale_sns.add(sn)
+        for sensor_id in list(self._sn_index.get(sn, ())):
+            entity = self._sensors.get(sensor_id)
+            if entity is not None and entity.available:
+                entity._attr_available = False
+                entity._async_write_state_if_changed()
+
+    def _remove_subdevice(self, sn: str) -> None:
+        """Forget a sub-device, remove its entities and its device registry entry."""
+        self._known_plugs.discard(sn)
+        self._stale_sns.discard(sn)
+        self._expiry.cancel((STALE, sn))
+        self._plug_integrators.pop(sn, None)
+        self.statistics.pop(f"ct_{sn}", None)
+
+        # Remove entities (the SN -> entities map holds exactly this sub-device's entities)
+        for sensor_id in list(self._sn_index.get(sn, ())):
+            entity = self._sensors.get(sensor_id)
+            if entity is not None:
+                self.hass.async_create_task(entity.async_remove(force_remove=True))
+
+        # Dropping the config entry from the device deletes it (and its registry entities)
+        registry = dr.async_get(self.hass)
+        device = registry.async_get_device(identifiers={(DOMAIN, f"sub_{sn}")})
+        if device is not None and self.config_entry_id:
+            registry.async_update_device(device.id, remove_config_entry_id=self.config_entry_id)
 
     def _mark_all_offline(self) -> None:
         """Mark all entities as unavailable."""
-        for entity in self._sensors.values():
+        # Unchanged values would not reach these entities again, so refresh everything on the next message
+        self._full_refresh_pending = True
+        diagnostics = self._key_index.get(DIAGNOSTICS_KEY, ())
+        for sensor_id, entity in self._sensors.items():
+            if sensor_id in diagnostics:
+                continue  # Coordinator health stays visible while the device is offline
             if entity.available:
                 entity._attr_available = False
-                entity.async_write_ha_state()
+                entity._async_write_state_if_changed()
+
+    async def _async_publish_request(self, topic: str, payload: dict, retries: int = 0) -> None:
+        """Publish a request with a fresh messageId and track it until its reply arrives."""
+        payload["messageId"] = self.requests.next_message_id()
+        await ha_mqtt.async_publish(
+            self.hass,
+            topic,
+            codec.dumps(payload),
+            0,
+            False
+        )
+        self.requests.track(payload["type"], topic, payload, time.monotonic(), retries)
+        self._schedule_request_timeout()
+
+    def _schedule_request_timeout(self) -> None:
+        """Arm the timer for the oldest pending request (one timer at a time)."""
+        if self._unsub_request_timeout:
+            return
+        deadline = self.requests.next_deadline()
+        if deadline is None:
+            return
+        self._unsub_request_timeout = async_call_later(
+            self.hass, max(deadline - time.monotonic(), 0), self._check_request_timeouts
+        )
+
+    @callback
+    def _check_request_timeouts(self, _now: Any) -> None:
+        """Retry or count as lost the requests that got no reply in time."""
+        self._unsub_request_timeout = None
+        for request in self.requests.expire(time.monotonic()):
+            _LOGGER.debug("No reply to type %s request %s, retrying", request.msg_type, request.message_id)
+            self.hass.async_create_task(
+                self._async_publish_request(request.topic, dict(request.payload), request.retries_left - 1)
+            )
+        self._schedule_request_timeout()
+
+    def request_refresh(self, kind: Any = None) -> None:
+        """Poll fast for a short while, starting now.
+
+        With ``kind`` (after a command) that poll is sent right away and counts
+        as the next cycle's poll of ``kind``; either way the poll loop wakes up
+        and continues at the boost interval.
+        """
+        self.poll_scheduler.boost(time.monotonic())
+        if kind is not None and self._device_sn:
+            self.poll_scheduler.cover(kind)
+            self.hass.async_create_task(self._async_send_poll(kind))
+        self._poll_wakeup.set()
+
+    @callback
+    def _refresh_diagnostics(self) -> None:
+        """Update the diagnostic sensors (they read coordinator state, not the cache)."""
+        for sensor_id in list(self._key_index.get(DIAGNOSTICS_KEY, ())):
+            entity = self._sensors.get(sensor_id)
+            if entity is not None:
+                entity._update_from_coordinator(self._data_cache)
 
     async def _periodic_data_request(self) -> None:
-        """定期发送 'type: 25' 和 'type: 100' 指令."""
+        """定期发送 'type: 25' 和 'type: 100' 指令 (由 PollScheduler 自适应调度)."""
         _LOGGER.info(f"Starting periodic data polling for {self._device_sn} via {self._mqtt_host}...")
         await asyncio.sleep(2)
 
         while True:
             try:
-                if time.time() - self._last_update_time > 60:
-                    self._mark_all_offline()
-
                 if not self._device_sn:
                     _LOGGER.debug("Waiting for device SN discovery...")
                     await asyncio.sleep(5)
                     continue
 
-                # Construct Action Topic
-                action_topic = f"{self._topic_root}/device/{self._device_sn}/action"
-                ts = int(time.time())
-                
-                # 1. Poll Device Status (Type 25)
-                try:
-                    payload_25 = {
-                        "type": 25,
-                        "eventId": 0,
-                        "messageId": random.randint(1000, 9999),
-                        "ts": ts,
-                        "token": self._token,
-                        "body": None
-                    }
-
-                    await ha_mqtt.async_publish(
-                        self.hass,
-                        action_topic,
-                        json.dumps(payload_25),
-                        0,
-                        False
-                    )
-                except Exception as e:
-                    _LOGGER.warning(f"Error polling device status (Type 25): {e}")
+                self._poll_wakeup.clear()
+                self.poll_scheduler.start_cycle(time.monotonic())
+                await self._send_due_polls()
+                self._refresh_diagnostics()
 
-                # 2. Poll Sub-devices (Type 100) - CTs (2) and Plugs (6)
+                # Sleep for the effective interval, or until a command/reconnect asks for a refresh
                 try:
-                    for dev_type in [2, 6]:
-                        payload_100 = {
-                            "type": 100,
-                            "eventId": 0,
-                            "messageId": random.randint(1000, 9999),
-                            "ts": ts,
-                            "token": self._token,
-                            "body": {
-                                "devType": dev_type
-                            }
-                        }
-
-                        await ha_mqtt.async_publish(
-                            self.hass,
-                            action_topic,
-                            json.dumps(payload_100),
-                            0,
-                            False
-                        )
-                        await asyncio.sleep(0.5) # Avoid spamming too fast
-                except Exception as e:
-                    _LOGGER.warning(f"Error polling sub-devices (Type 100): {e}")
-                
-                _LOGGER.debug(f"Sent poll requests (25 & 100 [2,6]) to {action_topic}")
-
-                await asyncio.sleep(REQUEST_INTERVAL)
+                    await asyncio.wait_for(
+                        self._poll_wakeup.wait(),
+                        self.poll_scheduler.interval(time.monotonic()),
+                    )
+                except TimeoutError:
+                    pass
 
             except asyncio.CancelledError:
                 break
@@ -1054,51 +1853,96 @@ class JackeryDataCoordinator:
                 _LOGGER.error(f"Error in polling task: {e}")
                 await asyncio.sleep(REQUEST_INTERVAL)
 
+    async def _send_due_polls(self) -> None:
+        """Publish the type-25 and type-100 polls the scheduler considers due."""
+        scheduler = self.poll_scheduler
+
+        # 1. Poll Device Status (Type 25)
+        if scheduler.is_due(25, time.monotonic()):
+            try:
+                await self._async_send_poll(25)
+            except Exception as e:
+                _LOGGER.warning(f"Error polling device status (Type 25): {e}")
+
+        # 2. Poll Sub-devices (Type 100) - CTs (2) and Plugs (6)
+        try:
+            for dev_type in [2, 6]:
+                if not scheduler.is_due((100, dev_type), time.monotonic()):
+                    continue
+                await self._async_send_poll((100, dev_type))
+                await asyncio.sleep(0.5) # Avoid spamming too fast
+        except Exception as e:
+            _LOGGER.warning(f"Error polling sub-devices (Type 100): {e}")
+
+        _LOGGER.debug("Poll cycle done for %s (interval %.0fs)", self._device_sn, scheduler.interval(time.monotonic()))
+
+    async def _async_send_poll(self, kind: Any) -> None:
+        """Publish one poll: ``25`` (device status) or ``(100, devType)`` (sub-devices)."""
+        # Construct Action Topic
+        action_topic = f"{self._topic_root}/device/{self._device_sn}/action"
+        if kind == 25:
+            msg_type, body = 25, None
+        else:
+            msg_type, body = 100, {"devType": kind[1]}
+        payload = {
+            "type": msg_type,
+            "eventId": 0,
+            "messageId": None,  # Assigned by _async_publish_request
+            "ts": int(time.time()),
+            "token": self._token,
+            "body": body
+        }
+
+        await self._async_publish_request(action_topic, payload, retries=POLL_RETRIES)
+        self.poll_scheduler.note_poll_sent(kind, time.monotonic())
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
     config_entry: ConfigEntry,
     async_add_entities: AddEntitiesCallback,
 ) -> None:
-    """Set up Jackery sensors."""
-    config = config_entry.data
-    topic_prefix = config.get("topic_prefix", "hb")
-    token = config.get("token")
-    mqtt_host = config.get("mqtt_host")
-    device_sn = config.get("device_sn")
-
-    coordinator = JackeryDataCoordinator(hass, topic_prefix, token, mqtt_host, device_sn)
-    coordinator.config_entry_id = config_entry.entry_id # Assign entry_id
-    
+    """Set up Jackery sensors (for every device of the hub)."""
+    hub = hass.data[DOMAIN][config_entry.entry_id]["hub"]
+
     # Register callback for dynamic entities
     def add_entities_callback(new_entities):
         async_add_entities(new_entities)
-    coordinator.add_entities_callback = add_entities_callback
-    
-    hass.data[DOMAIN][config_entry.entry_id]["coordinator"] = coordinator
 
     entities = []
-    for sensor_id, sensor_config in SENSORS.items():
-        if sensor_config.get("json_key") is None:
-            continue
-
-        entity = JackerySensor(
-            sensor_id=sensor_id,
-            coordinator=coordinator,
-            config_entry_id=config_entry.entry_id,
-        )
-        entities.append(entity)
+    for coordinator in hub.coordinators:
+        coordinator.add_entities_callback = add_entities_callback
+
+        for sensor_id, sensor_config in SENSORS.items():
+            if sensor_config.get("json_key") is None:
+                continue
+
+            sensor_cls = JackeryIntegratedEnergySensor if sensor_config.get("integrated") else JackerySensor
+            entity = sensor_cls(
+                sensor_id=sensor_id,
+                extractor=compile_sensor_extractor(sensor_config),
+                coordinator=coordinator,
+                config_entry_id=config_entry.entry_id,
+            )
+            entities.append(entity)
+
+        for sensor_id in DIAGNOSTIC_SENSORS:
+            entities.append(JackeryDiagnosticSensor(sensor_id, coordinator, config_entry.entry_id))
+
+        for sensor_id in coordinator.statistics:
+            for stat in STATISTIC_FIELDS:
+                entities.append(JackeryStatisticSensor(sensor_id, stat, coordinator, config_entry.entry_id))
 
     async_add_entities(entities)
-    await coordinator.async_start()
 
 
-class JackerySensor(SensorEntity):
+class JackerySensor(JackeryEntity, SensorEntity):
     """Jackery Sensor."""
     # ... (Existing JackerySensor Code) ...
     def __init__(
         self,
         sensor_id: str,
+        extractor: SensorExtractor,
         coordinator: JackeryDataCoordinator,
         config_entry_id: str,
     ) -> None:
@@ -1106,21 +1950,18 @@ class JackerySensor(SensorEntity):
         self._sensor_id = sensor_id
         self._coordinator = coordinator
         self._config = SENSORS[sensor_id]
+        self._extractor = extractor
+        self._extract = extractor.extract
 
         self._attr_name = self._config["name"]
         self._attr_native_unit_of_measurement = self._config["unit"]
         self._attr_icon = self._config["icon"]
         self._attr_device_class = self._config["device_class"]
         self._attr_state_class = self._config["state_class"]
-        self._attr_unique_id = f"jackery_{sensor_id}"
+        self._attr_unique_id = coordinator.unique_id(sensor_id)
         self._attr_has_entity_name = True
 
-        self._attr_device_info = {
-            "identifiers": {(DOMAIN, config_entry_id)},
-            "name": "Jackery",
-            "manufacturer": "Jackery",
-            "model": "Energy Monitor",
-        }
+        self._attr_device_info = coordinator.device_info
 
     @property
     def should_poll(self) -> bool:
@@ -1128,7 +1969,7 @@ class JackerySensor(SensorEntity):
 
     async def async_added_to_hass(self) -> None:
         await super().async_added_to_hass()
-        self._coordinator.register_sensor(self._sensor_id, self)
+        self._coordinator.register_sensor(self._sensor_id, self, keys=self._extractor.keys)
 
     async def async_will_remove_from_hass(self) -> None:
         self._coordinator.unregister_sensor(self._sensor_id)
@@ -1136,63 +1977,174 @@ class JackerySensor(SensorEntity):
 
     def _update_from_coordinator(self, data: dict) -> None:
         """Receive data from coordinator."""
-        # Special handling for EPS Output Power (Bidirectional)
-        if self._sensor_id == "eps_output_power":
-            out_p = float(data.get("swEpsOutPw", 0))
-            in_p = float(data.get("swEpsInPw", 0))
-            self._attr_native_value = out_p - in_p
-            self._attr_available = True
-            self.async_write_ha_state()
+        value = self._extract(data)
+        if value is _NO_UPDATE:
             return
+        self._attr_native_value = value
+        self._attr_available = True
+        self._async_write_state_if_changed()
 
-        json_key = self._config.get("json_key")
-        if not json_key or json_key not in data:
-            return
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        return {
+            "device_sn": self._coordinator._device_sn,
+            "raw_key": self._config.get("json_key")
+        }
 
-        value = data[json_key]
 
-        if self._sensor_id == "grid_net_power" and value is None:
-            # Keep last value when CT data is temporarily missing
-            return
+class JackeryIntegratedEnergySensor(JackerySensor, RestoreSensor):
+    """Energy total integrated by the coordinator, continued from the last state after a restart."""
 
-        # Process specific conversions
-        if self._sensor_id == "battery_temperature":
-            # cellTemp is 0.1 C
-            try:
-                self._attr_native_value = float(value) * 0.1
-            except (TypeError, ValueError):
-                pass
-        elif self._sensor_id == "battery_soc":
-             self._attr_native_value = value
-        elif self._sensor_id.startswith("solar_power_pv") and isinstance(value, dict):
-            # Handle dictionary for PV if it occurs
-            if "pvPw" in value:
-                self._attr_native_value = value["pvPw"]
-            elif "w" in value:
-                self._attr_native_value = value["w"]
-            elif "power" in value:
-                self._attr_native_value = value["power"]
-            else:
-                self._attr_native_value = str(value)
-        else:
-            scale = self._config.get("scale", 1)
-            try:
-                self._attr_native_value = float(value) * scale
-            except (TypeError, ValueError):
-                 self._attr_native_value = value
+    async def async_added_to_hass(self) -> None:
+        # Seed the integrator before registering: the first write must already be the restored total,
+        # otherwise the recorder sees a meter reset (0 -> last state) on a TOTAL_INCREASING sensor
+        last = await self.async_get_last_sensor_data()
+        if last is not None:
+            self._coordinator.restore_energy(self._config["json_key"], last.native_value)
+        await super().async_added_to_hass()
+
+
+class JackeryDiagnosticSensor(JackeryEntity, SensorEntity):
+    """Coordinator health sensor (poll rate, interval, ...)."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
 
+    def __init__(
+        self,
+        sensor_id: str,
+        coordinator: JackeryDataCoordinator,
+        config_entry_id: str,
+    ) -> None:
+        """Initialize."""
+        self._sensor_id = sensor_id
+        self._coordinator = coordinator
+        self._config = DIAGNOSTIC_SENSORS[sensor_id]
+        self._value = self._config["value"]
+        self._attributes = self._config.get("attributes")
+
+        self._attr_name = self._config["name"]
+        self._attr_native_unit_of_measurement = self._config.get("unit")
+        self._attr_icon = self._config.get("icon")
+        self._attr_device_class = self._config.get("device_class")
+        self._attr_state_class = self._config.get("state_class")
+        self._attr_entity_registry_enabled_default = self._config.get("enabled_default", True)
+        self._attr_unique_id = coordinator.unique_id(f"diag_{sensor_id}")
+        self._attr_has_entity_name = True
+
+        self._attr_device_info = coordinator.device_info
+
+    @property
+    def should_poll(self) -> bool:
+        return False
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self._coordinator.register_sensor(f"diag_{self._sensor_id}", self, keys=(DIAGNOSTICS_KEY,))
+
+    async def async_will_remove_from_hass(self) -> None:
+        self._coordinator.unregister_sensor(f"diag_{self._sensor_id}")
+        await super().async_will_remove_from_hass()
+
+    def _update_from_coordinator(self, data: dict) -> None:
+        """Read the value from the coordinator (the cache is not used)."""
+        self._attr_native_value = self._value(self._coordinator)
+        if self._attributes is not None:
+            self._attr_extra_state_attributes = self._attributes(self._coordinator)
         self._attr_available = True
-        self.async_write_ha_state()
+        self._async_write_state_if_changed()
+
+
+class JackeryStatisticSensor(JackeryEntity, SensorEntity):
+    """Rolling statistic (mean, min, max, EWMA, percentile) of a main-device sensor."""
+
+    _sub_sn: str | None = None  # Sub-device the series belongs to (CT statistics)
+
+    def __init__(
+        self,
+        sensor_id: str,
+        stat: str,
+        coordinator: JackeryDataCoordinator,
+        config_entry_id: str,
+    ) -> None:
+        """Initialize."""
+        self._init_statistic(sensor_id, stat, coordinator, SENSORS[sensor_id])
+        self._attr_unique_id = coordinator.unique_id(f"{sensor_id}_{stat}")
+        self._attr_device_info = coordinator.device_info
+
+    def _init_statistic(self, series: str, stat: str, coordinator: JackeryDataCoordinator, config: dict) -> None:
+        self._sensor_id = series
+        self._stat = stat
+        self._coordinator = coordinator
+        suffix, enabled_default = STATISTIC_FIELDS[stat]
+
+        self._attr_name = f"{config['name']} {suffix}"
+        self._attr_native_unit_of_measurement = config["unit"]
+        self._attr_icon = "mdi:chart-bell-curve-cumulative"
+        self._attr_device_class = config["device_class"]
+        self._attr_state_class = SensorStateClass.MEASUREMENT
+        self._attr_entity_registry_enabled_default = enabled_default
+        self._attr_has_entity_name = True
+
+    @property
+    def should_poll(self) -> bool:
+        return False
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self._coordinator.register_sensor(
+            f"stat_{self._sensor_id}_{self._stat}", self, keys=(statistics_key(self._sensor_id),), sub_sn=self._sub_sn
+        )
+
+    async def async_will_remove_from_hass(self) -> None:
+        self._coordinator.unregister_sensor(f"stat_{self._sensor_id}_{self._stat}")
+        await super().async_will_remove_from_hass()
+
+    def _update_from_coordinator(self, data: dict) -> None:
+        """Read the statistic from the coordinator's ring buffer."""
+        series = self._coordinator.statistics.get(self._sensor_id)
+        self._attr_native_value = _round(series.get(self._stat), 2) if series else None
+        self._attr_available = True
+        self._async_write_state_if_changed()
 
     @property
     def extra_state_attributes(self) -> dict[str, Any]:
+        series = self._coordinator.statistics.get(self._sensor_id)
         return {
             "device_sn": self._coordinator._device_sn,
-            "raw_key": self._config.get("json_key")
+            "samples": series.count if series else 0,
         }
 
 
-class JackerySubDeviceSensor(SensorEntity):
+def _subdevice_device_info(coordinator: JackeryDataCoordinator, sn: str, dev_type: int) -> dict[str, Any]:
+    """Device registry info of a plug or CT (linked to the main unit)."""
+    device_name = "CT" if dev_type == 2 else "Plug"
+    return {
+        "identifiers": {(DOMAIN, f"sub_{sn}")},
+        "via_device": coordinator.device_identifier,
+        "name": f"Jackery {device_name} {sn}",
+        "manufacturer": "Jackery",
+        "model": f"Sub-device Type {dev_type}",
+    }
+
+
+class JackeryCTStatisticSensor(JackeryStatisticSensor):
+    """Rolling statistic of a CT's power (series ``ct_{sn}``), on the CT's device."""
+
+    def __init__(
+        self,
+        ct_sn: str,
+        stat: str,
+        coordinator: JackeryDataCoordinator,
+        config_entry_id: str,
+    ) -> None:
+        """Initialize."""
+        self._init_statistic(f"ct_{ct_sn}", stat, coordinator, SUBDEVICE_SENSORS["ct"]["power"])
+        self._sub_sn = ct_sn
+        self._attr_unique_id = f"jackery_ct_{ct_sn}_power{stat}"
+        self._attr_device_info = _subdevice_device_info(coordinator, ct_sn, 2)
+
+
+class JackerySubDeviceSensor(JackeryEntity, SensorEntity):
     """Jackery Smart Plug / CT Sub-device Sensor."""
 
     def __init__(
@@ -1230,13 +2182,7 @@ class JackerySubDeviceSensor(SensorEntity):
         self._attr_unique_id = f"jackery_{device_name.lower()}_{plug_sn}_{safe_key}"
         self._attr_has_entity_name = True
 
-        self._attr_device_info = {
-            "identifiers": {(DOMAIN, f"sub_{plug_sn}")}, 
-            "via_device": (DOMAIN, config_entry_id),
-            "name": f"Jackery {device_name} {plug_sn}",
-            "manufacturer": "Jackery",
-            "model": f"Sub-device Type {dev_type}",
-        }
+        self._attr_device_info = _subdevice_device_info(coordinator, plug_sn, dev_type)
 
     @property
     def should_poll(self) -> bool:
@@ -1245,7 +2191,7 @@ class JackerySubDeviceSensor(SensorEntity):
     async def async_added_to_hass(self) -> None:
         await super().async_added_to_hass()
         # Register with coordinator using a unique ID format
-        self._coordinator.register_sensor(self._attr_unique_id, self)
+        self._coordinator.register_sensor(self._attr_unique_id, self, sub_sn=self._plug_sn)
 
     async def async_will_remove_from_hass(self) -> None:
         self._coordinator.unregister_sensor(self._attr_unique_id)
@@ -1253,109 +2199,27 @@ class JackerySubDeviceSensor(SensorEntity):
 
     def _update_from_coordinator(self, data: dict) -> None:
         """Receive data from coordinator."""
-        if self._dev_type == 2:
-            plugs = data.get("cts")
-        else:
-            plugs = data.get("plugs") or data.get("plug")
-        if not plugs or not isinstance(plugs, list):
-            return
-
         # Find my plug data
-        my_plug = next((p for p in plugs if (p.get("sn") == self._plug_sn or p.get("deviceSn") == self._plug_sn)), None)
+        my_plug = self._coordinator.get_subdevice(self._plug_sn)
         if not my_plug:
             return
 
         # Store full raw data for attributes
         self._raw_data = dict(my_plug)
-        
-        target_key = self._sensor_config.get("key")
-        val = my_plug.get(target_key)
-
-        # CT phase mapping by subType (1=A, 2=B, 3=C, 4=Total)
-        if self._dev_type == 2 and target_key in {"phasePw", "phaseEgy"}:
-            sub_type = my_plug.get("subType")
-            if target_key == "phasePw":
-                if sub_type == 1:
-                    val = my_plug.get("AphasePw") or my_plug.get("aPhasePw")
-                elif sub_type == 2:
-                    val = my_plug.get("BphasePw") or my_plug.get("bPhasePw")
-                elif sub_type == 3:
-                    # C 相（单相：A+B 路）
-                    val = my_plug.get("CphasePw") or my_plug.get("cPhasePw")
-                    if not val:
-                        a_pw = my_plug.get("AphasePw") or my_plug.get("aPhasePw") or 0
-                        b_pw = my_plug.get("BphasePw") or my_plug.get("bPhasePw") or 0
-                        if any(v is not None for v in [a_pw, b_pw]):
-                            val = float(a_pw) + float(b_pw)
-                else:
-                    val = my_plug.get("TphasePw") or my_plug.get("tPhasePw")
-            else:
-                if sub_type == 1:
-                    val = my_plug.get("AphaseEgy") or my_plug.get("aPhaseEgy")
-                elif sub_type == 2:
-                    val = my_plug.get("BphaseEgy") or my_plug.get("bPhaseEgy")
-                elif sub_type == 3:
-                    # C 相（单相：A+B 路）
-                    val = my_plug.get("CphaseEgy") or my_plug.get("cPhaseEgy")
-                    if not val:
-                        a_egy = my_plug.get("AphaseEgy") or my_plug.get("aPhaseEgy") or 0
-                        b_egy = my_plug.get("BphaseEgy") or my_plug.get("bPhaseEgy") or 0
-                        if any(v is not None for v in [a_egy, b_egy]):
-                            val = float(a_egy) + float(b_egy)
-                else:
-                    val = my_plug.get("TphaseEgy") or my_plug.get("tPhaseEgy")
-                # If subtype energy is zero/None but total is non-zero, fall back to the single non-zero phase
-                if not val:
-                    total_egy = my_plug.get("TphaseEgy") or my_plug.get("tPhaseEgy")
-                    if total_egy:
-                        a_egy = my_plug.get("AphaseEgy") or my_plug.get("aPhaseEgy") or 0
-                        b_egy = my_plug.get("BphaseEgy") or my_plug.get("bPhaseEgy") or 0
-                        c_egy = my_plug.get("CphaseEgy") or my_plug.get("cPhaseEgy") or 0
-                        non_zero = [v for v in [a_egy, b_egy, c_egy] if v]
-                        if len(non_zero) == 1:
-                            val = non_zero[0]
-        
-        # Fallback logic for specific keys if needed (like Power)
+
+        # Canonical field selected at ingest (see subdevice.py)
+        val = my_plug.get(self._sensor_config["key"])
+        scale = self._sensor_config.get("scale", 1)
+        if val is None and self._sensor_config.get("integrated"):
+            # No totalEgy: use the energy integrated from the plug power (kWh)
+            val = self._coordinator.integrated_energy(self._plug_sn)
+            scale = 1
         if val is None:
-             if target_key == "outPw":
-                 val = my_plug.get("power")
-             elif target_key == "TphasePw":
-                 # Accept alternate key casing and sum phase powers if needed
-                 val = my_plug.get("tPhasePw")
-                 if val is None:
-                     a_pw = my_plug.get("AphasePw") or my_plug.get("aPhasePw") or 0
-                     b_pw = my_plug.get("BphasePw") or my_plug.get("bPhasePw") or 0
-                     c_pw = my_plug.get("CphasePw") or my_plug.get("cPhasePw") or 0
-                     if any(v is not None for v in [a_pw, b_pw, c_pw]):
-                         val = float(a_pw) + float(b_pw) + float(c_pw)
-             elif target_key == "TphaseEgy":
-                 # Total forward active energy
-                 val = my_plug.get("tPhaseEgy")
-                 if val is None:
-                     a_egy = my_plug.get("AphaseEgy") or my_plug.get("aPhaseEgy") or 0
-                     b_egy = my_plug.get("BphaseEgy") or my_plug.get("bPhaseEgy") or 0
-                     c_egy = my_plug.get("CphaseEgy") or my_plug.get("cPhaseEgy") or 0
-                     if any(v is not None for v in [a_egy, b_egy, c_egy]):
-                         val = float(a_egy) + float(b_egy) + float(c_egy)
-             elif target_key == "TnphaseEgy":
-                 # Total reverse active energy
-                 val = my_plug.get("tnPhaseEgy")
-                 if val is None:
-                     an_egy = my_plug.get("AnphaseEgy") or my_plug.get("anPhaseEgy") or 0
-                     bn_egy = my_plug.get("BnphaseEgy") or my_plug.get("bnPhaseEgy") or 0
-                     cn_egy = my_plug.get("CnphaseEgy") or my_plug.get("cnPhaseEgy") or 0
-                     if any(v is not None for v in [an_egy, bn_egy, cn_egy]):
-                         val = float(an_egy) + float(bn_egy) + float(cn_egy)
-        
-        if val is not None:
-            try:
-                native_val = float(val)
-                scale = self._sensor_config.get("scale", 1)
-                self._attr_native_value = native_val * scale
-                self._attr_available = True
-                self.async_write_ha_state()
-            except (TypeError, ValueError):
-                pass
+            return
+
+        self._attr_native_value = val * scale
+        self._attr_available = True
+        self._async_write_state_if_changed()
 
     @property
     def extra_state_attributes(self) -> dict[str, Any]:
@@ -1382,3 +2246,15 @@ class JackerySubDeviceSensor(SensorEntity):
             "tPhaseEgy": raw.get("tPhaseEgy"),
             "tnPhaseEgy": raw.get("tnPhaseEgy"),
         }
+
+
+class JackeryPlugEnergySensor(JackerySubDeviceSensor, RestoreSensor):
+    """Plug energy sensor; the integrated total (plugs without totalEgy) survives restarts."""
+
+    async def async_added_to_hass(self) -> None:
+        # Seed the integrator before registering: the first write must already be the restored total,
+        # otherwise the recorder sees a meter reset (0 -> last state) on a TOTAL_INCREASING sensor
+        last = await self.async_get_last_sensor_data()
+        if last is not None:
+            self._coordinator.restore_plug_energy(self._plug_sn, last.native_value)
+        await super().async_added_to_hass()
@@ -0,0 +1,104 @@
+"""Jackery services."""
+import time
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.helpers import config_validation as cv
+
+from . import DOMAIN
+from .capture import CAPTURE_MAX_MESSAGES
+
+SERVICE_GET_RECENT_HISTORY = "get_recent_history"
+SERVICE_START_CAPTURE = "start_capture"
+SERVICE_STOP_CAPTURE = "stop_capture"
+
+ATTR_DEVICE_SN = "device_sn"
+ATTR_SERIES = "series"
+ATTR_SECONDS = "seconds"
+ATTR_MAX_MESSAGES = "max_messages"
+
+GET_RECENT_HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_DEVICE_SN): cv.string,
+        vol.Optional(ATTR_SERIES): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_SECONDS): vol.All(vol.Coerce(float), vol.Range(min=0)),
+    }
+)
+
+START_CAPTURE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_MAX_MESSAGES, default=CAPTURE_MAX_MESSAGES): vol.All(vol.Coerce(int), vol.Range(min=1)),
+    }
+)
+
+
+def _hubs(hass: HomeAssistant) -> list:
+    return [entry_data["hub"] for entry_data in hass.data.get(DOMAIN, {}).values() if entry_data.get("hub")]
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the integration services (once for all config entries)."""
+    if hass.services.has_service(DOMAIN, SERVICE_GET_RECENT_HISTORY):
+        return
+
+    async def async_get_recent_history(call: ServiceCall) -> ServiceResponse:
+        """Return the coordinators' rolling statistics and recent samples (no recorder query)."""
+        device_sn = call.data.get(ATTR_DEVICE_SN)
+        devices = {}
+        for hub in _hubs(hass):
+            for coordinator in hub.coordinators:
+                if device_sn and coordinator.device_sn != device_sn:
+                    continue
+                devices[coordinator.device_sn or "unknown"] = coordinator.recent_history(
+                    call.data.get(ATTR_SERIES), call.data.get(ATTR_SECONDS)
+                )
+        return {"devices": devices}
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_RECENT_HISTORY,
+        async_get_recent_history,
+        schema=GET_RECENT_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    async def async_start_capture(call: ServiceCall) -> ServiceResponse:
+        """Record the raw MQTT traffic of every config entry to a JSON Lines file in the config dir."""
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        captures = []
+        for hub in _hubs(hass):
+            path = hass.config.path(f"jackery_capture_{hub.config_entry_id}_{stamp}.jsonl")
+            await hub.async_start_capture(path, call.data[ATTR_MAX_MESSAGES])
+            captures.append({"path": path})
+        return {"captures": captures} if call.return_response else None
+
+    async def async_stop_capture(call: ServiceCall) -> ServiceResponse:
+        """Stop the running captures and flush them to disk."""
+        captures = []
+        for hub in _hubs(hass):
+            summary = await hub.async_stop_capture()
+            if summary is not None:
+                captures.append(summary)
+        return {"captures": captures} if call.return_response else None
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_START_CAPTURE,
+        async_start_capture,
+        schema=START_CAPTURE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_STOP_CAPTURE,
+        async_stop_capture,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+
+def async_unload_services(hass: HomeAssistant) -> None:
+    """Remove the services after the last config entry is unloaded."""
+    if not hass.data.get(DOMAIN):
+        for service in (SERVICE_GET_RECENT_HISTORY, SERVICE_START_CAPTURE, SERVICE_STOP_CAPTURE):
+            hass.services.async_remove(DOMAIN, service)
@@ -0,0 +1,209 @@
+"""Rolling statistics over recent samples, kept by the coordinator.
+
+Each tracked series (solar power, home power, battery SOC, grid net power,
+CT powers) stores its last ``capacity`` samples in two ``array('d')`` ring
+buffers (device ts, value). Every sample updates in O(1) (amortized):
+
+- window mean (running sum; re-summed once per wrap to cancel float drift);
+- window min/max (monotonic deques of (sequence, value));
+- time-weighted EWMA (``alpha = 1 - exp(-dt / tau)``);
+- p50/p95 with P² estimators (five markers each). The estimators cover
+  tumbling blocks of ``capacity`` samples; the published percentile blends
+  the last complete block with the current one, weighted by how full the
+  current block is, so it follows the window (like the mean) on every
+  sample instead of jumping once per block.
+
+The ring buffers also serve the ``get_recent_history`` service, so recent
+high-resolution history does not need the recorder.
+"""
+import math
+from array import array
+from bisect import bisect_right, insort
+from collections import deque
+from typing import Any
+
+STATS_CAPACITY = 720  # 每个序列保留的样本数 (~1 h at one message per 5 s)
+EWMA_TAU = 300.0  # 秒：EWMA 时间常数
+STATS_QUANTILES = (50, 95)
+
+
+class P2Quantile:
+    """P² streaming estimator of one quantile (Jain & Chlamtac, 1985)."""
+
+    def __init__(self, q: float) -> None:
+        self.q = q / 100
+        self.count = 0
+        self._heights: list[float] = []
+        self._positions = [1.0, 2.0, 3.0, 4.0, 5.0]
+        p = self.q
+        self._desired = [1.0, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5.0]
+        self._increments = (0.0, p / 2, p, (1 + p) / 2, 1.0)
+
+    def add(self, x: float) -> None:
+        self.count += 1
+        h = self._heights
+        if len(h) < 5:
+            insort(h, x)
+            return
+
+        n = self._positions
+        if x < h[0]:
+            h[0] = x
+            k = 0
+        elif x >= h[4]:
+            h[4] = x
+            k = 3
+        else:
+            k = bisect_right(h, x) - 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+
+        # Move the middle markers toward their desired positions
+        for i in (1, 2, 3):
+            d = self._desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                step = 1 if d > 0 else -1
+                height = h[i] + step / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + step) * (h[i + 1] - h[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - step) * (h[i] - h[i - 1]) / (n[i] - n[i - 1])
+                )
+                if not h[i - 1] < height < h[i + 1]:
+                    height = h[i] + step * (h[i + step] - h[i]) / (n[i + step] - n[i])
+                h[i] = height
+                n[i] += step
+
+    def value(self) -> float | None:
+        h = self._heights
+        if not h:
+            return None
+        if self.count < 5:
+            return h[round((len(h) - 1) * self.q)]  # Exact while fewer than five samples
+        return h[2]
+
+
+class RollingSeries:
+    """Ring buffer of (ts, value) samples plus O(1) rolling statistics."""
+
+    def __init__(
+        self,
+        capacity: int = STATS_CAPACITY,
+        tau: float = EWMA_TAU,
+        quantiles: tuple[int, ...] = STATS_QUANTILES,
+    ) -> None:
+        self._capacity = capacity
+        self._tau = tau
+        self._ts = array("d", bytes(8 * capacity))
+        self._values = array("d", bytes(8 * capacity))
+        self._next = 0  # Slot written by the next sample
+        self.count = 0  # Samples in the buffer
+        self._seq = 0  # Samples ever added
+        self._sum = 0.0
+        self._min: deque[tuple[int, float]] = deque()
+        self._max: deque[tuple[int, float]] = deque()
+        self.ewma: float | None = None
+        self._ewma_ts: float | None = None
+        self._quantiles = quantiles
+        self._sketches = {q: P2Quantile(q) for q in quantiles}
+        self._block_percentiles: dict[int, float | None] = {}  # Last complete block
+
+    def add(self, ts: float, value: float) -> None:
+        slot = self._next
+        if self.count == self._capacity:
+            self._sum -= self._values[slot]
+        else:
+            self.count += 1
+        self._ts[slot] = ts
+        self._values[slot] = value
+        self._next = (slot + 1) % self._capacity
+        self._sum += value
+
+        seq = self._seq
+        self._seq += 1
+        if self._seq % self._capacity == 0:
+            self._sum = math.fsum(self._values[: self.count])
+
+        oldest = seq - self._capacity
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((seq, value))
+        if self._max[0][0] <= oldest:
+            self._max.popleft()
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((seq, value))
+        if self._min[0][0] <= oldest:
+            self._min.popleft()
+
+        if self.ewma is None:
+            self.ewma = value
+        else:
+            dt = max(ts - self._ewma_ts, 0.0)
+            self.ewma += (1 - math.exp(-dt / self._tau)) * (value - self.ewma)
+        self._ewma_ts = ts
+
+        for sketch in self._sketches.values():
+            sketch.add(value)
+        if self._seq % self._capacity == 0:
+            self._block_percentiles = {q: s.value() for q, s in self._sketches.items()}
+            self._sketches = {q: P2Quantile(q) for q in self._quantiles}
+
+    @property
+    def last(self) -> float | None:
+        return self._values[self._next - 1] if self.count else None
+
+    @property
+    def last_ts(self) -> float | None:
+        return self._ts[self._next - 1] if self.count else None
+
+    @property
+    def mean(self) -> float | None:
+        return self._sum / self.count if self.count else None
+
+    @property
+    def min(self) -> float | None:
+        return self._min[0][1] if self._min else None
+
+    @property
+    def max(self) -> float | None:
+        return self._max[0][1] if self._max else None
+
+    def percentile(self, q: int) -> float | None:
+        sketch = self._sketches.get(q)
+        current = sketch.value() if sketch else None
+        previous = self._block_percentiles.get(q)
+        if previous is None or current is None:
+            return current if previous is None else previous
+        return previous + (current - previous) * sketch.count / self._capacity
+
+    def get(self, name: str) -> float | None:
+        """Return one statistic by name ("mean", "min", "max", "ewma", "p50", ...)."""
+        if name.startswith("p") and name[1:].isdigit():
+            return self.percentile(int(name[1:]))
+        return getattr(self, name)
+
+    def samples(self, since: float | None = None) -> list[list[float]]:
+        """Return the buffered samples as [ts, value], oldest first."""
+        start = self._next if self.count == self._capacity else 0
+        result = []
+        for offset in range(self.count):
+            slot = (start + offset) % self._capacity
+            ts = self._ts[slot]
+            if since is None or ts >= since:
+                result.append([ts, self._values[slot]])
+        return result
+
+    def summary(self) -> dict[str, Any]:
+        """Return the current statistics as a plain dict."""
+        result = {
+            "count": self.count,
+            "last": self.last,
+            "mean": self.mean,
+            "min": self.min,
+            "max": self.max,
+            "ewma": self.ewma,
+        }
+        for q in self._quantiles:
+            result[f"p{q}"] = self.percentile(q)
+        return result
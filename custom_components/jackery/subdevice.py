@@ -0,0 +1,99 @@
+"""Canonical schema for Jackery sub-device (plug / CT) records.
+
+Firmwares spell CT fields in two ways (``AphasePw`` / ``aPhasePw``,
+``TnphaseEgy`` / ``tnPhaseEgy`` ...). Records are normalized once when a
+type-101 or type-23 message is merged:
+
+- every phase field is stored under its capitalized name as a float;
+- CT records get ``importPw`` / ``exportPw`` totals (falling back to the
+  phase sums) and the ``power`` / ``energy`` value selected by ``subType``;
+- plug records get ``power`` (``outPw``, else ``power``), ``energy``
+  (``totalEgy``) and ``switch`` (``sysSwitch``, else ``switchSta``).
+
+Entities and the energy-flow calculation then read these fields directly.
+The original keys are kept for the entity attributes.
+"""
+from typing import Any
+
+CT_DEV_TYPE = 2
+
+# Canonical name -> alternate spelling
+_PHASE_FIELDS = {
+    f"{phase}{direction}phase{quantity}": f"{phase.lower()}{direction}Phase{quantity}"
+    for phase in "ABCT"
+    for direction in ("", "n")
+    for quantity in ("Pw", "Egy")
+}
+
+# Keys derived from other fields; recomputed after every merge
+DERIVED_FIELDS = ("importPw", "exportPw", "power", "energy", "switch")
+
+
+def _to_float(value: Any) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def canonicalize(fields: dict) -> dict:
+    """Return ``fields`` with phase values under their canonical names as floats."""
+    record = dict(fields)
+    for canonical, alternate in _PHASE_FIELDS.items():
+        value = fields.get(canonical)
+        if value is None:
+            value = fields.get(alternate)
+        if value is not None:
+            record[canonical] = _to_float(value)
+    return record
+
+
+def _phase_sum(record: dict, direction: str, quantity: str, phases: str = "ABC") -> float:
+    return sum(record.get(f"{phase}{direction}phase{quantity}") or 0.0 for phase in phases)
+
+
+def _ct_phase_value(record: dict, quantity: str) -> float | None:
+    """Select the CT value by subType (1=A, 2=B, 3=C, other=Total)."""
+    sub_type = record.get("subType")
+    if sub_type == 1:
+        return record.get(f"Aphase{quantity}")
+    if sub_type == 2:
+        return record.get(f"Bphase{quantity}")
+    if sub_type == 3:
+        # C 相（单相：A+B 路）
+        return record.get(f"Cphase{quantity}") or _phase_sum(record, "", quantity, "AB")
+    return record.get(f"Tphase{quantity}")
+
+
+def derive(record: dict) -> dict:
+    """Recompute the derived fields of a canonicalized record in place."""
+    if record.get("devType") == CT_DEV_TYPE:
+        total = record.get("TphasePw")
+        record["importPw"] = total if total is not None else _phase_sum(record, "", "Pw")
+        total = record.get("TnphasePw")
+        record["exportPw"] = total if total is not None else _phase_sum(record, "n", "Pw")
+        record["power"] = _ct_phase_value(record, "Pw")
+
+        energy = _ct_phase_value(record, "Egy")
+        # If subtype energy is zero/None but total is non-zero, fall back to the single non-zero phase
+        if not energy and record.get("TphaseEgy"):
+            non_zero = [v for v in (record.get(f"{p}phaseEgy") for p in "ABC") if v]
+            if len(non_zero) == 1:
+                energy = non_zero[0]
+        record["energy"] = energy
+    else:
+        power = record.get("outPw")
+        if power is None:
+            power = record.get("power")
+        record["power"] = _to_float(power)
+        record["energy"] = _to_float(record.get("totalEgy"))
+        switch = record.get("sysSwitch")
+        if switch is None:
+            switch = record.get("switchSta")
+        record["switch"] = switch
+    return record
+
+
+def normalize(item: dict) -> dict:
+    """Return a new canonical record for a raw sub-device payload."""
+    return derive(canonicalize(item))
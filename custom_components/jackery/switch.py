@@ -8,6 +8,7 @@ from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from . import DOMAIN
+from .entity import JackeryEntity
 
 if TYPE_CHECKING:
     from .sensor import JackeryDataCoordinator
@@ -20,60 +21,60 @@ async def async_setup_entry(
     config_entry: ConfigEntry,
     async_add_entities: AddEntitiesCallback,
 ) -> None:
-    """Set up Jackery switches."""
-    coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
-    if coordinator is None:
-        _LOGGER.warning("Coordinator not ready for switches")
-        return
+    """Set up Jackery switches (for every device of the hub)."""
+    hub = hass.data[DOMAIN][config_entry.entry_id]["hub"]
 
     # Register callback for dynamic switch entities
     def add_switch_entities_callback(new_entities):
         async_add_entities(new_entities)
-    coordinator.add_switch_entities_callback = add_switch_entities_callback
 
     entities = []
-
-    # Main device switches
-    entities.extend(
-        [
-            JackeryMainSwitch(
-                key="isAutoStandby",
-                name="Auto Standby Allowed",
-                coordinator=coordinator,
-                config_entry_id=config_entry.entry_id,
-            ),
-            JackeryMainSwitch(
-                key="swEps",
-                name="EPS Switch",
-                coordinator=coordinator,
-                config_entry_id=config_entry.entry_id,
-            ),
-        ]
-    )
-
-    # Add any existing sub-devices as switches (non-CT)
-    for item in coordinator.get_subdevices():
-        sn = item.get("deviceSn") or item.get("sn")
-        dev_type = item.get("devType")
-        if dev_type is None and item.get("subType") == 2:
-            dev_type = 2
-        if sn and dev_type != 2:
-            entities.append(
-                JackeryPlugSwitch(
-                    plug_sn=sn,
-                    dev_type=dev_type,
+    for coordinator in hub.coordinators:
+        coordinator.add_switch_entities_callback = add_switch_entities_callback
+
+        # Main device switches
+        entities.extend(
+            [
+                JackeryMainSwitch(
+                    key="isAutoStandby",
+                    name="Auto Standby Allowed",
+                    coordinator=coordinator,
+                    config_entry_id=config_entry.entry_id,
+                ),
+                JackeryMainSwitch(
+                    key="swEps",
+                    name="EPS Switch",
                     coordinator=coordinator,
                     config_entry_id=config_entry.entry_id,
+                ),
+            ]
+        )
+
+        # Add any existing sub-devices as switches (non-CT)
+        for item in coordinator.get_subdevices():
+            sn = item.get("deviceSn") or item.get("sn")
+            dev_type = item.get("devType")
+            if dev_type is None and item.get("subType") == 2:
+                dev_type = 2
+            if sn and dev_type != 2:
+                entities.append(
+                    JackeryPlugSwitch(
+                        plug_sn=sn,
+                        dev_type=dev_type,
+                        coordinator=coordinator,
+                        config_entry_id=config_entry.entry_id,
+                    )
                 )
-            )
 
     if entities:
         async_add_entities(entities)
 
 
-class JackeryPlugSwitch(SwitchEntity):
+class JackeryPlugSwitch(JackeryEntity, SwitchEntity):
     """Jackery Smart Plug Switch."""
 
+    _state_attr = "_attr_is_on"
+
     def __init__(
         self,
         plug_sn: str,
@@ -93,7 +94,7 @@ class JackeryPlugSwitch(SwitchEntity):
 
         self._attr_device_info = {
             "identifiers": {(DOMAIN, f"sub_{plug_sn}")},
-            "via_device": (DOMAIN, config_entry_id),
+            "via_device": coordinator.device_identifier,
             "name": f"Jackery Plug {plug_sn}",
             "manufacturer": "Jackery",
             "model": f"Sub-device Type {dev_type}",
@@ -105,33 +106,34 @@ class JackeryPlugSwitch(SwitchEntity):
 
     async def async_added_to_hass(self) -> None:
         await super().async_added_to_hass()
-        self._coordinator.register_sensor(f"plug_switch_{self._plug_sn}", self)
+        self._coordinator.register_sensor(
+            f"plug_switch_{self._plug_sn}", self, sub_sn=self._plug_sn
+        )
 
     async def async_will_remove_from_hass(self) -> None:
         self._coordinator.unregister_sensor(f"plug_switch_{self._plug_sn}")
+        self._cancel_optimistic()
         await super().async_will_remove_from_hass()
 
     def _update_from_coordinator(self, data: dict) -> None:
-        plugs = data.get("plugs") or data.get("plug")
-        if not plugs or not isinstance(plugs, list):
-            return
-
-        my_plug = next((p for p in plugs if (p.get("sn") == self._plug_sn or p.get("deviceSn") == self._plug_sn)), None)
+        my_plug = self._coordinator.get_subdevice(self._plug_sn)
         if not my_plug:
             return
 
         self._raw_data = dict(my_plug)
-        val = my_plug.get("sysSwitch")
-        if val is None:
-            val = my_plug.get("switchSta")
+        val = my_plug.get("switch")
         if val is None:
             return
 
-        self._attr_is_on = bool(int(val))
+        is_on = bool(int(val))
+        if not self._apply_device_value(is_on):
+            return
+        self._attr_is_on = is_on
         self._attr_available = True
-        self.async_write_ha_state()
+        self._async_write_state_if_changed()
 
     async def async_turn_on(self, **kwargs: Any) -> None:
+        self._async_set_optimistic(True)
         await self._coordinator.async_control_subdevice_switch(
             plug_sn=self._plug_sn,
             dev_type=self._dev_type,
@@ -139,6 +141,7 @@ class JackeryPlugSwitch(SwitchEntity):
         )
 
     async def async_turn_off(self, **kwargs: Any) -> None:
+        self._async_set_optimistic(False)
         await self._coordinator.async_control_subdevice_switch(
             plug_sn=self._plug_sn,
             dev_type=self._dev_type,
@@ -154,9 +157,11 @@ class JackeryPlugSwitch(SwitchEntity):
         }
 
 
-class JackeryMainSwitch(SwitchEntity):
+class JackeryMainSwitch(JackeryEntity, SwitchEntity):
     """Main device switch (cmd=5)."""
 
+    _state_attr = "_attr_is_on"
+
     def __init__(
         self,
         key: str,
@@ -167,14 +172,9 @@ class JackeryMainSwitch(SwitchEntity):
         self._key = key
         self._coordinator = coordinator
         self._attr_name = name
-        self._attr_unique_id = f"jackery_main_{key}"
+        self._attr_unique_id = coordinator.unique_id(f"main_{key}")
         self._attr_has_entity_name = True
-        self._attr_device_info = {
-            "identifiers": {(DOMAIN, config_entry_id)},
-            "name": "Jackery",
-            "manufacturer": "Jackery",
-            "model": "Energy Monitor",
-        }
+        self._attr_device_info = coordinator.device_info
 
     @property
     def should_poll(self) -> bool:
@@ -182,10 +182,13 @@ class JackeryMainSwitch(SwitchEntity):
 
     async def async_added_to_hass(self) -> None:
         await super().async_added_to_hass()
-        self._coordinator.register_sensor(f"main_switch_{self._key}", self)
+        self._coordinator.register_sensor(
+            f"main_switch_{self._key}", self, keys=(self._key,)
+        )
 
     async def async_will_remove_from_hass(self) -> None:
         self._coordinator.unregister_sensor(f"main_switch_{self._key}")
+        self._cancel_optimistic()
         await super().async_will_remove_from_hass()
 
     def _update_from_coordinator(self, data: dict) -> None:
@@ -194,12 +197,17 @@ class JackeryMainSwitch(SwitchEntity):
         val = data.get(self._key)
         if val is None:
             return
-        self._attr_is_on = bool(int(val))
+        is_on = bool(int(val))
+        if not self._apply_device_value(is_on):
+            return
+        self._attr_is_on = is_on
         self._attr_available = True
-        self.async_write_ha_state()
+        self._async_write_state_if_changed()
 
     async def async_turn_on(self, **kwargs: Any) -> None:
+        self._async_set_optimistic(True)
         await self._coordinator.async_control_main_device({self._key: 1})
 
     async def async_turn_off(self, **kwargs: Any) -> None:
+        self._async_set_optimistic(False)
         await self._coordinator.async_control_main_device({self._key: 0})
@@ -0,0 +1,121 @@
+"""Deadband and minimum-interval throttling for high-churn measurement sensors.
+
+Each throttled sensor class (power, temperature, battery) has an absolute and
+a relative deadband and a minimum interval between state writes. A value
+held back by the minimum interval is written when the interval ends
+(trailing edge); one held back by the deadband is written by the max
+interval heartbeat at the latest. Both are timers (``retry_delay``), so a
+held-back value reaches the state machine even if the device keeps
+reporting it unchanged. Only ``measurement`` sensors are throttled, so ``total_increasing``
+energy counters keep exact semantics.
+"""
+from typing import Any, Mapping, NamedTuple
+
+THROTTLED_DEVICE_CLASSES = ("power", "temperature", "battery")
+
+# Options (config entry options) per device class: {class}_deadband, {class}_deadband_percent, {class}_min_interval
+OPTION_DEADBAND = "deadband"
+OPTION_DEADBAND_PERCENT = "deadband_percent"
+OPTION_MIN_INTERVAL = "min_interval"
+OPTION_MAX_INTERVAL = "max_interval"
+
+DEFAULT_DEADBAND = 0.0
+DEFAULT_DEADBAND_PERCENT = 0.0
+DEFAULT_MIN_INTERVAL = 0.0
+DEFAULT_MAX_INTERVAL = 300.0
+
+
+class ThrottlePolicy(NamedTuple):
+    """Write policy for one sensor class."""
+
+    deadband: float
+    deadband_percent: float
+    min_interval: float
+    max_interval: float
+
+
+def option_key(device_class: str, option: str) -> str:
+    """Return the config entry option name for a device class setting."""
+    return f"{device_class}_{option}"
+
+
+def policies_from_options(options: Mapping[str, Any]) -> dict[str, ThrottlePolicy]:
+    """Build the per-class policies from config entry options, skipping disabled classes."""
+    max_interval = float(options.get(OPTION_MAX_INTERVAL, DEFAULT_MAX_INTERVAL))
+    policies = {}
+    for device_class in THROTTLED_DEVICE_CLASSES:
+        policy = ThrottlePolicy(
+            deadband=float(options.get(option_key(device_class, OPTION_DEADBAND), DEFAULT_DEADBAND)),
+            deadband_percent=float(
+                options.get(option_key(device_class, OPTION_DEADBAND_PERCENT), DEFAULT_DEADBAND_PERCENT)
+            ),
+            min_interval=float(options.get(option_key(device_class, OPTION_MIN_INTERVAL), DEFAULT_MIN_INTERVAL)),
+            max_interval=max_interval,
+        )
+        if policy.deadband or policy.deadband_percent or policy.min_interval:
+            policies[device_class] = policy
+    return policies
+
+
+class StateThrottle:
+    """Decide whether a measurement sensor's new value is worth a state write."""
+
+    def __init__(self, policies: dict[str, ThrottlePolicy] | None = None) -> None:
+        self._policies = policies or {}
+        self._last: dict[str, tuple[float, float]] = {}  # {entity key: (written value, monotonic time)}
+        self.throttled = 0
+
+    def set_policies(self, policies: dict[str, ThrottlePolicy]) -> None:
+        """Replace the policies (options changed)."""
+        self._policies = policies
+
+    def allow(
+        self,
+        key: str,
+        device_class: Any,
+        state_class: Any,
+        value: Any,
+        now: float,
+        force: bool = False,
+    ) -> bool:
+        """Return True if the value should be written, recording it as the last write.
+
+        ``force`` records the value without checking the policy (first write,
+        availability change).
+        """
+        policy = self._policies.get(device_class)
+        if policy is None or state_class != "measurement" or not isinstance(value, (int, float)):
+            return True
+
+        last = self._last.get(key)
+        if last is not None and not force:
+            last_value, last_time = last
+            elapsed = now - last_time
+            if not (policy.max_interval and elapsed >= policy.max_interval):
+                if elapsed < policy.min_interval:
+                    self.throttled += 1
+                    return False
+                threshold = max(policy.deadband, abs(last_value) * policy.deadband_percent / 100)
+                if threshold and abs(value - last_value) <= threshold:
+                    self.throttled += 1
+                    return False
+
+        self._last[key] = (value, now)
+        return True
+
+    def retry_delay(self, key: str, device_class: Any, now: float) -> float | None:
+        """Return the seconds until a value held back by ``allow`` can be written (None: never)."""
+        policy = self._policies.get(device_class)
+        last = self._last.get(key)
+        if policy is None or last is None:
+            return None
+        elapsed = now - last[1]
+        if elapsed < policy.min_interval:
+            return policy.min_interval - elapsed  # Trailing edge of the min interval
+        if policy.max_interval:
+            return max(policy.max_interval - elapsed, 0.0)  # Heartbeat
+        return None
+
+    def forget(self, key: str) -> None:
+        """Drop the history of a removed entity."""
+        self._last.pop(key, None)
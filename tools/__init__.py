@@ -0,0 +1 @@
+"""Developer tools for the Jackery integration (benchmarks, replay, simulation)."""
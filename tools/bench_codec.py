@@ -0,0 +1,49 @@
+"""Benchmark: JSON decode/encode cost on the MQTT ingest and publish paths.
+
+Decodes the recorded payloads in ``tools/payloads`` the old way (UTF-8 decode
+then stdlib ``json.loads``) and through ``codec.loads`` straight from bytes,
+and encodes a type-25 poll with stdlib ``json.dumps`` and ``codec.dumps``.
+The codec backend in use (orjson or json) is printed first.
+
+    python -m tools.bench_codec [--number N]
+"""
+import argparse
+import json
+import timeit
+from pathlib import Path
+
+from tools import hass_stub
+
+hass_stub.install()
+
+from custom_components.jackery import codec  # noqa: E402
+
+PAYLOAD_DIR = Path(__file__).resolve().parent / "payloads"
+POLL = {"type": 25, "eventId": 0, "messageId": 4821, "ts": 1760589112, "token": "0123456789abcdef", "body": None}
+
+
+def _ns(stmt, number: int) -> float:
+    return min(timeit.repeat(stmt, number=number, repeat=5)) / number * 1e9
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20_000, help="iterations per case")
+    args = parser.parse_args()
+
+    print(f"codec backend: {codec.BACKEND}")
+    print(f"{'case':<22} {'bytes':>6} {'legacy ns':>10} {'codec ns':>10} {'speedup':>8}")
+    for path in sorted(PAYLOAD_DIR.glob("*.json")):
+        payload = path.read_bytes().strip()
+        before = _ns(lambda: json.loads(payload.decode("utf-8")), args.number)
+        after = _ns(lambda: codec.loads(payload), args.number)
+        print(f"loads {path.stem:<16} {len(payload):>6} {before:>10.0f} {after:>10.0f} {before / after:>7.1f}x")
+
+    before = _ns(lambda: json.dumps(POLL), args.number)
+    after = _ns(lambda: codec.dumps(POLL), args.number)
+    size = len(codec.dumps(POLL))
+    print(f"{'dumps poll':<22} {size:>6} {before:>10.0f} {after:>10.0f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Benchmark: coordinator hot paths as the number of sub-devices grows.
+
+Builds a hub with one device and every entity platform set up (stand-ins from
+``tools/hass_stub.py``), feeds it a sub-device list of N plugs and N CTs and
+times, for each N in ``--sizes``:
+
+- ``handle_25`` / ``handle_23`` / ``handle_101``: ``handle_device_message``
+  plus the mailbox drain (decode, merge, calculation, fan-out). Two payload
+  variants alternate so every message changes values;
+- ``energy_flow``: ``_calculate_energy_flow`` on the merged cache;
+- ``check_plugs``: ``_check_for_new_plugs`` with every sub-device known;
+- ``update_main`` / ``update_subdevice`` / ``update_diagnostic``:
+  ``_update_from_coordinator`` per entity of each kind (values unchanged,
+  so the write is suppressed);
+- ``full_refresh``: one ``_update_from_coordinator`` call on every entity.
+
+Results are ns per operation; ``--json`` prints them as a JSON document so
+two builds can be diffed in review.
+
+    python -m tools.bench_hot_paths [--sizes 1 10 100 500] [--number N] [--json]
+"""
+import argparse
+import asyncio
+import json
+import timeit
+
+from tools import hass_stub
+
+hass_stub.install()
+
+from custom_components.jackery import DOMAIN, codec, number, sensor, switch  # noqa: E402
+from custom_components.jackery.hub import JackeryHub  # noqa: E402
+
+SN = "JK0123456789AB"
+TOPIC = f"hb/device/{SN}"
+ENTRY_ID = "bench"
+
+STATUS_BODY = {
+    "batSoc": 76, "batInPw": 0, "batOutPw": 412, "cellTemp": 268, "pvPw": 1384, "pv1": 352, "pv2": 347,
+    "inOngridPw": 0, "outOngridPw": 1650, "swEpsOutPw": 126, "swEpsInPw": 0, "socChgLimit": 100,
+    "socDischgLimit": 10, "isAutoStandby": 1, "autoStandby": 2, "gridBuyPw": 0, "gridSellPw": 0,
+}
+
+
+def _plug(index: int, variant: int) -> dict:
+    return {
+        "deviceSn": f"JKP{index:010d}", "devType": 6, "subType": 1, "name": f"Plug {index + 1}",
+        "commState": 1, "sysSwitch": 1, "outPw": 50 + index % 100 + variant, "totalEgy": 1000 + index,
+    }
+
+
+def _ct(index: int, variant: int) -> dict:
+    return {
+        "deviceSn": f"JKC{index:010d}", "devType": 2, "subType": 4, "name": f"CT {index + 1}", "commState": 1,
+        "AphasePw": 300 + variant, "BphasePw": 200, "CphasePw": 100, "TphasePw": 600 + variant, "TnphasePw": 0,
+        "TphaseEgy": 5000 + index, "TnphaseEgy": 100,
+    }
+
+
+def payloads(size: int) -> dict[str, list[bytes]]:
+    """Two encoded variants of each message type for ``size`` plugs and ``size`` CTs."""
+    result: dict[str, list[bytes]] = {"status": [], "statistics": [], "subdevices": []}
+    for variant in (0, 1):
+        status = {**STATUS_BODY, "pvPw": STATUS_BODY["pvPw"] + variant, "batOutPw": 412 + variant}
+        result["status"].append(codec.dumps({"type": 25, "ts": 1760589112 + variant, "body": status}))
+        statistics = {"deviceSn": "JKP0000000000", "totalEgy": 1000 + variant, "outPw": 50 + variant}
+        result["statistics"].append(codec.dumps({"type": 23, "ts": 1760589112 + variant, "body": statistics}))
+        subdevices = {
+            "plug": [_plug(index, variant) for index in range(size)],
+            "ct": [_ct(index, variant) for index in range(size)],
+        }
+        result["subdevices"].append(codec.dumps({"type": 101, "ts": 1760589112 + variant, "body": subdevices}))
+    return result
+
+
+async def build(size: int):
+    """Return a coordinator with all entities registered and ``size`` plugs and CTs discovered."""
+    hass = hass_stub.HomeAssistant()
+    hub = JackeryHub(hass, "hb", "", None, [SN], ENTRY_ID)
+    hass.data.setdefault(DOMAIN, {})[ENTRY_ID] = {"hub": hub, "coordinator": hub.primary}
+    entities = []
+
+    def add_entities(new_entities) -> None:
+        for entity in new_entities:
+            entity.hass = hass
+            entities.append(entity)
+            hass.async_create_task(entity.async_added_to_hass())
+
+    entry = hass_stub.ConfigEntry(ENTRY_ID)
+    for platform in (sensor, switch, number):
+        await platform.async_setup_entry(hass, entry, add_entities)
+
+    coordinator = hub.primary
+    messages = payloads(size)
+    for channel, kind in (("status", "status"), ("event", "subdevices"), ("event", "statistics")):
+        coordinator.handle_device_message(SN, channel, f"{TOPIC}/{channel}", messages[kind][0])
+        await asyncio.sleep(0)
+    await asyncio.sleep(0)  # Register the discovered sub-device entities
+    return hub, coordinator, entities, messages
+
+
+def _ns(func, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=3)) / number * 1e9
+
+
+def bench_size(coordinator, entities: list, messages: dict, number: int) -> dict[str, float]:
+    results: dict[str, float] = {}
+
+    def handler(channel: str, kind: str):
+        variants = messages[kind]
+        state = {"index": 0}
+
+        def run() -> None:
+            state["index"] ^= 1
+            coordinator._drain_scheduled = True  # Drain synchronously below instead of via call_soon
+            coordinator.handle_device_message(SN, channel, f"{TOPIC}/{channel}", variants[state["index"]])
+            coordinator._drain_mailbox()
+
+        return run
+
+    results["handle_25"] = _ns(handler("status", "status"), number)
+    results["handle_23"] = _ns(handler("event", "statistics"), number)
+    results["handle_101"] = _ns(handler("event", "subdevices"), number)
+    results["energy_flow"] = _ns(lambda: coordinator._calculate_energy_flow(coordinator._data_cache), number)
+    results["check_plugs"] = _ns(lambda: coordinator._check_for_new_plugs(coordinator._data_cache), number)
+
+    data = coordinator._data_cache
+    groups = {
+        "update_main": [e for e in entities if type(e) in (sensor.JackerySensor, sensor.JackeryIntegratedEnergySensor)],
+        "update_subdevice": [e for e in entities if isinstance(e, sensor.JackerySubDeviceSensor)],
+        "update_diagnostic": [e for e in entities if isinstance(e, sensor.JackeryDiagnosticSensor)],
+    }
+    for name, group in groups.items():
+        if not group:
+            continue
+
+        def update_all(group=group) -> None:
+            for entity in group:
+                entity._update_from_coordinator(data)
+
+        results[name] = _ns(update_all, max(number // len(group), 1) * 10) / len(group)
+
+    def full_refresh() -> None:
+        for entity in entities:
+            entity._update_from_coordinator(data)
+
+    results["full_refresh"] = _ns(full_refresh, max(number // 10, 3))
+    return results
+
+
+async def run(sizes: list[int], number: int) -> list[dict]:
+    rows = []
+    for size in sizes:
+        hub, coordinator, entities, messages = await build(size)
+        results = bench_size(coordinator, entities, messages, max(number // size, 5))
+        rows.append(
+            {
+                "subdevices": size,
+                "entities": len(entities),
+                "ns_per_op": {name: round(value, 1) for name, value in results.items()},
+            }
+        )
+        await hub.async_stop()
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 500], help="plugs (and CTs) per run")
+    parser.add_argument("--number", type=int, default=2_000, help="iterations per case at 1 sub-device")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    rows = asyncio.run(run(args.sizes, args.number))
+    if args.json:
+        print(json.dumps({"codec": codec.BACKEND, "results": rows}, indent=2))
+        return
+
+    cases = list(rows[0]["ns_per_op"])
+    print(f"codec backend: {codec.BACKEND}  (ns per operation; update_* per entity)")
+    print(f"{'case':<18}" + "".join(f"{'N=' + str(row['subdevices']):>14}" for row in rows))
+    print(f"{'entities':<18}" + "".join(f"{row['entities']:>14}" for row in rows))
+    for case in cases:
+        print(f"{case:<18}" + "".join(f"{row['ns_per_op'].get(case, float('nan')):>14.0f}" for row in rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Benchmark: value extraction for all main-device SENSORS per message.
+
+Compares the old per-update chain of ``sensor_id`` string comparisons with
+the extractors compiled from the SENSORS descriptors at setup time, over the
+recorded type-25 payload in ``tools/payloads`` plus the energy-flow outputs.
+
+    python -m tools.bench_sensor_extractors [--number N]
+"""
+import argparse
+import json
+import timeit
+from pathlib import Path
+
+from tools import hass_stub
+
+hass_stub.install()
+
+from custom_components.jackery.sensor import (  # noqa: E402
+    _NO_UPDATE,
+    SENSORS,
+    JackeryDataCoordinator,
+    compile_sensor_extractor,
+)
+
+PAYLOAD = Path(__file__).resolve().parent / "payloads" / "type25.json"
+
+
+def legacy_extract(sensor_id: str, config: dict, data: dict):
+    """Value selection as JackerySensor._update_from_coordinator did it before compilation."""
+    if sensor_id == "eps_output_power":
+        return float(data.get("swEpsOutPw", 0)) - float(data.get("swEpsInPw", 0))
+
+    json_key = config.get("json_key")
+    if not json_key or json_key not in data:
+        return _NO_UPDATE
+    value = data[json_key]
+    if sensor_id == "grid_net_power" and value is None:
+        return _NO_UPDATE
+
+    if sensor_id == "battery_temperature":
+        try:
+            return float(value) * 0.1
+        except (TypeError, ValueError):
+            return _NO_UPDATE
+    elif sensor_id == "battery_soc":
+        return value
+    elif sensor_id.startswith("solar_power_pv") and isinstance(value, dict):
+        if "pvPw" in value:
+            return value["pvPw"]
+        elif "w" in value:
+            return value["w"]
+        elif "power" in value:
+            return value["power"]
+        return str(value)
+    scale = config.get("scale", 1)
+    try:
+        return float(value) * scale
+    except (TypeError, ValueError):
+        return value
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20_000, help="iterations (messages)")
+    args = parser.parse_args()
+
+    coordinator = JackeryDataCoordinator(hass_stub.HomeAssistant(), "hb", "", None, "")
+    data = coordinator._calculate_energy_flow(dict(json.loads(PAYLOAD.read_bytes())["body"]))
+
+    legacy = [(sensor_id, config) for sensor_id, config in SENSORS.items()]
+    compiled = [compile_sensor_extractor(config).extract for config in SENSORS.values()]
+
+    for (sensor_id, config), extract in zip(legacy, compiled):
+        assert legacy_extract(sensor_id, config, data) == extract(data), sensor_id
+
+    def run_legacy() -> None:
+        for sensor_id, config in legacy:
+            legacy_extract(sensor_id, config, data)
+
+    def run_compiled() -> None:
+        for extract in compiled:
+            extract(data)
+
+    before = min(timeit.repeat(run_legacy, number=args.number, repeat=5)) / args.number * 1e9
+    after = min(timeit.repeat(run_compiled, number=args.number, repeat=5)) / args.number * 1e9
+    print(f"{len(compiled)} main sensors per message")
+    print(f"legacy   {before:>9.0f} ns/msg  {before / len(compiled):>6.0f} ns/sensor")
+    print(f"compiled {after:>9.0f} ns/msg  {after / len(compiled):>6.0f} ns/sensor")
+    print(f"speedup  {before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
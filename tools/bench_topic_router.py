@@ -0,0 +1,77 @@
+"""Microbenchmark: per-message topic parse and dispatch cost.
+
+Compares the old per-message ``re.search`` over an f-string pattern plus the
+if/elif chain on the message type with the ``JackeryHub`` topic router, SN
+shard lookup and the handler table built once in
+``JackeryDataCoordinator.__init__``. The router is measured with 1 and
+``--devices`` configured units to show the cost does not grow with them.
+
+    python -m tools.bench_topic_router [--number N] [--devices D]
+"""
+import argparse
+import re
+import timeit
+
+from tools import hass_stub
+
+hass_stub.install()
+
+from custom_components.jackery.hub import JackeryHub  # noqa: E402
+
+TOPIC_ROOT = "hb"
+SN = "JK0123456789AB"
+MESSAGES = [
+    (f"{TOPIC_ROOT}/device/{SN}/status", 25),
+    (f"{TOPIC_ROOT}/device/{SN}/event", 101),
+    (f"{TOPIC_ROOT}/device/{SN}/event", 23),
+]
+
+
+def legacy_route(topic: str, msg_code: int) -> str | None:
+    """Topic parse and dispatch as done before the router existed."""
+    match = re.search(rf"{TOPIC_ROOT}/device/([^/]+)/(status|event)", topic)
+    if match:
+        match.group(1)
+        match.group(2)
+    if msg_code == 23:
+        return "statistics"
+    elif msg_code == 101:
+        return "subdevices"
+    return "status"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=200_000, help="iterations per case")
+    parser.add_argument("--devices", type=int, default=50, help="units configured on the large hub")
+    args = parser.parse_args()
+
+    def make_router(devices: int):
+        sns = [SN] + [f"JK{index:012d}" for index in range(1, devices)]
+        hub = JackeryHub(hass_stub.HomeAssistant(), TOPIC_ROOT, "", None, sns, "bench")
+        route_topic = hub._route_topic
+        shards = hub._shards
+
+        def routed(topic: str, msg_code: int):
+            sn, _channel = route_topic(topic)
+            shard = shards[sn]
+            return shard._message_handlers.get(msg_code, shard._merge_status)
+
+        return routed
+
+    def ns_per_msg(func, topic: str, msg_code: int) -> float:
+        elapsed = min(timeit.repeat(lambda: func(topic, msg_code), number=args.number, repeat=5))
+        return elapsed / args.number * 1e9
+
+    small = make_router(1)
+    large = make_router(args.devices)
+    print(f"{'message':<12} {'legacy ns/msg':>14} {'hub(1) ns/msg':>14} {f'hub({args.devices}) ns/msg':>16} {'speedup':>8}")
+    for topic, msg_code in MESSAGES:
+        before_ns = ns_per_msg(legacy_route, topic, msg_code)
+        after_ns = ns_per_msg(small, topic, msg_code)
+        large_ns = ns_per_msg(large, topic, msg_code)
+        print(f"type {msg_code:<7} {before_ns:>14.0f} {after_ns:>14.0f} {large_ns:>16.0f} {before_ns / after_ns:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
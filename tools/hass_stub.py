@@ -0,0 +1,284 @@
+"""Minimal Home Assistant stand-ins for running integration code offline.
+
+Benchmarks and other developer tools import the Jackery coordinator without a
+Home Assistant install. ``install()`` registers lightweight modules for the
+parts of ``homeassistant`` the integration imports, so the code under
+measurement is the integration itself. State writes are counted, MQTT
+publishes are collected in ``published`` (and handed to the callables in
+``publish_listeners``) and ``async_call_later`` runs on the running asyncio
+loop.
+
+Always call ``install()`` before importing ``custom_components.jackery``.
+"""
+import asyncio
+import enum
+import sys
+import types
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+published: list[tuple[str, str | bytes]] = []
+publish_listeners: list = []  # Called with (topic, payload) for every publish
+subscriptions: dict[str, list] = {}
+
+
+class Entity:
+    """Stand-in for homeassistant.helpers.entity.Entity."""
+
+    hass = None
+    entity_id = None
+    _attr_available = True
+    _attr_extra_state_attributes = None
+    state_writes = 0
+
+    @property
+    def available(self) -> bool:
+        return self._attr_available
+
+    @property
+    def extra_state_attributes(self):
+        return self._attr_extra_state_attributes
+
+    async def async_added_to_hass(self) -> None:
+        pass
+
+    async def async_will_remove_from_hass(self) -> None:
+        pass
+
+    def async_write_ha_state(self) -> None:
+        Entity.state_writes += 1
+
+    async def async_remove(self, *, force_remove: bool = False) -> None:
+        await self.async_will_remove_from_hass()
+
+
+class SensorEntity(Entity):
+    """Stand-in for SensorEntity."""
+
+
+class RestoreSensor(SensorEntity):
+    """Stand-in for RestoreSensor; nothing is ever restored."""
+
+    async def async_get_last_sensor_data(self):
+        return None
+
+
+class SwitchEntity(Entity):
+    """Stand-in for SwitchEntity."""
+
+
+class NumberEntity(Entity):
+    """Stand-in for NumberEntity."""
+
+
+class SensorDeviceClass(enum.StrEnum):
+    BATTERY = "battery"
+    DURATION = "duration"
+    ENERGY = "energy"
+    POWER = "power"
+    TEMPERATURE = "temperature"
+
+
+class SensorStateClass(enum.StrEnum):
+    MEASUREMENT = "measurement"
+    TOTAL = "total"
+    TOTAL_INCREASING = "total_increasing"
+
+
+class NumberMode(enum.StrEnum):
+    AUTO = "auto"
+    BOX = "box"
+    SLIDER = "slider"
+
+
+class EntityCategory(enum.StrEnum):
+    CONFIG = "config"
+    DIAGNOSTIC = "diagnostic"
+
+
+class Platform(enum.StrEnum):
+    NUMBER = "number"
+    SENSOR = "sensor"
+    SWITCH = "switch"
+
+
+class UnitOfEnergy(enum.StrEnum):
+    KILO_WATT_HOUR = "kWh"
+
+
+class UnitOfPower(enum.StrEnum):
+    WATT = "W"
+
+
+class UnitOfTemperature(enum.StrEnum):
+    CELSIUS = "°C"
+
+
+class UnitOfTime(enum.StrEnum):
+    MILLISECONDS = "ms"
+    SECONDS = "s"
+
+
+class HomeAssistant:
+    """Just enough of HomeAssistant for the coordinator."""
+
+    def __init__(self) -> None:
+        self.data: dict = {}
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return asyncio.get_running_loop()
+
+    def async_create_task(self, target, name=None, eager_start=True):
+        return self.loop.create_task(target)
+
+    def async_create_background_task(self, target, name, eager_start=True):
+        return self.loop.create_task(target)
+
+    def async_add_executor_job(self, target, *args):
+        return self.loop.run_in_executor(None, target, *args)
+
+
+class ConfigEntry:
+    """Stand-in for ConfigEntry."""
+
+    def __init__(self, entry_id: str = "bench", data=None, options=None) -> None:
+        self.entry_id = entry_id
+        self.data = data or {}
+        self.options = options or {}
+
+
+class ConfigFlow:
+    """Stand-in for ConfigFlow accepting the ``domain`` class keyword."""
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__()
+
+
+class OptionsFlow:
+    """Stand-in for OptionsFlow."""
+
+
+def callback(func):
+    return func
+
+
+async def async_publish(hass, topic, payload, qos=0, retain=False) -> None:
+    published.append((topic, payload))
+    for listener in publish_listeners:
+        listener(topic, payload)
+
+
+async def async_subscribe(hass, topic, msg_callback, qos=0):
+    subscriptions.setdefault(topic, []).append(msg_callback)
+
+    def unsubscribe() -> None:
+        subscriptions[topic].remove(msg_callback)
+
+    return unsubscribe
+
+
+async def async_wait_for_mqtt_client(hass) -> bool:
+    return True
+
+
+connection_callbacks: list = []
+
+
+def async_subscribe_connection_status(hass, connection_status_callback):
+    connection_callbacks.append(connection_status_callback)
+
+    def unsubscribe() -> None:
+        connection_callbacks.remove(connection_status_callback)
+
+    return unsubscribe
+
+
+def async_call_later(hass, delay, action):
+    loop = asyncio.get_running_loop()
+    handle = loop.call_later(
+        delay.total_seconds() if hasattr(delay, "total_seconds") else delay,
+        lambda: action(None),
+    )
+    return handle.cancel
+
+
+class DeviceRegistry:
+    """Stand-in for the device registry; records removals in ``removed_devices``."""
+
+    def __init__(self) -> None:
+        self.devices: dict = {}  # {identifier: device}
+        self.removed_devices: list = []
+
+    def async_get_device(self, identifiers=None, connections=None):
+        for identifier in identifiers or ():
+            if identifier in self.devices:
+                return self.devices[identifier]
+        return None
+
+    def async_update_device(self, device_id, remove_config_entry_id=None, **kwargs):
+        self.removed_devices.append((device_id, remove_config_entry_id))
+
+
+device_registry = DeviceRegistry()
+
+
+def _module(name: str, **attrs) -> types.ModuleType:
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+    parent, _, child = name.rpartition(".")
+    if parent:
+        setattr(sys.modules[parent], child, module)
+    return module
+
+
+def install() -> None:
+    """Register the stand-in modules and put the repository on sys.path."""
+    if str(REPO_ROOT) not in sys.path:
+        sys.path.insert(0, str(REPO_ROOT))
+    if getattr(sys.modules.get("homeassistant"), "__jackery_stub__", False):
+        return
+
+    _module("homeassistant", __jackery_stub__=True)
+    _module("homeassistant.components")
+    _module(
+        "homeassistant.components.mqtt",
+        async_publish=async_publish,
+        async_subscribe=async_subscribe,
+        async_subscribe_connection_status=async_subscribe_connection_status,
+        async_wait_for_mqtt_client=async_wait_for_mqtt_client,
+    )
+    _module(
+        "homeassistant.components.sensor",
+        RestoreSensor=RestoreSensor,
+        SensorDeviceClass=SensorDeviceClass,
+        SensorEntity=SensorEntity,
+        SensorStateClass=SensorStateClass,
+    )
+    _module("homeassistant.components.switch", SwitchEntity=SwitchEntity)
+    _module("homeassistant.components.number", NumberEntity=NumberEntity, NumberMode=NumberMode)
+    _module(
+        "homeassistant.config_entries",
+        ConfigEntry=ConfigEntry,
+        ConfigFlow=ConfigFlow,
+        OptionsFlow=OptionsFlow,
+    )
+    _module("homeassistant.core", HomeAssistant=HomeAssistant, callback=callback)
+    _module(
+        "homeassistant.const",
+        PERCENTAGE="%",
+        EntityCategory=EntityCategory,
+        Platform=Platform,
+        UnitOfEnergy=UnitOfEnergy,
+        UnitOfPower=UnitOfPower,
+        UnitOfTemperature=UnitOfTemperature,
+        UnitOfTime=UnitOfTime,
+    )
+    _module("homeassistant.data_entry_flow", FlowResult=dict)
+    _module("homeassistant.helpers")
+    _module("homeassistant.helpers.device_registry", async_get=lambda hass: device_registry)
+    _module("homeassistant.helpers.entity", Entity=Entity, EntityCategory=EntityCategory)
+    _module("homeassistant.helpers.entity_platform", AddEntitiesCallback=object)
+    _module("homeassistant.helpers.event", async_call_later=async_call_later)
@@ -0,0 +1,206 @@
+"""Replay a recorded MQTT capture into the Jackery hub and report the cost.
+
+Feeds the messages of a capture file (written by the ``jackery.start_capture``
+service, see ``custom_components/jackery/capture.py``) into a ``JackeryHub``
+built on the stand-ins from ``tools/hass_stub.py``. Every sensor, switch and
+number entity is set up and registered as in Home Assistant, including the
+sub-device entities discovered during the replay; the poll loop is not
+started, so nothing is published.
+
+Messages are replayed at the recorded pace (``--speed 1``), N times faster
+(``--speed N``) or as fast as possible (``--speed 0``); the event loop runs
+once after every message, so each message is drained on its own. Reported:
+
+- messages/s (wall clock, and busy time spent in the integration);
+- latency per stage: ``ingest`` (route, decode, enqueue), ``drain`` (merge,
+  calculation, distribution), and inside the drain ``energy_flow`` and
+  ``distribute``;
+- per device: message and state write counters and the final cache.
+
+``--json`` prints one JSON document instead, to diff two builds.
+
+    python -m tools.mqtt_replay CAPTURE.jsonl [--speed N] [--sn SN ...] [--json] [--cache]
+"""
+import argparse
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+from tools import hass_stub
+
+hass_stub.install()
+
+from custom_components.jackery import DOMAIN, number, sensor, switch  # noqa: E402
+from custom_components.jackery.capture import read_capture  # noqa: E402
+from custom_components.jackery.hub import JackeryHub  # noqa: E402
+
+ENTRY_ID = "replay"
+
+
+class StageTimer:
+    """Collects call durations (ns) of one stage."""
+
+    def __init__(self) -> None:
+        self.samples: list[int] = []
+
+    def wrap(self, func):
+        samples = self.samples
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter_ns() - start)
+
+        return timed
+
+    def summary(self) -> dict:
+        samples = sorted(self.samples)
+        if not samples:
+            return {"count": 0}
+
+        def pct(q: float) -> float:
+            return samples[min(int(q / 100 * len(samples)), len(samples) - 1)] / 1000
+
+        return {
+            "count": len(samples),
+            "total_ms": round(sum(samples) / 1e6, 3),
+            "mean_us": round(sum(samples) / len(samples) / 1000, 2),
+            "p50_us": round(pct(50), 2),
+            "p95_us": round(pct(95), 2),
+            "p99_us": round(pct(99), 2),
+            "max_us": round(samples[-1] / 1000, 2),
+        }
+
+
+def infer_topology(records: list) -> tuple[str, list[str]]:
+    """Return the topic prefix and the device SNs in order of first appearance."""
+    prefix = None
+    sns: list[str] = []
+    for _received, topic, _payload in records:
+        root, sep, rest = topic.partition("/device/")
+        if not sep:
+            continue
+        prefix = prefix or root
+        sn = rest.partition("/")[0]
+        if sn and sn not in sns:
+            sns.append(sn)
+    return prefix or "hb", sns
+
+
+async def build_hub(hass, prefix: str, sns: list[str]) -> JackeryHub:
+    """Create the hub and set up and register every entity platform."""
+    hub = JackeryHub(hass, prefix, "", None, sns, ENTRY_ID)
+    hass.data.setdefault(DOMAIN, {})[ENTRY_ID] = {"hub": hub, "coordinator": hub.primary}
+
+    def add_entities(entities) -> None:
+        for entity in entities:
+            entity.hass = hass
+            hass.async_create_task(entity.async_added_to_hass())
+
+    entry = hass_stub.ConfigEntry(ENTRY_ID)
+    for platform in (sensor, switch, number):
+        await platform.async_setup_entry(hass, entry, add_entities)
+    await asyncio.sleep(0)
+    return hub
+
+
+async def replay(path: str, speed: float, sns: list[str] | None) -> dict:
+    records = list(read_capture(path))
+    if not records:
+        raise SystemExit(f"{path}: no messages")
+    prefix, seen_sns = infer_topology(records)
+
+    hass = hass_stub.HomeAssistant()
+    hub = await build_hub(hass, prefix, sns or seen_sns)
+
+    stages = {name: StageTimer() for name in ("ingest", "drain", "energy_flow", "distribute")}
+    handle = stages["ingest"].wrap(hub._handle_message)
+    for coordinator in hub.coordinators:
+        coordinator._drain_mailbox = stages["drain"].wrap(coordinator._drain_mailbox)
+        coordinator._calculate_energy_flow = stages["energy_flow"].wrap(coordinator._calculate_energy_flow)
+        coordinator._distribute_data = stages["distribute"].wrap(coordinator._distribute_data)
+
+    loop = asyncio.get_running_loop()
+    first = records[0][0]
+    start = loop.time()
+    wall_start = time.perf_counter()
+    for received, topic, payload in records:
+        if speed > 0:
+            delay = start + (received - first) / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        handle(SimpleNamespace(topic=topic, payload=payload))
+        await asyncio.sleep(0)  # Run the drain scheduled by this message
+    await asyncio.sleep(0)
+    wall = time.perf_counter() - wall_start
+
+    busy = sum(sum(stages[name].samples) for name in ("ingest", "drain")) / 1e9
+    devices = {}
+    for coordinator in hub.coordinators:
+        devices[coordinator.device_sn or "unknown"] = {
+            "messages_received": coordinator.messages_received,
+            "messages_superseded": coordinator.messages_superseded,
+            "messages_processed": coordinator.messages_processed,
+            "state_writes": coordinator.state_writes,
+            "state_writes_suppressed": coordinator.state_writes_suppressed,
+            "entities": len(coordinator._sensors),
+            "cache": coordinator._data_cache,
+        }
+        await coordinator.async_stop()
+
+    return {
+        "capture": path,
+        "speed": speed,
+        "messages": len(records),
+        "recorded_seconds": round(records[-1][0] - first, 3),
+        "wall_seconds": round(wall, 3),
+        "messages_per_second": round(len(records) / wall, 1) if wall else None,
+        "busy_messages_per_second": round(len(records) / busy, 1) if busy else None,
+        "messages_rejected": hub.messages_rejected,
+        "stages": {name: timer.summary() for name, timer in stages.items()},
+        "devices": devices,
+    }
+
+
+def print_report(report: dict, show_cache: bool) -> None:
+    print(f"capture: {report['capture']} ({report['messages']} messages, {report['recorded_seconds']} s recorded)")
+    print(f"speed: {report['speed'] or 'max'}  wall: {report['wall_seconds']} s")
+    print(f"messages/s: {report['messages_per_second']} wall, {report['busy_messages_per_second']} busy")
+    print(f"rejected: {report['messages_rejected']}")
+    print(f"{'stage':<12} {'count':>7} {'mean us':>9} {'p50 us':>9} {'p95 us':>9} {'p99 us':>9} {'max us':>9}")
+    for name, stage in report["stages"].items():
+        if not stage["count"]:
+            print(f"{name:<12} {0:>7}")
+            continue
+        print(
+            f"{name:<12} {stage['count']:>7} {stage['mean_us']:>9} {stage['p50_us']:>9} "
+            f"{stage['p95_us']:>9} {stage['p99_us']:>9} {stage['max_us']:>9}"
+        )
+    for sn, device in report["devices"].items():
+        counters = ", ".join(f"{key}={value}" for key, value in device.items() if key != "cache")
+        print(f"device {sn}: {counters}, cache keys={len(device['cache'])}")
+        if show_cache:
+            print(json.dumps(device["cache"], indent=2, sort_keys=True, default=str))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("capture", help="JSON Lines capture file")
+    parser.add_argument("--speed", type=float, default=0, help="1 = recorded pace, N = N times faster, 0 = max")
+    parser.add_argument("--sn", nargs="*", help="configured device SNs (default: SNs seen in the capture)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--cache", action="store_true", help="print the final cache of every device")
+    args = parser.parse_args()
+
+    report = asyncio.run(replay(args.capture, args.speed, args.sn))
+    if args.json:
+        print(json.dumps(report, indent=2, sort_keys=True, default=str))
+    else:
+        print_report(report, args.cache)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,495 @@
+"""Simulate Jackery main units (with plugs and CTs) for load and soak tests.
+
+Every simulated unit answers on ``{prefix}/device/{sn}/...`` the way the
+device does:
+
+- type 25 on ``/action`` -> type 25 status on ``/status``;
+- type 100 (``{"devType": 6}`` or ``{"devType": 2}``) -> type 101 on
+  ``/event`` with the full ``plug`` and ``ct`` lists (like the recorded
+  payloads; the coordinator treats every 101 as the complete list);
+- type 1 ``{"cmd": 5, ...}`` -> the params are applied, then a type 25 status;
+- type 103 ``{"deviceSn", "devType", "sysSwitch"}`` -> the plug is switched,
+  then a type 101.
+
+Replies echo the request's ``messageId``. Unsolicited, a unit pushes a type 25
+status ``--rate`` times per second and type 23 statistics (``"system"`` and
+every plug) every ``--stats-interval`` seconds. Values follow a simple power
+balance: solar and home load random walks, the battery covers the difference
+within its SOC limits and the first CT measures the rest as grid import or
+export. Status, plug and CT records start from ``tools/payloads/``.
+
+Load knobs: ``--units``, ``--plugs`` and ``--cts`` per unit, ``--rate``,
+``--jitter`` (random delay of every message, so replies may overtake each
+other), ``--drop`` (probability that a message is lost) and ``--churn``
+(plugs added or removed per unit and minute, announced with a type 101).
+
+Transports:
+
+- ``--local``: the hub runs in-process on the stand-ins from
+  ``tools/hass_stub.py`` with every entity platform set up and its poll loop
+  running; at the end the coordinator counters are reported (``--json``);
+- ``--broker HOST[:PORT]``: a real broker via ``paho-mqtt``, for a Home
+  Assistant instance configured with the printed SNs.
+
+    python -m tools.simulator --local [--units 1] [--plugs 4] [--cts 1] [--duration 60] [--json]
+    python -m tools.simulator --broker localhost:1883 [--username U --password P] [--rate 0.2]
+"""
+import argparse
+import asyncio
+import copy
+import json
+import math
+import os
+import random
+import time
+from collections import Counter
+from pathlib import Path
+from types import SimpleNamespace
+
+PAYLOADS = Path(__file__).resolve().parent / "payloads"
+
+TICK = 0.1  # 秒：模拟步长
+BATTERY_WH = 5000.0
+BATTERY_MAX_PW = 2400
+PV_MAX_PW = 2000
+PLUG_MAX_PW = 800
+CONTROL_KEYS = {"cmd", "rc"}
+
+
+def _load_payload(name: str) -> dict:
+    with open(PAYLOADS / name, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def _walk(rng: random.Random, value: float, sigma: float, low: float, high: float) -> float:
+    return min(max(value + rng.gauss(0, sigma), low), high)
+
+
+class SimulatedUnit:
+    """Protocol state of one main unit and its sub-devices (no I/O)."""
+
+    def __init__(self, index: int, plugs: int, cts: int, rng: random.Random) -> None:
+        self.sn = f"JKSIM{index:09d}"
+        self.index = index
+        self.rng = rng
+        self.status = _load_payload("type25.json")["body"]
+        subdevices = _load_payload("type101.json")["body"]
+        self._plug_template = subdevices["plug"][0]
+        self._ct_template = subdevices["ct"][0]
+        self.plugs: dict[str, dict] = {}
+        self._plug_seq = 0
+        for _ in range(plugs):
+            self.add_plug()
+        self.cts = [self._new_ct(n) for n in range(cts)]
+        self._energy: dict[str, float] = {}
+        self._base_load = 300.0 + rng.random() * 400
+        self._pv = rng.random() * PV_MAX_PW
+        self._soc = float(self.status["batSoc"])
+        self._last_step: float | None = None
+
+    def add_plug(self) -> str:
+        n = self._plug_seq
+        self._plug_seq += 1
+        sn = f"JKP{self.index:05d}{n:06d}"
+        plug = copy.deepcopy(self._plug_template)
+        plug.update(
+            deviceSn=sn, devType=6, name=f"Plug {n + 1}", scanName=f"JK-PLUG-{n:04X}",
+            sysSwitch=1, switchSta=1, outPw=round(self.rng.random() * 200), totalEgy=0,
+        )
+        self.plugs[sn] = plug
+        return sn
+
+    def _new_ct(self, n: int) -> dict:
+        ct = copy.deepcopy(self._ct_template)
+        ct.update(deviceSn=f"JKC{self.index:05d}{n:06d}", devType=2, subType=4, name=f"CT {n + 1}")
+        return ct
+
+    def churn(self) -> None:
+        """Remove a random plug or add a new one."""
+        if self.plugs and self.rng.random() < 0.5:
+            del self.plugs[self.rng.choice(list(self.plugs))]
+        else:
+            self.add_plug()
+
+    def _add_energy(self, record: dict, key: str, power: float, hours: float) -> None:
+        slot = f"{record.get('deviceSn', 'system')}:{key}"
+        total = self._energy.get(slot, float(record.get(key) or 0)) + max(power, 0) * hours
+        self._energy[slot] = total
+        record[key] = int(total)
+
+    def step(self, now: float) -> None:
+        """Advance the power balance to wall time ``now``."""
+        dt = 0.0 if self._last_step is None else max(now - self._last_step, 0.0)
+        self._last_step = now
+        rng = self.rng
+        scale = math.sqrt(max(dt, TICK))
+        hours = dt / 3600
+        s = self.status
+
+        self._pv = _walk(rng, self._pv, 30 * scale, 0, PV_MAX_PW)
+        self._base_load = _walk(rng, self._base_load, 20 * scale, 100, 1500)
+        plug_load = 0.0
+        for plug in self.plugs.values():
+            power = _walk(rng, plug["outPw"], 10 * scale, 0, PLUG_MAX_PW) if plug["sysSwitch"] else 0
+            plug["outPw"] = round(power)
+            plug["switchSta"] = plug["sysSwitch"]
+            plug_load += power
+            self._add_energy(plug, "totalEgy", power, hours)
+        load = self._base_load + plug_load
+
+        # 电池补足光伏与负载的差额，剩余部分由电网 (CT) 承担
+        pv = self._pv
+        max_out = s.get("maxOutPw") or 0
+        can_charge = self._soc < s.get("socChgLimit", 100)
+        can_discharge = self._soc > s.get("socDischgLimit", 0)
+        bat_in = bat_out = 0.0
+        out = min(load, max_out)
+        if pv > out:
+            bat_in = min(pv - out, BATTERY_MAX_PW) if can_charge else 0.0
+            out = min(pv - bat_in, max_out)
+        else:
+            bat_out = min(out - pv, BATTERY_MAX_PW) if can_discharge else 0.0
+            out = pv + bat_out
+        self._soc = min(max(self._soc + (bat_in - bat_out) * hours / BATTERY_WH * 100, 0), 100)
+        grid = load - out
+        eps = _walk(rng, s.get("swEpsOutPw", 0), 5 * scale, 0, 300) if s.get("swEps") else 0
+
+        quarter = round(pv / 4)
+        s.update(
+            pvPw=round(pv), pv1=quarter, pv2=quarter, pv3=quarter, pv4=round(pv) - 3 * quarter,
+            batSoc=round(self._soc), batInPw=round(bat_in), batOutPw=round(bat_out),
+            chgSta=int(bat_in > 0), dischgSta=int(bat_out > 0),
+            outOngridPw=round(out), inOngridPw=0, swEpsOutPw=round(eps),
+            gridBuyPw=round(max(grid, 0)), gridSellPw=round(max(-grid, 0)),
+        )
+        for key, power in (
+            ("pvEgy", pv), ("batChgEgy", bat_in), ("batDisChgEgy", bat_out),
+            ("outOngridEgy", out), ("outEpsEgy", eps),
+        ):
+            self._add_energy(s, key, power, hours)
+
+        for n, ct in enumerate(self.cts):
+            net = grid if n == 0 else _walk(rng, ct["TphasePw"] - ct["TnphasePw"], 20 * scale, -2000, 3000)
+            imported, exported = max(net, 0), max(-net, 0)
+            for phase in "ABC":
+                ct[f"{phase}phasePw"] = round(imported / 3)
+                ct[f"{phase}nphasePw"] = round(exported / 3)
+            ct["TphasePw"], ct["TnphasePw"] = round(imported), round(exported)
+            self._add_energy(ct, "TphaseEgy", imported, hours)
+            self._add_energy(ct, "TnphaseEgy", exported, hours)
+
+    def _message(self, msg_type: int, body: dict, message_id: int | None) -> dict:
+        return {
+            "type": msg_type, "eventId": 0, "messageId": message_id,
+            "ts": int(time.time()), "deviceSn": self.sn, "body": body,
+        }
+
+    def status_message(self, message_id: int | None = None) -> dict:
+        return self._message(25, dict(self.status), message_id)
+
+    def subdevice_message(self, message_id: int | None = None) -> dict:
+        body = {"plug": [dict(plug) for plug in self.plugs.values()], "ct": [dict(ct) for ct in self.cts]}
+        return self._message(101, body, message_id)
+
+    def statistics_messages(self) -> list[dict]:
+        s = self.status
+        system = {key: s[key] for key in ("pvEgy", "batChgEgy", "batDisChgEgy", "outOngridEgy", "inOngridEgy")}
+        messages = [self._message(23, {"deviceSn": "system", **system}, None)]
+        for sn, plug in self.plugs.items():
+            body = {"deviceSn": sn, "outPw": plug["outPw"], "totalEgy": plug["totalEgy"]}
+            messages.append(self._message(23, body, None))
+        return messages
+
+    def handle_action(self, request: dict) -> list[tuple[str, dict]]:
+        """Apply one request from ``/action``; return the (channel, message) replies."""
+        msg_type = request.get("type")
+        body = request.get("body") or {}
+        message_id = request.get("messageId")
+        if msg_type == 25:
+            return [("status", self.status_message(message_id))]
+        if msg_type == 100:
+            return [("event", self.subdevice_message(message_id))]
+        if msg_type == 1 and body.get("cmd") == 5:
+            for key, value in body.items():
+                if key not in CONTROL_KEYS and key in self.status:
+                    self.status[key] = value
+            if "swEps" in body:
+                self.status["swEpsState"] = body["swEps"]
+            return [("status", self.status_message(message_id))]
+        if msg_type == 103:
+            plug = self.plugs.get(body.get("deviceSn"))
+            if plug is not None and "sysSwitch" in body:
+                plug["sysSwitch"] = 1 if body["sysSwitch"] else 0
+            return [("event", self.subdevice_message(message_id))]
+        return []
+
+
+class Simulator:
+    """Runs the units: periodic pushes, churn, replies, jitter and drops."""
+
+    def __init__(self, args: argparse.Namespace, publish) -> None:
+        self.args = args
+        self.prefix = args.prefix
+        self.publish = publish  # (topic, payload bytes) -> None
+        self.rng = random.Random(args.seed)
+        unit_seed = None if args.seed is None else args.seed + 1
+        self.units = {}
+        for index in range(args.units):
+            rng = random.Random(None if unit_seed is None else unit_seed + index)
+            unit = SimulatedUnit(index, args.plugs, args.cts, rng)
+            self.units[unit.sn] = unit
+        self.sent: Counter = Counter()  # By message type
+        self.requests: Counter = Counter()
+        self.dropped = 0
+        self.ignored = 0
+
+    def send(self, unit: SimulatedUnit, channel: str, message: dict) -> None:
+        if self.args.drop and self.rng.random() < self.args.drop:
+            self.dropped += 1
+            return
+        topic = f"{self.prefix}/device/{unit.sn}/{channel}"
+        payload = json.dumps(message, separators=(",", ":")).encode()
+        self.sent[message["type"]] += 1
+        if self.args.jitter:
+            asyncio.get_running_loop().call_later(self.rng.uniform(0, self.args.jitter), self.publish, topic, payload)
+        else:
+            self.publish(topic, payload)
+
+    def handle_request(self, topic: str, payload: bytes | str) -> None:
+        """Answer one message published on ``{prefix}/device/{sn}/action``."""
+        sn = topic.split("/")[-2]
+        unit = self.units.get(sn)
+        try:
+            request = json.loads(payload)
+        except ValueError:
+            request = None
+        if unit is None or not isinstance(request, dict):
+            self.ignored += 1
+            return
+        if self.args.token and request.get("token") != self.args.token:
+            self.ignored += 1
+            return
+        self.requests[request.get("type")] += 1
+        unit.step(time.time())
+        for channel, message in unit.handle_action(request):
+            self.send(unit, channel, message)
+
+    def summary(self, elapsed: float) -> dict:
+        sent = sum(self.sent.values())
+        return {
+            "units": len(self.units),
+            "subdevices": sum(len(unit.plugs) + len(unit.cts) for unit in self.units.values()),
+            "seconds": round(elapsed, 1),
+            "sent": sent,
+            "sent_by_type": {str(msg_type): count for msg_type, count in sorted(self.sent.items())},
+            "sent_per_second": round(sent / elapsed, 1) if elapsed else None,
+            "dropped": self.dropped,
+            "requests": {str(msg_type): count for msg_type, count in sorted(self.requests.items(), key=str)},
+            "ignored": self.ignored,
+        }
+
+    async def run(self, duration: float, on_tick=None) -> float:
+        """Push status, statistics and churn until ``duration`` s have passed (0 = forever)."""
+        args = self.args
+        rng = self.rng
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        status_every = 1 / args.rate if args.rate > 0 else None
+        churn_per_tick = args.churn / 60 * TICK
+        # Spread the units over one period so they don't push in lockstep
+        next_status = {sn: start + rng.random() * (status_every or 0) for sn in self.units}
+        next_stats = {sn: start + rng.random() * args.stats_interval for sn in self.units}
+
+        for unit in self.units.values():
+            unit.step(time.time())
+            self.send(unit, "event", unit.subdevice_message())
+            self.send(unit, "status", unit.status_message())
+
+        next_report = start + args.report if args.report else None
+        while not duration or loop.time() - start < duration:
+            await asyncio.sleep(TICK)
+            now = loop.time()
+            wall = time.time()
+            for sn, unit in self.units.items():
+                unit.step(wall)
+                if churn_per_tick and rng.random() < churn_per_tick:
+                    unit.churn()
+                    self.send(unit, "event", unit.subdevice_message())
+                while status_every and next_status[sn] <= now:
+                    next_status[sn] += status_every
+                    self.send(unit, "status", unit.status_message())
+                if args.stats_interval and next_stats[sn] <= now:
+                    next_stats[sn] += args.stats_interval
+                    for message in unit.statistics_messages():
+                        self.send(unit, "event", message)
+            if on_tick is not None:
+                on_tick()
+            if next_report is not None and now >= next_report:
+                next_report += args.report
+                line = self.summary(now - start)
+                print(
+                    f"[{line['seconds']:>7} s] sent {line['sent']} ({line['sent_per_second']}/s), "
+                    f"dropped {line['dropped']}, requests {sum(self.requests.values())}, "
+                    f"sub-devices {line['subdevices']}",
+                    flush=True,
+                )
+        return loop.time() - start
+
+
+def _round(value: float | None) -> float | None:
+    return None if value is None else round(value, 3)
+
+
+def topic_matches(topic_filter: str, topic: str) -> bool:
+    """MQTT topic filter match (``+`` and ``#`` wildcards)."""
+    filter_parts = topic_filter.split("/")
+    parts = topic.split("/")
+    for index, part in enumerate(filter_parts):
+        if part == "#":
+            return True
+        if index >= len(parts) or (part != "+" and part != parts[index]):
+            return False
+    return len(filter_parts) == len(parts)
+
+
+async def run_local(args: argparse.Namespace) -> dict:
+    """Run the simulator against an in-process hub on the Home Assistant stand-ins."""
+    from tools import hass_stub
+
+    hass_stub.install()
+    from tools.mqtt_replay import build_hub
+
+    loop = asyncio.get_running_loop()
+
+    def deliver(topic: str, payload: bytes) -> None:
+        message = SimpleNamespace(topic=topic, payload=payload.decode("utf-8"))
+        for topic_filter, callbacks in list(hass_stub.subscriptions.items()):
+            if topic_matches(topic_filter, topic):
+                for msg_callback in list(callbacks):
+                    msg_callback(message)
+
+    simulator = Simulator(args, lambda topic, payload: loop.call_soon(deliver, topic, payload))
+
+    def integration_published(topic: str, payload) -> None:
+        if topic.endswith("/action"):
+            loop.call_soon(simulator.handle_request, topic, payload)
+
+    hass = hass_stub.HomeAssistant()
+    hub = await build_hub(hass, args.prefix, list(simulator.units))
+    hass_stub.publish_listeners.append(integration_published)
+    try:
+        await hub.async_start()
+        elapsed = await simulator.run(args.duration, hass_stub.published.clear)
+    finally:
+        hass_stub.publish_listeners.remove(integration_published)
+
+    devices = {}
+    for coordinator in hub.coordinators:
+        requests = coordinator.requests
+        scheduler = coordinator.poll_scheduler
+        devices[coordinator.device_sn] = {
+            "messages_received": coordinator.messages_received,
+            "messages_superseded": coordinator.messages_superseded,
+            "messages_processed": coordinator.messages_processed,
+            "state_writes": coordinator.state_writes,
+            "state_writes_suppressed": coordinator.state_writes_suppressed,
+            "requests_sent": {str(t): n for t, n in requests.sent.items()},
+            "requests_answered": {str(t): n for t, n in requests.answered.items()},
+            "requests_lost": {str(t): n for t, n in requests.lost.items()},
+            "requests_retried": requests.retried,
+            "rtt_p95_ms": {str(t): requests.percentile(t, 95) for t in requests.histograms},
+            "polls_sent": scheduler.polls_sent,
+            "known_subdevices": len(coordinator._known_plugs),
+            "entities": len(coordinator._sensors),
+            "drain_p95_ms": _round(coordinator.perf.percentile("drain", 95)),
+            "slow_messages": coordinator.perf.slow_messages,
+        }
+    await hub.async_stop()
+    return {"simulator": simulator.summary(elapsed), "devices": devices}
+
+
+async def run_broker(args: argparse.Namespace) -> dict:
+    """Run the simulator against a real MQTT broker (paho-mqtt)."""
+    try:
+        import paho.mqtt.client as mqtt
+    except ImportError:
+        raise SystemExit("--broker needs paho-mqtt (pip install paho-mqtt)") from None
+
+    host, _, port = args.broker.partition(":")
+    loop = asyncio.get_running_loop()
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=f"jackery-sim-{os.getpid()}")
+    if args.username:
+        client.username_pw_set(args.username, args.password)
+    simulator = Simulator(args, lambda topic, payload: client.publish(topic, payload, qos=args.qos))
+    action_topic = f"{args.prefix}/device/+/action"
+
+    def on_connect(client, userdata, flags, reason_code, properties) -> None:
+        if reason_code.is_failure:
+            print(f"Broker refused the connection: {reason_code}")
+            return
+        client.subscribe(action_topic, qos=1)
+
+    def on_message(client, userdata, message) -> None:
+        loop.call_soon_threadsafe(simulator.handle_request, message.topic, message.payload)
+
+    client.on_connect = on_connect
+    client.on_message = on_message
+    client.connect(host, int(port or 1883))
+    client.loop_start()
+    print(f"Simulating {len(simulator.units)} unit(s) on {args.broker}: {', '.join(simulator.units)}", flush=True)
+    try:
+        elapsed = await simulator.run(args.duration)
+    finally:
+        client.loop_stop()
+        client.disconnect()
+    return {"simulator": simulator.summary(elapsed)}
+
+
+def print_report(report: dict) -> None:
+    sim = report["simulator"]
+    print(f"units: {sim['units']}  sub-devices: {sim['subdevices']}  seconds: {sim['seconds']}")
+    print(f"sent: {sim['sent']} ({sim['sent_per_second']}/s) by type {sim['sent_by_type']}, dropped: {sim['dropped']}")
+    print(f"requests answered by type: {sim['requests']}, ignored: {sim['ignored']}")
+    for sn, device in report.get("devices", {}).items():
+        counters = ", ".join(f"{key}={value}" for key, value in device.items())
+        print(f"device {sn}: {counters}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    transport = parser.add_mutually_exclusive_group(required=True)
+    transport.add_argument("--local", action="store_true", help="run the hub in-process on the HA stand-ins")
+    transport.add_argument("--broker", metavar="HOST[:PORT]", help="MQTT broker to publish to (needs paho-mqtt)")
+    parser.add_argument("--username", help="broker username")
+    parser.add_argument("--password", help="broker password")
+    parser.add_argument("--qos", type=int, default=0, choices=(0, 1), help="QoS of the device publishes")
+    parser.add_argument("--prefix", default="hb", help="topic prefix (default: hb)")
+    parser.add_argument("--token", help="ignore requests that do not carry this token")
+    parser.add_argument("--units", type=int, default=1, help="main units to simulate")
+    parser.add_argument("--plugs", type=int, default=4, help="plugs per unit")
+    parser.add_argument("--cts", type=int, default=1, help="CTs per unit")
+    parser.add_argument("--rate", type=float, default=0.2, help="unsolicited status pushes per second per unit")
+    parser.add_argument("--stats-interval", type=float, default=60, help="seconds between type 23 pushes (0 = off)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="max random delay of every message (s)")
+    parser.add_argument("--drop", type=float, default=0.0, help="probability that a message is lost")
+    parser.add_argument("--churn", type=float, default=0.0, help="plugs added/removed per unit and minute")
+    parser.add_argument("--duration", type=float, default=60, help="seconds to run (0 = until interrupted)")
+    parser.add_argument("--report", type=float, default=10, help="seconds between progress lines (0 = off)")
+    parser.add_argument("--seed", type=int, help="random seed for a reproducible run")
+    parser.add_argument("--json", action="store_true", help="print the final report as JSON")
+    args = parser.parse_args()
+    if not 0 <= args.drop < 1:
+        parser.error("--drop must be in [0, 1)")
+
+    try:
+        report = asyncio.run(run_local(args) if args.local else run_broker(args))
+    except KeyboardInterrupt:
+        return
+    if args.json:
+        print(json.dumps(report, indent=2, sort_keys=True))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()